@@ -0,0 +1,27 @@
+"""
+Matrix-chain reordering in eval_expr: (A @ B) @ v with 300x300 A, B and a
+300x1 v, evaluated as written (optimize=False) and reordered.  Reports the
+estimated flops from chain_report, the flops EvalStats measured and the time.
+"""
+import numpy as np
+
+from common import best, ms
+from minical.matrix import Var, EvalStats, chain_report, eval_expr
+
+
+def main(n=300):
+    rng = np.random.default_rng(0)
+    A, B, v = Var("A", (n, n)), Var("B", (n, n)), Var("v", (n, 1))
+    expr = (A @ B) @ v
+    env = {"A": rng.standard_normal((n, n)), "B": rng.standard_normal((n, n)), "v": rng.standard_normal((n, 1))}
+    report = chain_report(expr)
+    print(f"estimated flops: {report.written_flops / 1e6:.2f}M written -> {report.optimal_flops / 1e6:.2f}M reordered")
+    for optimize in (False, True):
+        stats = EvalStats()
+        eval_expr(expr, env, optimize=optimize, stats=stats)
+        seconds = best(lambda: eval_expr(expr, env, optimize=optimize), repeat=20)
+        print(f"optimize={optimize!s:5}: measured {stats.matmul_flops / 1e6:.2f}M flops, {ms(seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+mat_exp (scaling and squaring with Pade approximants) against the 20-term
+Taylor sum kept as mat_exp_taylor: relative 1-norm error against
+scipy.linalg.expm, and time on nested-list input.
+"""
+import numpy as np
+from scipy.linalg import expm
+
+from common import best, ms
+from minical.matrix.calculus import mat_exp, mat_exp_taylor
+
+
+def relative_error(a, value):
+    ref = expm(a)
+    return np.linalg.norm(np.array(value) - ref, 1) / np.linalg.norm(ref, 1)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("relative 1-norm error, Pade / Taylor")
+    for n, norm in ((4, 2), (4, 10), (4, 50), (48, 50)):
+        a = rng.standard_normal((n, n))
+        a *= norm / np.linalg.norm(a, 1)
+        rows = a.tolist()
+        print(f"  n={n:3d} norm={norm:3d}: {relative_error(a, mat_exp(rows)):.1e} / "
+              f"{relative_error(a, mat_exp_taylor(rows)):.1e}")
+    print("time on list input, Pade / Taylor")
+    for n in (16, 48):
+        for norm in (1, 10):
+            a = rng.standard_normal((n, n))
+            rows = (a * norm / np.linalg.norm(a, 1)).tolist()
+            print(f"  {n}x{n} norm={norm:2d}: {ms(best(lambda: mat_exp(rows)))} / "
+                  f"{ms(best(lambda: mat_exp_taylor(rows)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Cached structural hashes and interning: a random depth-13 tree built
+through the ops constructors (about 18k nodes, 4.5k distinct).  Times the
+construction, an expression-keyed dict count over every node, and the
+comparison of two equal trees built separately.
+"""
+import random
+import time
+
+from common import ms
+from minical.matrix import Var, add, mul, transpose
+
+
+def build(depth, leaves):
+    if depth == 0:
+        return random.choice(leaves)
+    k = random.random()
+    a, b = build(depth - 1, leaves), build(depth - 1, leaves)
+    if k < 0.4:
+        return add(a, b)
+    if k < 0.8:
+        return mul(a, b)
+    return transpose(add(a, b))
+
+
+def nodes(expr):
+    out, stack = [], [expr]
+    while stack:
+        e = stack.pop()
+        out.append(e)
+        stack.extend(getattr(e, f) for f in ("a", "b", "x") if hasattr(e, f))
+    return out
+
+
+def main():
+    leaves = [Var(c, (4, 4)) for c in "ABCD"]
+    random.seed(0)
+    start = time.perf_counter()
+    tree = build(13, leaves)
+    built = time.perf_counter() - start
+    every = nodes(tree)
+
+    start = time.perf_counter()
+    counts = {}
+    for e in every:
+        counts[e] = counts.get(e, 0) + 1
+    counted = time.perf_counter() - start
+
+    random.seed(0)
+    other = build(13, leaves)
+    start = time.perf_counter()
+    assert tree == other
+    compared = time.perf_counter() - start
+
+    print(f"{len(every)} nodes, {len(counts)} distinct")
+    print(f"construction: {ms(built)}")
+    print(f"memo table:   {ms(counted)}")
+    print(f"equal trees:  {compared * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+compile_latex against parse_latex -> subs -> eval on the README formula,
+per evaluation at one point, plus the batch evaluator over 1e5 points.
+"""
+import numpy as np
+
+from common import best, ms
+from minical.symdiff import compile_latex, parse_latex
+
+SOURCE = r"""
+\ln\left(\frac{\sin^2(x^2) + \sqrt{y}}
+{ \exp(x) + \log_{2}(x+y)}\right)
++ \frac{\tan(\frac{x}{y})}{\sqrt[3]{\sin(x) + \cos(y)}}
+"""
+POINT = {"x": 2.0, "y": 1.0}
+
+
+def main():
+    f = compile_latex(SOURCE, "x y")
+    expected = float(parse_latex(SOURCE).subs(POINT).eval())
+    assert abs(f(POINT) - expected) <= 1e-12 * max(1.0, abs(expected))
+
+    tree = best(lambda: parse_latex(SOURCE).subs(POINT).eval(), number=200)
+    cached = best(lambda: compile_latex(SOURCE, "x y")(POINT), number=2000)
+    alone = best(lambda: f(POINT), number=5000)
+    print(f"parse_latex -> subs -> eval: {tree * 1e6:8.1f} us")
+    print(f"compile_latex + call:        {cached * 1e6:8.1f} us")
+    print(f"compiled call:               {alone * 1e6:8.1f} us")
+
+    rng = np.random.default_rng(0)
+    xs, ys = rng.uniform(1.5, 2.5, 100000), rng.uniform(0.5, 1.5, 100000)
+    print(f"batch, 1e5 points:          {ms(best(lambda: f.batch(x=xs, y=ys)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+eval_expr(..., workers=N) on wide sums of products.
+
+The first table times sums of k products of n x n ndarrays; the speedup
+depends on the number of cores (NumPy and BLAS release the GIL).  The
+second uses a backend whose products sleep for 50 ms, which also releases
+the GIL, to show the scheduler's overlap and the ``memory`` cap on any
+machine.
+"""
+import time
+
+import numpy as np
+
+from common import best, ms
+from minical.matrix import NumpyBackend, Var, eval_expr, register_backend
+
+
+class SlowArray(np.ndarray):
+    pass
+
+
+class SlowBackend(NumpyBackend):
+    name = "slow"
+    priority = 30
+
+    def owns(self, x):
+        return isinstance(x, SlowArray)
+
+    def add(self, a, b):
+        return np.add(a, b).view(SlowArray)
+
+    def mul(self, a, b):
+        time.sleep(0.05)
+        return np.matmul(a, b).view(SlowArray)
+
+
+def wide_sum(n, k):
+    terms = [Var(f"X{i}", (n, n)) @ Var(f"Y{i}", (n, n)) for i in range(k)]
+    expr = terms[0]
+    for t in terms[1:]:
+        expr = expr + t
+    return expr
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("sums of k products of n x n ndarrays")
+    for n, k in ((400, 16), (100, 64), (20, 200)):
+        expr = wide_sum(n, k)
+        env = {f"{c}{i}": rng.standard_normal((n, n)) for i in range(k) for c in "XY"}
+        row = [f"serial {ms(best(lambda: eval_expr(expr, env), 15))}"]
+        for workers in (1, 4):
+            row.append(f"workers={workers} {ms(best(lambda: eval_expr(expr, env, workers=workers), 15))}")
+        print(f"  n={n:3d}, k={k:3d}: " + "; ".join(row))
+
+    register_backend(SlowBackend())
+    n, k = 64, 8
+    expr = wide_sum(n, k)
+    env = {f"{c}{i}": rng.standard_normal((n, n)).view(SlowArray) for i in range(k) for c in "XY"}
+    print(f"sum of {k} products of {n} x {n}, 50 ms per product")
+    rows = [("serial", best(lambda: eval_expr(expr, env), 3))]
+    for workers in (2, 4, 8):
+        rows.append((f"workers={workers}", best(lambda: eval_expr(expr, env, workers=workers), 3)))
+    for label, memory in (("3 matrices", 3 * 8 * n * n), ("1 byte", 1)):
+        rows.append((f"workers=8, memory={label}", best(lambda: eval_expr(expr, env, workers=8, memory=memory), 3)))
+    for label, seconds in rows:
+        print(f"  {label:30} {ms(seconds)}")
+
+if __name__ == "__main__":
+    main()
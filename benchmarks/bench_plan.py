@@ -0,0 +1,29 @@
+"""
+compile_plan against eval_expr, per call, for
+(AB)^T C + A^-1 + C^T + (AB)(AB) on 10x10 and 100x100 bindings.
+"""
+import numpy as np
+
+from common import best
+from minical.matrix import Var, compile_plan, eval_expr, inverse
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for n, kind in ((10, "numpy"), (10, "lists"), (100, "numpy")):
+        A, B, C = (Var(c, (n, n)) for c in "ABC")
+        ab = A @ B
+        expr = ab.T @ C + inverse(A) + C.T + ab @ ab
+        env = {c: rng.standard_normal((n, n)) + n * np.eye(n) for c in "ABC"}
+        if kind == "lists":
+            env = {c: v.tolist() for c, v in env.items()}
+        plan = compile_plan(expr)
+        np.testing.assert_allclose(np.asarray(plan(env)), np.asarray(eval_expr(expr, env)), rtol=1e-9)
+        direct = best(lambda: eval_expr(expr, env), repeat=50)
+        planned = best(lambda: plan(env), repeat=50)
+        size = f"{n}x{n}"
+        print(f"{size:7} {kind:5}: eval_expr {direct * 1e6:8.0f} us, plan {planned * 1e6:8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
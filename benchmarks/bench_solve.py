@@ -0,0 +1,29 @@
+"""
+The simplifier's Solve rewrite: eval_expr of inv(A) @ B against
+simplify(inv(A) @ B), which evaluates as solve(A, B).
+"""
+import numpy as np
+
+from common import best, ms
+from minical.matrix import Var, eval_expr, inverse, simplify
+
+CASES = ((50, 1, "lists"), (100, 1, "lists"), (100, 1, "numpy"), (500, 1, "numpy"), (500, 500, "numpy"))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for n, m, kind in CASES:
+        A, B = Var("A", (n, n)), Var("B", (n, m))
+        written = inverse(A) @ B
+        rewritten = simplify(written)
+        env = {"A": rng.standard_normal((n, n)) + n * np.eye(n), "B": rng.standard_normal((n, m))}
+        if kind == "lists":
+            env = {k: v.tolist() for k, v in env.items()}
+        repeat = 3 if kind == "lists" else 10
+        before = best(lambda: eval_expr(written, env), repeat)
+        after = best(lambda: eval_expr(rewritten, env), repeat)
+        print(f"{kind:5} n={n:3d}, m={m:3d}: {ms(before)} -> {ms(after)}")
+
+
+if __name__ == "__main__":
+    main()
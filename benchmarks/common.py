@@ -0,0 +1,28 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Each script reproduces the timings quoted in the commit that introduced
+the optimization it measures; run it from the repository root, e.g.
+``python benchmarks/bench_expm.py``.  Times are the best of several runs
+and vary with the machine and its BLAS.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best(fn, repeat=7, number=1):
+    """Fastest of ``repeat`` runs of ``number`` calls of ``fn()``, in seconds per call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def ms(seconds):
+    return f"{seconds * 1e3:8.2f} ms"
@@ -1,11 +1,35 @@
-from .core import Expr, Var, Const, Func, Add, Mul, Transpose, Inverse
-from .ops import add, mul, transpose, inverse, func
+from .core import (
+    Expr, Var, Const, Func, Add, Mul, Transpose, Inverse, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron, intern,
+)
+from .ops import add, mul, transpose, inverse, func, trace, det, logdet, scale, solve, hadamard, kron
 from .simplify import simplify
 from .funcs import exp, ln, sin, cos, tan, sinh, cosh, tanh, asin, acos, atan, pow
-from .calculus import eval_expr
+from .calculus import eval_expr, expm_multiply, EvalStats, PythonBackend
+from .chain import optimize_chains, chain_report, chain_order
+from .cost import node_flops, subtree_flops
+from .plan import Plan, compile_plan
+from .parallel import Scheduler
+from .profile import Profiler, NodeRecord
+from .sparse import CSRMatrix, COOMatrix, SparseBackend
+from .flat import FlatMatrix, FlatBackend
+from .outofcore import OutOfCoreBackend, load_npy
+from .structure import tags
+from .grad import grad, gradients, grad_eval
+from .factor import LU, Cholesky, Eigen, FactorCache, factorize
+from .backend import Backend, NumpyBackend, BatchedNumpyBackend, register_backend, get_backend, available_backends
 
 __all__ = [
-    "Expr", "Var", "Const", "Func", "Add", "Mul", "Transpose", "Inverse",
-    "add", "mul", "transpose", "inverse", "func",
+    "Expr", "Var", "Const", "Func", "Add", "Mul", "Transpose", "Inverse", "intern",
+    "Trace", "Det", "LogDet", "ScalarMul", "Solve", "Hadamard", "Kron",
+    "add", "mul", "transpose", "inverse", "func", "trace", "det", "logdet", "scale", "solve",
+    "hadamard", "kron",
     "simplify",
+    "eval_expr", "expm_multiply", "Backend", "PythonBackend", "NumpyBackend", "BatchedNumpyBackend",
+    "register_backend", "get_backend", "available_backends",
+    "LU", "Cholesky", "Eigen", "FactorCache", "factorize",
+    "EvalStats", "optimize_chains", "chain_report", "chain_order",
+    "node_flops", "subtree_flops", "Plan", "compile_plan", "Scheduler", "Profiler", "NodeRecord",
+    "CSRMatrix", "COOMatrix", "SparseBackend", "FlatMatrix", "FlatBackend",
+    "OutOfCoreBackend", "load_npy", "tags",
+    "grad", "gradients", "grad_eval",
 ]
\ No newline at end of file
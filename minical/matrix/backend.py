@@ -0,0 +1,333 @@
+from __future__ import annotations
+import math
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Backend:
+    """
+    Table of numeric kernels for one matrix representation.
+
+    ``eval_expr`` picks the backend that owns its operands (highest
+    ``priority`` first), so new representations plug in by subclassing and
+    calling ``register_backend``.
+    """
+
+    name: str = "abstract"
+    priority: int = 0
+    # Whether ``factor.factorize`` (LU / Cholesky) understands this representation.
+    factorizable: bool = False
+    # Sparse representations: ``eval_expr`` turns ``inv(A) @ B`` into ``solve(A, B)``.
+    sparse: bool = False
+
+    def owns(self, x: Any) -> bool:
+        raise NotImplementedError
+
+    def asmatrix(self, x: Any) -> Any:
+        raise NotImplementedError
+
+    def tolist(self, a: Any) -> List[List[float]]:
+        raise NotImplementedError
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def eye(self, n: int) -> Any:
+        raise NotImplementedError
+
+    def add(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def scale(self, a: Any, s: float) -> Any:
+        raise NotImplementedError
+
+    def mul(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def transpose(self, a: Any) -> Any:
+        raise NotImplementedError
+
+    def inverse(self, a: Any) -> Any:
+        raise NotImplementedError
+
+    def det(self, a: Any) -> float:
+        raise NotImplementedError
+
+    def trace(self, a: Any) -> float:
+        raise NotImplementedError
+
+    def slogdet(self, a: Any) -> Tuple[float, float]:
+        """``(sign, log|det|)`` of ``a``; backends may override for range and accuracy."""
+        d = self.det(a)
+        if np is not None and isinstance(d, np.ndarray):
+            with np.errstate(divide="ignore"):
+                return np.sign(d), np.log(np.abs(d))
+        if not d:
+            return 0.0, -math.inf
+        return math.copysign(1.0, d), math.log(abs(d))
+
+    def solve(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def norm1(self, a: Any) -> float:
+        raise NotImplementedError
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def kron(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def trace_mul(self, a: Any, b: Any) -> Any:
+        """``trace(a @ b)``; backends override it to skip forming the product."""
+        return self.trace(self.mul(a, b))
+
+    def inner(self, a: Any, b: Any) -> Any:
+        """``trace(a^T @ b)``, the sum of the element-wise products."""
+        return self.trace(self.mul(self.transpose(a), b))
+
+    def kron_mul(self, a: Any, b: Any, v: Any) -> Any:
+        """``kron(a, b) @ v``; backends override it to skip forming the Kronecker product."""
+        return self.mul(self.kron(a, b), v)
+
+    # In-place variants for the series kernels.  ``out`` and the accumulator
+    # must be buffers the caller owns (never an operand it was handed);
+    # backends without in-place kernels return a new matrix, so callers
+    # always continue with the returned value.
+
+    def mul_into(self, a: Any, b: Any, out: Any) -> Any:
+        """``a @ b`` written into ``out`` (not ``a`` or ``b``) when it fits; ``out`` may be ``None``."""
+        return self.mul(a, b)
+
+    def axpy(self, y: Any, s: float, x: Any) -> Any:
+        """Fused multiply-accumulate ``y += s * x``."""
+        return self.add(y, self.scale(x, s))
+
+    def iscale(self, a: Any, s: float) -> Any:
+        """``a *= s``."""
+        return self.scale(a, s)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class NumpyBackend(Backend):
+    """BLAS/LAPACK kernels on ``numpy.ndarray`` operands."""
+
+    name = "numpy"
+    priority = 10
+    factorizable = True
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, np.ndarray) and x.ndim == 2
+
+    def asmatrix(self, x: Any) -> Any:
+        return np.asarray(x, dtype=float)
+
+    def tolist(self, a: Any) -> List[List[float]]:
+        return np.asarray(a).tolist()
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        return a.shape
+
+    def eye(self, n: int) -> Any:
+        return np.eye(n)
+
+    def add(self, a: Any, b: Any) -> Any:
+        return np.add(self.asmatrix(a), self.asmatrix(b))
+
+    def scale(self, a: Any, s: float) -> Any:
+        return self.asmatrix(a) * s
+
+    def mul(self, a: Any, b: Any) -> Any:
+        return np.matmul(self.asmatrix(a), self.asmatrix(b))
+
+    def transpose(self, a: Any) -> Any:
+        return self.asmatrix(a).T
+
+    def inverse(self, a: Any) -> Any:
+        try:
+            return np.linalg.inv(self.asmatrix(a))
+        except np.linalg.LinAlgError:
+            return None
+
+    def det(self, a: Any) -> float:
+        return float(np.linalg.det(self.asmatrix(a)))
+
+    def trace(self, a: Any) -> float:
+        return float(np.trace(self.asmatrix(a)))
+
+    def slogdet(self, a: Any) -> Tuple[float, float]:
+        sign, logabs = np.linalg.slogdet(self.asmatrix(a))
+        return float(sign), float(logabs)
+
+    def solve(self, a: Any, b: Any) -> Any:
+        try:
+            return np.linalg.solve(self.asmatrix(a), self.asmatrix(b))
+        except np.linalg.LinAlgError:
+            return None
+
+    def norm1(self, a: Any) -> float:
+        return float(np.linalg.norm(self.asmatrix(a), 1))
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        return np.multiply(self.asmatrix(a), self.asmatrix(b))
+
+    def kron(self, a: Any, b: Any) -> Any:
+        return np.kron(self.asmatrix(a), self.asmatrix(b))
+
+    def trace_mul(self, a: Any, b: Any) -> float:
+        return float(np.einsum("ij,ji->", self.asmatrix(a), self.asmatrix(b)))
+
+    def inner(self, a: Any, b: Any) -> float:
+        return float(np.vdot(self.asmatrix(a), self.asmatrix(b)))
+
+    def kron_mul(self, a: Any, b: Any, v: Any) -> Any:
+        # Column c of v, read row-major as a (q, s) matrix V, maps to a V b^T.
+        a, b, v = self.asmatrix(a), self.asmatrix(b), self.asmatrix(v)
+        k = v.shape[1]
+        y = a @ v.T.reshape(k, a.shape[1], b.shape[1]) @ b.T
+        return y.reshape(k, -1).T
+
+    def mul_into(self, a: Any, b: Any, out: Any) -> Any:
+        a, b = self.asmatrix(a), self.asmatrix(b)
+        if out is None or out.shape != (a.shape[0], b.shape[1]):
+            return np.matmul(a, b)
+        return np.matmul(a, b, out=out)
+
+    def axpy(self, y: Any, s: float, x: Any) -> Any:
+        x = self.asmatrix(x)
+        if y.shape != x.shape:
+            return y + s * x
+        y += s * x
+        return y
+
+    def iscale(self, a: Any, s: float) -> Any:
+        a *= s
+        return a
+
+
+def _batch_factor(s: Any) -> Any:
+    # A 1-D array holds one scalar per batch entry.
+    s = np.asarray(s, dtype=float)
+    return s[:, None, None] if s.ndim == 1 else s
+
+
+class BatchedNumpyBackend(Backend):
+    """
+    Stacks of matrices: ``numpy.ndarray`` operands of shape ``(batch, n, m)``.
+
+    Every kernel runs over the leading batch axis in one vectorized call;
+    2-D operands broadcast against the stack and 1-D arrays act as one
+    scalar per batch entry.  ``shape`` reports the ``(n, m)`` of one entry
+    and ``norm1`` the largest 1-norm in the stack, so the series kernels
+    pick one scaling that is safe for every entry.
+    """
+
+    name = "batched"
+    priority = 20
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, np.ndarray) and x.ndim == 3
+
+    def asmatrix(self, x: Any) -> Any:
+        return np.asarray(x, dtype=float)
+
+    def tolist(self, a: Any) -> List[List[List[float]]]:
+        return np.asarray(a).tolist()
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        return np.shape(a)[-2:]
+
+    def eye(self, n: int) -> Any:
+        return np.eye(n)
+
+    def add(self, a: Any, b: Any) -> Any:
+        return np.add(self.asmatrix(a), self.asmatrix(b))
+
+    def scale(self, a: Any, s: float) -> Any:
+        return self.asmatrix(a) * _batch_factor(s)
+
+    def mul(self, a: Any, b: Any) -> Any:
+        return np.matmul(self.asmatrix(a), self.asmatrix(b))
+
+    def transpose(self, a: Any) -> Any:
+        return np.swapaxes(self.asmatrix(a), -1, -2)
+
+    def inverse(self, a: Any) -> Any:
+        try:
+            return np.linalg.inv(self.asmatrix(a))
+        except np.linalg.LinAlgError:
+            return None
+
+    def det(self, a: Any) -> Any:
+        return np.linalg.det(self.asmatrix(a))
+
+    def trace(self, a: Any) -> Any:
+        return np.trace(self.asmatrix(a), axis1=-2, axis2=-1)
+
+    def slogdet(self, a: Any) -> Tuple[Any, Any]:
+        return tuple(np.linalg.slogdet(self.asmatrix(a)))
+
+    def solve(self, a: Any, b: Any) -> Any:
+        a, b = self.asmatrix(a), self.asmatrix(b)
+        a, b = np.broadcast_arrays(a, b) if a.ndim != b.ndim else (a, b)
+        try:
+            return np.linalg.solve(a, b)
+        except np.linalg.LinAlgError:
+            return None
+
+    def norm1(self, a: Any) -> float:
+        return float(np.abs(self.asmatrix(a)).sum(axis=-2).max())
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        return np.multiply(self.asmatrix(a), self.asmatrix(b))
+
+    def kron(self, a: Any, b: Any) -> Any:
+        a, b = self.asmatrix(a), self.asmatrix(b)
+        k = np.einsum("...ij,...kl->...ikjl", a, b)
+        return k.reshape(k.shape[:-4] + (a.shape[-2] * b.shape[-2], a.shape[-1] * b.shape[-1]))
+
+    def trace_mul(self, a: Any, b: Any) -> Any:
+        return np.einsum("...ij,...ji->...", self.asmatrix(a), self.asmatrix(b))
+
+    def inner(self, a: Any, b: Any) -> Any:
+        return np.einsum("...ij,...ij->...", self.asmatrix(a), self.asmatrix(b))
+
+
+_REGISTRY: Dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> Backend:
+    _REGISTRY[backend.name] = backend
+    return backend
+
+
+def get_backend(name: Union[str, Backend, None] = None) -> Optional[Backend]:
+    if name is None or isinstance(name, Backend):
+        return name
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown matrix backend: {name!r} (available: {sorted(_REGISTRY)})")
+
+
+def available_backends() -> List[str]:
+    return sorted(_REGISTRY, key=lambda n: -_REGISTRY[n].priority)
+
+
+def backend_for(*values: Any) -> Optional[Backend]:
+    best = None
+    for be in _REGISTRY.values():
+        if (best is None or be.priority > best.priority) and any(be.owns(v) for v in values):
+            best = be
+    return best
+
+
+if np is not None:
+    register_backend(NumpyBackend())
+    register_backend(BatchedNumpyBackend())
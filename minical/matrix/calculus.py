@@ -1,8 +1,23 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple, Union
-from .core import Expr, Var, Const, Add, Mul, Transpose, Inverse, Func
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .core import (
+    Expr, Var, Const, Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron,
+    operands,
+)
 from .ops import add, mul, transpose, inverse, func
+from .backend import Backend, backend_for, get_backend, register_backend, np
+from .flat import FLAT
+from .factor import FactorCache, Eigen, is_symmetric
+from .chain import optimize_chains
+from .cost import mul_flops, subtree_flops
+from .structure import (
+    DIAGONAL, SYMMETRIC, TRIANGULAR, tags, is_dense, diagonal, from_diagonal, mul_kernel, solve_kernel, inverse_kernel,
+    triangular_det, triangular_slogdet, factor,
+)
+from dataclasses import dataclass
 import math
+import threading
+import operator
 
 
 Matrix = List[List[float]]
@@ -21,12 +36,8 @@ def mat_mul(a: Matrix, b: Matrix) -> Matrix:
     n, k = mat_shape(a)
     k2, m = mat_shape(b)
     assert k == k2, "Matrix multiplication shape mismatch"
-    res = [[0] * m for _ in range(n)]
-    for i in range(n):
-        for j in range(m):
-            for t in range(k):
-                res[i][j] += a[i][t] * b[t][j]
-    return res
+    cols = list(zip(*b))
+    return [[sum(map(operator.mul, row, col)) for col in cols] for row in a]
 
 
 def mat_transpose(a: Matrix) -> Matrix:
@@ -91,73 +102,428 @@ def mat_inverse(m: Matrix) -> Union[Matrix, None]:
     return inv
 
 
+def mat_solve(a: Matrix, b: Matrix) -> Union[Matrix, None]:
+    n, k = mat_shape(a)
+    assert n == k, "Solve only for square matrices"
+    assert len(b) == n, "Solve right-hand side shape mismatch"
+    a = [row[:] for row in a]
+    x = [row[:] for row in b]
+
+    for i in range(n):
+        pivot = max(range(i, n), key=lambda r: abs(a[r][i]))
+        if abs(a[pivot][i]) < 1e-12:
+            return None
+        if pivot != i:
+            a[i], a[pivot] = a[pivot], a[i]
+            x[i], x[pivot] = x[pivot], x[i]
+        piv = a[i][i]
+        for j in range(i + 1, n):
+            factor = a[j][i] / piv
+            if factor:
+                a[j] = [a[j][k] - factor * a[i][k] for k in range(n)]
+                x[j] = [xj - factor * xi for xj, xi in zip(x[j], x[i])]
+
+    for i in range(n - 1, -1, -1):
+        row = a[i]
+        acc = x[i]
+        for k in range(i + 1, n):
+            if row[k]:
+                acc = [u - row[k] * v for u, v in zip(acc, x[k])]
+        x[i] = [u / row[i] for u in acc]
+    return x
+
+
+def mat_norm1(a: Matrix) -> float:
+    n, m = mat_shape(a)
+    return max((sum(abs(a[i][j]) for i in range(n)) for j in range(m)), default=0.0)
+
+
+def mat_scale(a: Matrix, s: float) -> Matrix:
+    return [[x * s for x in row] for row in a]
+
+
+class PythonBackend(Backend):
+    """Pure-Python kernels on ``List[List[float]]``; always available."""
+
+    name = "python"
+    priority = 0
+    factorizable = True
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, list) and bool(x) and isinstance(x[0], list)
+
+    def asmatrix(self, x: Any) -> Matrix:
+        return x if isinstance(x, list) else x.tolist()
+
+    def tolist(self, a: Matrix) -> Matrix:
+        return a
+
+    def shape(self, a: Matrix) -> Tuple[int, int]:
+        return mat_shape(a)
+
+    def eye(self, n: int) -> Matrix:
+        return mat_eye(n)
+
+    def add(self, a: Matrix, b: Matrix) -> Matrix:
+        return mat_add(self.asmatrix(a), self.asmatrix(b))
+
+    def scale(self, a: Matrix, s: float) -> Matrix:
+        return mat_scale(self.asmatrix(a), s)
+
+    def mul(self, a: Matrix, b: Matrix) -> Matrix:
+        return mat_mul(self.asmatrix(a), self.asmatrix(b))
+
+    def transpose(self, a: Matrix) -> Matrix:
+        return mat_transpose(self.asmatrix(a))
+
+    def inverse(self, a: Matrix) -> Union[Matrix, None]:
+        return mat_inverse(self.asmatrix(a))
+
+    def det(self, a: Matrix) -> float:
+        return mat_det(self.asmatrix(a))
+
+    def trace(self, a: Matrix) -> float:
+        a = self.asmatrix(a)
+        return sum(a[i][i] for i in range(len(a)))
+
+    def solve(self, a: Matrix, b: Matrix) -> Union[Matrix, None]:
+        return mat_solve(self.asmatrix(a), self.asmatrix(b))
+
+    def norm1(self, a: Matrix) -> float:
+        return mat_norm1(self.asmatrix(a))
+
+    def hadamard(self, a: Matrix, b: Matrix) -> Matrix:
+        return [[x * y for x, y in zip(ra, rb)] for ra, rb in zip(self.asmatrix(a), self.asmatrix(b))]
+
+    def kron(self, a: Matrix, b: Matrix) -> Matrix:
+        a, b = self.asmatrix(a), self.asmatrix(b)
+        return [[x * y for x in ra for y in rb] for ra in a for rb in b]
+
+    def trace_mul(self, a: Matrix, b: Matrix) -> float:
+        b = self.asmatrix(b)
+        return sum(x * b[t][i] for i, row in enumerate(self.asmatrix(a)) for t, x in enumerate(row))
+
+    def inner(self, a: Matrix, b: Matrix) -> float:
+        return sum(x * y for ra, rb in zip(self.asmatrix(a), self.asmatrix(b)) for x, y in zip(ra, rb))
+
+    def kron_mul(self, a: Matrix, b: Matrix, v: Matrix) -> Matrix:
+        a, b, v = self.asmatrix(a), self.asmatrix(b), self.asmatrix(v)
+        s = len(b[0])
+        bt = mat_transpose(b)
+        columns = []
+        for col in mat_transpose(v):
+            # The column read row-major as a (q, s) matrix V maps to a V b^T.
+            y = mat_mul(mat_mul(a, [col[j:j + s] for j in range(0, len(col), s)]), bt)
+            columns.append([x for row in y for x in row])
+        return mat_transpose(columns)
+
+
+PYTHON = register_backend(PythonBackend())
+
+
+def _backend(*values: Any) -> Backend:
+    return backend_for(*values) or PYTHON
+
+
+def _same(x: Any) -> Any:
+    return x
+
+
+def _unflatten(x: Any) -> Any:
+    return None if x is None else x.tolist()
+
+
+def _series_operand(*values: Any) -> Tuple[List[Any], Backend, Any]:
+    """
+    Operands, backend and result conversion for a series kernel.
+
+    Nested lists are moved into flat ``array('d')`` buffers once, so the
+    kernel's products and accumulations run in place on the ``FlatBackend``;
+    the conversion turns a result back into nested lists.
+    """
+    be = _backend(*values)
+    if be is PYTHON:
+        try:
+            return [FLAT.asmatrix(v) for v in values], FLAT, _unflatten
+        except TypeError:
+            pass
+    return list(values), be, _same
+
+
 def mat_pow(a: Matrix, k: int) -> Matrix:
     assert k >= 0 and isinstance(k, int)
-    n, m = mat_shape(a)
+    (a,), be, back = _series_operand(a)
+    n, m = be.shape(a)
     assert n == m, "Matrix power requires square matrix"
-    res = mat_eye(n)
-    base = a
+    # Products go into the spare buffers; the caller's ``a`` is never written.
+    res, spare = be.eye(n), None
+    base, spare_base = a, None
     while k:
         if k & 1:
-            res = mat_mul(res, base)
-        base = mat_mul(base, base)
+            res, spare = be.mul_into(res, base, spare), res
         k >>= 1
-    return res
+        if k:
+            base, spare_base = be.mul_into(base, base, spare_base), (base if base is not a else None)
+    return back(res)
 
 
-def mat_exp(a: Matrix, terms: int = 20) -> Matrix:
-    n, m = mat_shape(a)
+# Pade coefficients b_0..b_m and the 1-norm bounds theta_m below which the
+# degree-m approximant is accurate to double precision (Higham, 2005).
+PADE_COEFFS = {
+    3: (120., 60., 12., 1.),
+    5: (30240., 15120., 3360., 420., 30., 1.),
+    7: (17297280., 8648640., 1995840., 277200., 25200., 1512., 56., 1.),
+    9: (17643225600., 8821612800., 2075673600., 302702400., 30270240.,
+        2162160., 110880., 3960., 90., 1.),
+    13: (64764752532480000., 32382376266240000., 7771770303897600.,
+         1187353796428800., 129060195264000., 10559470521600.,
+         670442572800., 33522128640., 1323241920., 40840800., 960960.,
+         16380., 182., 1.),
+}
+PADE_THETA = {
+    3: 1.495585217958292e-2,
+    5: 2.539398330063230e-1,
+    7: 9.504178996162932e-1,
+    9: 2.097847961257068e0,
+    13: 5.371920351148152e0,
+}
+
+
+def _lincomb(be: Backend, terms: List[Tuple[float, Matrix]]) -> Matrix:
+    c, m = terms[0]
+    acc = be.scale(m, c)
+    for c, m in terms[1:]:
+        acc = be.axpy(acc, c, m)
+    return acc
+
+
+def _pade_uv(be: Backend, a: Matrix, m: int) -> Tuple[Matrix, Matrix]:
+    b = PADE_COEFFS[m]
+    n = be.shape(a)[0]
+    ident = be.eye(n)
+    a2 = be.mul(a, a)
+    if m < 13:
+        powers = [ident, a2]
+        for _ in range(2, (m + 1) // 2):
+            powers.append(be.mul(powers[-1], a2))
+        u = be.mul(a, _lincomb(be, [(b[2 * k + 1], p) for k, p in enumerate(powers)]))
+        v = _lincomb(be, [(b[2 * k], p) for k, p in enumerate(powers)])
+        return u, v
+    a4 = be.mul(a2, a2)
+    a6 = be.mul(a4, a2)
+    u = be.mul(a, be.axpy(
+        _lincomb(be, [(b[7], a6), (b[5], a4), (b[3], a2), (b[1], ident)]), 1.0,
+        be.mul(a6, _lincomb(be, [(b[13], a6), (b[11], a4), (b[9], a2)]))))
+    v = be.axpy(
+        _lincomb(be, [(b[6], a6), (b[4], a4), (b[2], a2), (b[0], ident)]), 1.0,
+        be.mul(a6, _lincomb(be, [(b[12], a6), (b[10], a4), (b[8], a2)])))
+    return u, v
+
+
+def mat_exp(a: Matrix, terms: Optional[int] = None) -> Matrix:
+    """
+    Matrix exponential by scaling and squaring with a Pade approximant.
+
+    The degree (3, 5, 7, 9 or 13) is chosen from the 1-norm of ``a``; above
+    ``PADE_THETA[13]`` the matrix is scaled by ``2**-s`` and the result
+    squared ``s`` times.  This costs at most 6 products, one solve and the
+    squarings, against 19 products for the 20-term Taylor series.  Passing
+    ``terms`` keeps the old truncated series (``mat_exp_taylor``).
+    """
+    if terms is not None:
+        return mat_exp_taylor(a, terms)
+    (a,), be, back = _series_operand(a)
+    n, m = be.shape(a)
     assert n == m, "Matrix exp requires square matrix"
-    result = mat_eye(n)
-    term = mat_eye(n)
+    norm = be.norm1(a)
+    s = 0
+    for degree in (3, 5, 7, 9):
+        if norm <= PADE_THETA[degree]:
+            break
+    else:
+        degree = 13
+        if norm > PADE_THETA[13]:
+            s = max(0, math.ceil(math.log2(norm / PADE_THETA[13])))
+            a = be.scale(a, 2.0 ** -s)
+    u, v = _pade_uv(be, a, degree)
+    q = be.add(v, be.scale(u, -1))
+    result = be.solve(q, be.axpy(v, 1.0, u))
+    spare = None
+    for _ in range(s):
+        result, spare = be.mul_into(result, result, spare), result
+    return back(result)
+
+
+def mat_exp_taylor(a: Matrix, terms: int = 20) -> Matrix:
+    (a,), be, back = _series_operand(a)
+    n, m = be.shape(a)
+    assert n == m, "Matrix exp requires square matrix"
+    result = be.eye(n)
+    term, spare = be.eye(n), None
 
     for k in range(1, terms):
-        term = mat_mul(term, a)
-        term = [[x / k for x in row] for row in term]
-        result = mat_add(result, term)
+        term, spare = be.mul_into(term, a, spare), term
+        term = be.iscale(term, 1 / k)
+        result = be.axpy(result, 1.0, term)
 
-    return result
+    return back(result)
 
 
-def mat_sin(a: Matrix, terms: int = 20) -> Matrix:
-    n, m = mat_shape(a)
-    assert n == m, "Matrix sin requires square matrix"
-    result = [[0]*n for _ in range(n)]
-    term = a
-
-    sign = 1
-    for k in range(1, terms, 2):
-        if sign == 1:
-            result = mat_add(result, term)
-        else:
-            result = mat_add(result, [[-x for x in row] for row in term])
-        term = mat_mul(term, mat_mul(a, a))
-        term = [[x / ((k+1)*(k+2)) for x in row] for row in term]
-        sign *= -1
+# theta_m: largest 1-norm of ``t A`` for which m Taylor terms of
+# ``exp(t A) v`` are accurate to double precision (Al-Mohy & Higham, 2011).
+EXPMV_THETA = {
+    1: 2.29e-16, 2: 2.58e-8, 3: 1.39e-5, 4: 3.40e-4, 5: 2.40e-3, 6: 9.07e-3, 7: 2.38e-2, 8: 5.00e-2,
+    9: 8.96e-2, 10: 1.44e-1, 11: 2.14e-1, 12: 3.00e-1, 13: 4.00e-1, 14: 5.14e-1, 15: 6.41e-1,
+    16: 7.81e-1, 17: 9.31e-1, 18: 1.09, 19: 1.26, 20: 1.44, 21: 1.62, 22: 1.82, 23: 2.01, 24: 2.22,
+    25: 2.43, 26: 2.64, 27: 2.86, 28: 3.08, 29: 3.31, 30: 3.54, 35: 4.7, 40: 6.0, 45: 7.2, 50: 8.5, 55: 9.9,
+}
+EXPMV_TOL = 2.0 ** -53
 
-    return result
 
+def _expmv_degree(norm: float) -> Tuple[int, int]:
+    # Taylor degree m and step count s minimizing the m * s products.
+    if norm == 0:
+        return 0, 1
+    best = None
+    for m, theta in EXPMV_THETA.items():
+        s = max(1, math.ceil(norm / theta))
+        if best is None or m * s < best[0] * best[1]:
+            best = (m, s)
+    return best
 
-def mat_cos(a: Matrix, terms: int = 20) -> Matrix:
-    n, m = mat_shape(a)
-    assert n == m, "Matrix cos requires square matrix"
-    result = mat_eye(n)
-    term = mat_eye(n)
-
-    sign = 1
-    for k in range(0, terms):
-        if sign == 1:
-            result = mat_add(result, term)
-        else:
-            result = mat_add(result, [[-x for x in row] for row in term])
-        term = mat_mul(term, mat_mul(a, a))
-        term = [[x / ((2*k+1)*(2*k+2)) for x in row] for row in term]
-        sign *= -1
 
-    return result
+def _norm1(x: Any) -> float:
+    return _backend(x).norm1(x)
+
+
+def _expmv_step(a: Any, b: Any, t: float, norm: float, mu: Any, stats: Any) -> Any:
+    m, s = _expmv_degree(abs(t) * norm)
+    eta = None if mu is None else eval_scalar_func("exp", [mu * (t / s)])
+    for _ in range(s):
+        f = b
+        c1 = _norm1(b)
+        for j in range(1, m + 1):
+            be = _backend(a, b)
+            if stats is not None:
+                stats.add(matmuls=1, matmul_flops=mul_flops(be.shape(a), be.shape(b)))
+            b = _scale(be.mul(a, b), t / (s * j))
+            c2 = _norm1(b)
+            f = _backend(f, b).add(f, b)
+            if c1 + c2 <= EXPMV_TOL * _norm1(f):
+                break
+            c1 = c2
+        b = f if eta is None else _scale(f, eta)
+    return b
+
+
+def expm_multiply(a: Matrix, v: Matrix, t: Any = 1.0, stats: Any = None) -> Any:
+    """
+    ``exp(t a) @ v`` from products with ``v`` only, without forming ``exp(t a)``.
+
+    Truncated Taylor series over ``s`` steps of ``exp(t a / s)`` (Al-Mohy
+    and Higham, 2011): the degree ``m`` and ``s`` minimize the ``m s``
+    matrix-vector products for the 1-norm of ``t a``, ``a`` is shifted by
+    ``trace(a) / n`` when that lowers the norm, and each series stops once
+    two consecutive terms are negligible.  ``v`` is usually a single
+    column.  ``t`` may also be a sequence: the sorted values are reached by
+    stepping from one to the next, and the results are returned as a list
+    in the given order.
+    """
+    (a, v), be, back = _series_operand(a, v)
+    n, m = be.shape(a)
+    assert n == m, "Matrix exp requires square matrix"
+    single = isinstance(t, (int, float)) or (np is not None and np.ndim(t) == 0)
+    ts = [t] if single else list(t)
+
+    mu = be.trace(a) / n
+    shifted = be.add(a, _scale(be.eye(n), -mu))
+    norm, shifted_norm = be.norm1(a), _norm1(shifted)
+    if shifted_norm < norm:
+        a, norm = shifted, shifted_norm
+    else:
+        mu = None
+
+    results: List[Any] = [None] * len(ts)
+    b, at = v, 0.0
+    for i in sorted(range(len(ts)), key=lambda i: ts[i]):
+        b = _expmv_step(a, b, ts[i] - at, norm, mu, stats)
+        at = ts[i]
+        results[i] = back(b)
+    return results[0] if single else results
+
+
+def _trig_terms(norm: float) -> int:
+    # Smallest K with norm**(2K) / (2K)! below double precision.
+    k, bound = 1, norm * norm / 2
+    while bound > 1.1e-16 and k < 40:
+        bound *= norm * norm / ((2 * k + 1) * (2 * k + 2))
+        k += 1
+    return k
+
+
+def mat_sincos(a: Matrix) -> Tuple[Matrix, Matrix]:
+    """
+    ``(sin(a), cos(a))`` from one shared chain of even powers.
+
+    ``a`` is first scaled by ``2**-s`` so that its 1-norm is at most 1, both
+    Taylor series are summed over the same powers of ``a @ a`` (sin takes a
+    final product with ``a``), and the scaling is undone with the double
+    angle formulas ``sin 2x = 2 sin x cos x``, ``cos 2x = 2 cos^2 x - I``.
+    """
+    (a,), be, back = _series_operand(a)
+    n, m = be.shape(a)
+    assert n == m, "Matrix sin/cos requires square matrix"
+    norm = be.norm1(a)
+    s = max(0, math.ceil(math.log2(norm))) if norm > 1 else 0
+    if s:
+        a = be.scale(a, 2.0 ** -s)
+        norm *= 2.0 ** -s
+
+    a2 = be.mul(a, a)
+    power, spare = be.eye(n), None
+    cos_sum = be.eye(n)
+    sin_sum = be.eye(n)
+    cos_c = sin_c = 1.0
+    for k in range(1, _trig_terms(norm) + 1):
+        power, spare = be.mul_into(power, a2, spare), power
+        cos_c /= -(2 * k - 1) * (2 * k)
+        sin_c /= -(2 * k) * (2 * k + 1)
+        cos_sum = be.axpy(cos_sum, cos_c, power)
+        sin_sum = be.axpy(sin_sum, sin_c, power)
+    sin_a = be.mul(a, sin_sum)
+    cos_a = cos_sum
+
+    ident = be.eye(n)
+    for _ in range(s):
+        sin_a, spare = be.iscale(be.mul_into(sin_a, cos_a, spare), 2), sin_a
+        cos_a, spare = be.axpy(be.iscale(be.mul_into(cos_a, cos_a, spare), 2), -1.0, ident), cos_a
+    return back(sin_a), back(cos_a)
+
+
+def mat_sin(a: Matrix, terms: Optional[int] = None) -> Matrix:
+    """``sin(a)`` from ``mat_sincos``; ``terms`` is accepted for compatibility and ignored."""
+    return mat_sincos(a)[0]
+
+
+def mat_cos(a: Matrix, terms: Optional[int] = None) -> Matrix:
+    """``cos(a)`` from ``mat_sincos``; ``terms`` is accepted for compatibility and ignored."""
+    return mat_sincos(a)[1]
+
+
+def _dense_operand(a: Any) -> Any:
+    # Kernels whose result fills in (the logarithm) take sparse operands as
+    # a dense matrix: an ndarray for scipy.sparse, nested lists for CSR/COO.
+    be = _backend(a)
+    if not be.sparse:
+        return a
+    return a.toarray() if hasattr(a, "toarray") else be.tolist(a)
 
 
 def is_diagonal_matrix(M):
+    M = _dense_operand(M)
+    if np is not None and isinstance(M, np.ndarray):
+        n = M.shape[-1]
+        return bool(np.all(np.abs(M * (1 - np.eye(n))) <= 1e-12))
     n = len(M)
     for i in range(n):
         for j in range(n):
@@ -166,109 +532,628 @@ def is_diagonal_matrix(M):
     return True
 
 
+def _gauss_legendre(m: int) -> List[Tuple[float, float]]:
+    # Nodes and weights of the m-point Gauss-Legendre rule mapped to [0, 1].
+    rule = []
+    for i in range(1, m + 1):
+        x = math.cos(math.pi * (i - 0.25) / (m + 0.5))
+        for _ in range(100):
+            p0, p1 = 1.0, x
+            for k in range(2, m + 1):
+                p0, p1 = p1, ((2 * k - 1) * x * p1 - (k - 1) * p0) / k
+            dp = m * (x * p1 - p0) / (x * x - 1)
+            dx = p1 / dp
+            x -= dx
+            if abs(dx) < 1e-16:
+                break
+        p0, p1 = 1.0, x
+        for k in range(2, m + 1):
+            p0, p1 = p1, ((2 * k - 1) * x * p1 - (k - 1) * p0) / k
+        dp = m * (x * p1 - p0) / (x * x - 1)
+        rule.append(((x + 1) / 2, 1 / ((1 - x * x) * dp * dp)))
+    return rule
+
+
+# log(I + X) = sum_j w_j X (I + x_j X)^-1 is the [8/8] Pade approximant,
+# accurate to double precision once ||X||_1 <= LOG_PADE_RADIUS.
+LOG_PADE_RADIUS = 0.25
+LOG_QUADRATURE = _gauss_legendre(8)
+SQRT_MAX_ITER = 100
+
+
+def mat_sqrt(a: Matrix) -> Matrix:
+    """Principal square root by the Denman-Beavers iteration."""
+    be = _backend(a)
+    n, m = be.shape(a)
+    assert n == m, "Matrix sqrt requires square matrix"
+    y, z = a, be.eye(n)
+    prev = math.inf
+    for _ in range(SQRT_MAX_ITER):
+        y_inv = be.inverse(y)
+        z_inv = be.inverse(z)
+        if y_inv is None or z_inv is None:
+            raise ValueError("Matrix sqrt requires a nonsingular matrix")
+        y_next = be.scale(be.add(y, z_inv), 0.5)
+        z = be.scale(be.add(z, y_inv), 0.5)
+        step = be.norm1(be.add(y_next, be.scale(y, -1)))
+        y = y_next
+        scale = be.norm1(y)
+        if step <= 1e-14 * scale or (step <= 1e-8 * scale and step >= prev):
+            return y
+        prev = step
+    raise ValueError("Matrix sqrt did not converge (eigenvalues on the closed negative real axis?)")
+
+
+def mat_log(a: Matrix) -> Matrix:
+    """
+    Principal matrix logarithm by inverse scaling and squaring.
+
+    Square roots are taken until ``||A - I||_1 <= LOG_PADE_RADIUS``, the
+    logarithm of the result comes from the Gauss-Legendre form of the
+    [8/8] Pade approximant, and the ``s`` square roots are undone by
+    multiplying by ``2**s``.  Raises ``ValueError`` when no real logarithm
+    exists.
+    """
+    be = _backend(a)
+    n, m = be.shape(a)
+    assert n == m, "Matrix log requires square matrix"
+    ident = be.eye(n)
+    s = 0
+    x = be.add(a, be.scale(ident, -1))
+    while be.norm1(x) > LOG_PADE_RADIUS:
+        if s >= 64:
+            raise ValueError("Matrix log did not converge")
+        a = mat_sqrt(a)
+        s += 1
+        x = be.add(a, be.scale(ident, -1))
+
+    result = None
+    for node, weight in LOG_QUADRATURE:
+        term = be.solve(be.add(ident, be.scale(x, node)), x)
+        if term is None:
+            raise ValueError("Matrix log requires a nonsingular matrix")
+        term = be.scale(term, weight)
+        result = term if result is None else be.add(result, term)
+    return be.scale(result, 2.0 ** s)
+
+
 def mat_log_numeric(M):
+    M = _dense_operand(M)
     if not is_diagonal_matrix(M):
-        raise ValueError("Only diagonal numeric matrices supported for log")
+        return mat_log(M)
 
+    if np is not None and isinstance(M, np.ndarray):
+        d = np.diagonal(M, axis1=-2, axis2=-1)
+        if np.any(d <= 0):
+            raise ValueError("Matrix log requires positive diagonal entries")
+        return np.eye(M.shape[-1]) * np.log(d)[..., None, :]
     n = len(M)
     res = [[0]*n for _ in range(n)]
     for i in range(n):
         if M[i][i] <= 0:
             raise ValueError("Matrix log requires positive diagonal entries")
         res[i][i] = math.log(M[i][i])
-    return res
+    return _backend(M).asmatrix(res)
+
+
+def mat_power(a: Matrix, p: float) -> Matrix:
+    """
+    Real power ``A**p``: repeated squaring for the integer part (through the
+    inverse when ``p < 0``) and ``exp(f log A)`` or ``sqrt(A)`` for the
+    fractional part ``f``.
+    """
+    be = _backend(a)
+    if p < 0:
+        a = be.inverse(a)
+        if a is None:
+            raise ValueError("Negative matrix power of a singular matrix")
+        p = -p
+    k = int(math.floor(p))
+    frac = p - k
+    result = mat_pow(a, k)
+    if frac == 0:
+        return result
+    if frac == 0.5:
+        root = mat_sqrt(a)
+    else:
+        root = mat_exp(be.scale(mat_log_numeric(a), frac))
+    return root if k == 0 else be.mul(result, root)
 
 
 def is_matrix(x: Any) -> bool:
-    return isinstance(x, list) and x and isinstance(x[0], list)
+    return backend_for(x) is not None
 
 
 def is_scalar(x: Any) -> bool:
-    return isinstance(x, (int, float))
+    """Numbers, plus 1-D arrays holding one scalar per entry of a batch."""
+    if isinstance(x, (int, float)):
+        return True
+    return np is not None and (isinstance(x, np.number) or (isinstance(x, np.ndarray) and x.ndim <= 1))
+
 
+def _scale(a: Any, s: Any) -> Any:
+    if np is not None and isinstance(s, np.ndarray) and s.ndim == 1:
+        return get_backend("batched").scale(a, s)
+    return _backend(a).scale(a, s)
 
-def eval_expr(expr: Expr, env: Dict[str, Any]) -> Any:
+
+def scalar_slogdet(a: Any) -> Tuple[Any, Any]:
+    """``(sign, log|a|)`` of a 1x1 value: a number or a batch of numbers."""
+    if np is not None and isinstance(a, np.ndarray):
+        with np.errstate(divide="ignore"):
+            return np.sign(a), np.log(np.abs(a))
+    return (a > 0) - (a < 0), math.log(abs(a)) if a else -math.inf
+
+
+@dataclass
+class EvalStats:
+    """Counters filled by ``eval_expr(..., stats=EvalStats())``."""
+
+    matmul_flops: int = 0
+    matmuls: int = 0
+    memo_hits: int = 0
+    memo_misses: int = 0
+    flops_avoided: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        """Increment counters; safe from the ``workers`` threads."""
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+
+class _EvalContext:
+    """State shared by one ``eval_expr`` call."""
+
+    def __init__(self, expr: Expr, backend: Union[Backend, None], factors: Union[FactorCache, None] = None,
+                 stats: Union[EvalStats, None] = None, profile: Any = None):
+        self.backend = backend
+        self.factors = FactorCache() if factors is None else factors
+        self.stats = stats
+        self.profile = profile
+        self.memo: Dict[Expr, Any] = {}
+        self.flops_memo: Dict[Expr, int] = {}
+        self.sincos_args = _paired_trig_args(expr)
+        self.sincos: Dict[Expr, Tuple[Any, Any]] = {}
+        # Nodes evaluated by a ``parallel.Scheduler`` task and not read yet.
+        self.fresh: set = set()
+
+
+def _paired_trig_args(expr: Expr) -> set:
+    found: Dict[str, set] = {"sin": set(), "cos": set()}
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Func) and node.name in found and len(node.args) == 1:
+            found[node.name].add(node.args[0])
+        stack.extend(operands(node))
+    return found["sin"] & found["cos"]
+
+
+def eval_expr(expr: Expr, env: Dict[str, Any], backend: Union[str, Backend, None] = None,
+              factors: Union[FactorCache, None] = None, optimize: bool = True,
+              stats: Union[EvalStats, None] = None, workers: Union[int, None] = None,
+              memory: Union[int, None] = None, profile: Any = None) -> Any:
+    """
+    Evaluate ``expr`` numerically with the matrices bound in ``env``.
+
+    Each node runs on the backend that owns its operands, and each distinct
+    subexpression once per call; nodes that cannot be evaluated (a singular
+    inverse, an unbound variable) stay symbolic.  The kernels and fused
+    paths are described in the matrix section of the README.
+
+    - ``backend``: convert every bound matrix to this backend first.
+    - ``factors``: ``FactorCache`` for the factorizations (a fresh one per call by default).
+    - ``optimize``: re-associate product chains into their cheapest order first.
+    - ``stats``: ``EvalStats`` counting product flops, memo hits and the flops they avoided.
+    - ``workers``: evaluate independent subtrees on this many threads.
+    - ``memory``: cap, in bytes, on the intermediate results alive at once (with ``workers``).
+    - ``profile``: ``Profiler`` recording the kernel, time and size of every node.
+    """
+    if optimize:
+        expr = optimize_chains(expr)
+    ctx = _EvalContext(expr, get_backend(backend), factors, stats, profile)
+    if profile is not None:
+        with profile:
+            return _run(expr, env, ctx, workers, memory)
+    return _run(expr, env, ctx, workers, memory)
+
+
+def _run(expr: Expr, env: Dict[str, Any], ctx: _EvalContext, workers: Union[int, None],
+         memory: Union[int, None]) -> Any:
+    if workers is not None or memory is not None:
+        from .parallel import Scheduler
+        return Scheduler(workers, memory).run(expr, env, ctx)
+    return _eval(expr, env, ctx)
+
+
+def _eval(expr: Expr, env: Dict[str, Any], ctx: _EvalContext) -> Any:
+    if isinstance(expr, (Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron)):
+        # Every distinct subexpression is evaluated once per call.
+        memo = ctx.memo
+        if expr in memo:
+            if ctx.fresh and expr in ctx.fresh:
+                # First read of a scheduled task's result: counted as its miss.
+                try:
+                    ctx.fresh.remove(expr)
+                    return memo[expr]
+                except KeyError:
+                    pass
+            if ctx.stats is not None:
+                ctx.stats.add(memo_hits=1, flops_avoided=subtree_flops(expr, ctx.flops_memo))
+            return memo[expr]
+        if ctx.stats is not None:
+            ctx.stats.add(memo_misses=1)
+        if ctx.profile is None:
+            memo[expr] = value = _eval_node(expr, env, ctx)
+        else:
+            memo[expr] = value = ctx.profile.evaluate(expr, env, ctx, _eval_node)
+        return value
+    return _eval_node(expr, env, ctx)
+
+
+def _eval_node(expr: Expr, env: Dict[str, Any], ctx: _EvalContext) -> Any:
     if isinstance(expr, Const):
-        if expr.name.isdigit():
+        if expr.name == "I":
+            be = ctx.backend or backend_for(*env.values()) or PYTHON
+            return be.eye(expr.shape[0])
+        try:
             return float(expr.name)
-        return expr
+        except ValueError:
+            return expr
 
     if isinstance(expr, Var):
-        return env.get(expr.name, expr)
+        value = env.get(expr.name, expr)
+        if ctx.backend is not None and is_matrix(value):
+            return ctx.backend.asmatrix(value)
+        return value
 
     if isinstance(expr, Add):
-        a = eval_expr(expr.a, env)
-        b = eval_expr(expr.b, env)
+        a = _eval(expr.a, env, ctx)
+        b = _eval(expr.b, env, ctx)
 
         if is_matrix(a) and is_matrix(b):
-            return mat_add(a, b)
+            return _backend(a, b).add(a, b)
         if is_scalar(a) and is_scalar(b):
             return a + b
         return Add(a, b)
 
     if isinstance(expr, Mul):
-        a = eval_expr(expr.a, env)
-        b = eval_expr(expr.b, env)
+        solved = _sparse_solve(expr, env, ctx)
+        if solved is not None:
+            if ctx.profile is not None:
+                ctx.profile.note("sparse_solve")
+            return solved
+        action = _exp_action(expr, env, ctx)
+        if action is not None:
+            if ctx.profile is not None:
+                ctx.profile.note("expm_multiply")
+            return action
+        action = _kron_action(expr, env, ctx)
+        if action is not None:
+            if ctx.profile is not None:
+                ctx.profile.note("kron_mul")
+            return action
+        a = _eval(expr.a, env, ctx)
+        b = _eval(expr.b, env, ctx)
 
         if is_matrix(a) and is_matrix(b):
-            return mat_mul(a, b)
+            be = _backend(a, b)
+            kernel = mul_kernel(tags(expr.a), tags(expr.b)) if is_dense(a, b) else None
+            if ctx.stats is not None:
+                ctx.stats.add(matmuls=1, matmul_flops=(be.shape(a)[0] * be.shape(b)[1] if kernel is not None
+                                                       else mul_flops(be.shape(a), be.shape(b))))
+            if kernel is not None and ctx.profile is not None:
+                ctx.profile.note(kernel.__name__)
+            return be.mul(a, b) if kernel is None else kernel(a, b)
         if is_scalar(a) and is_scalar(b):
             return a * b
         if is_scalar(a) and is_matrix(b):
-            return [[a * x for x in row] for row in b]
+            return _scale(b, a)
         if is_matrix(a) and is_scalar(b):
-            return [[x * b for x in row] for row in a]
+            return _scale(a, b)
 
         return Mul(a, b)
 
     if isinstance(expr, Transpose):
-        a = eval_expr(expr.x, env)
+        a = _eval(expr.x, env, ctx)
         if is_matrix(a):
-            return mat_transpose(a)
+            return _backend(a).transpose(a)
+        if is_scalar(a):
+            return a
         return Transpose(a)
 
     if isinstance(expr, Inverse):
-        a = eval_expr(expr.x, env)
+        a = _eval(expr.x, env, ctx)
 
         if is_matrix(a):
-            inv = mat_inverse(a)
+            be = _backend(a)
+            t = tags(expr.x)
+            kernel = inverse_kernel(t) if is_dense(a) else None
+            if kernel is not None:
+                inv = kernel(a)
+            else:
+                inv = factor(a, t, ctx.factors).inverse() if be.factorizable else be.inverse(a)
             if inv is None:
                 return Inverse(expr.x)
             return inv
+        if is_scalar(a) and (np is not None and isinstance(a, np.ndarray) or a):
+            return 1.0 / a
         return Inverse(expr.x)
 
+    if isinstance(expr, Solve):
+        a = _eval(expr.a, env, ctx)
+        b = _eval(expr.b, env, ctx)
+        if is_matrix(a) and is_matrix(b):
+            be = _backend(a, b)
+            t = tags(expr.a)
+            kernel = solve_kernel(t) if is_dense(a, b) else None
+            if kernel is not None:
+                x = kernel(a, b)
+            elif be.factorizable and be is _backend(a):
+                x = factor(a, t, ctx.factors).solve(b)
+            else:
+                x = be.solve(a, b)
+            return Solve(expr.a, expr.b) if x is None else x
+        if is_scalar(a) and is_scalar(b):
+            return b / a
+        return Solve(expr.a, expr.b)
+
+    if isinstance(expr, (Hadamard, Kron)):
+        a = _eval(expr.a, env, ctx)
+        b = _eval(expr.b, env, ctx)
+        if is_matrix(a) and is_matrix(b):
+            be = _backend(a, b)
+            return be.hadamard(a, b) if isinstance(expr, Hadamard) else be.kron(a, b)
+        if is_scalar(a) and is_scalar(b):
+            return a * b
+        if isinstance(expr, Kron) and (is_scalar(a) or is_scalar(b)):
+            return _scale(b, a) if is_scalar(a) else _scale(a, b)
+        return type(expr)(expr.a, expr.b)
+
+    if isinstance(expr, Trace):
+        if isinstance(expr.x, Mul) and expr.x not in ctx.memo:
+            value = _trace_product(expr.x, env, ctx)
+            if value is not None:
+                if ctx.profile is not None:
+                    ctx.profile.note("trace_mul")
+                return value
+        a = _eval(expr.x, env, ctx)
+        if is_matrix(a):
+            return _backend(a).trace(a)
+        if is_scalar(a):
+            return a
+        return Trace(a)
+
+    if isinstance(expr, (Det, LogDet)):
+        a = _eval(expr.x, env, ctx)
+        if is_scalar(a):
+            if isinstance(expr, Det):
+                return a
+            sign, logabs = scalar_slogdet(a)
+            if np is not None and isinstance(sign, np.ndarray):
+                return np.where(sign > 0, logabs, np.nan)
+            return logabs if sign > 0 else expr
+        if not is_matrix(a):
+            return expr
+        be = _backend(a)
+        t = tags(expr.x)
+        triangular = bool(t & TRIANGULAR) and is_dense(a)
+        if isinstance(expr, Det):
+            if triangular:
+                return triangular_det(a)
+            return factor(a, t, ctx.factors).det() if be.factorizable else be.det(a)
+        if triangular:
+            sign, logabs = triangular_slogdet(a)
+        else:
+            sign, logabs = factor(a, t, ctx.factors).slogdet() if be.factorizable else be.slogdet(a)
+        if np is not None and isinstance(sign, np.ndarray):
+            return np.where(sign > 0, logabs, np.nan)
+        return logabs if sign > 0 else expr
+
+    if isinstance(expr, ScalarMul):
+        s = _eval(expr.scalar, env, ctx)
+        m = _eval(expr.mat, env, ctx)
+        if is_scalar(s) and is_matrix(m):
+            return _scale(m, s)
+        if is_scalar(s) and is_scalar(m):
+            return s * m
+        return ScalarMul(s, m)
+
     if isinstance(expr, Func):
-        evaluated_args = [eval_expr(a, env) for a in expr.args]
+        evaluated_args = [_eval(a, env, ctx) for a in expr.args]
         if all(is_scalar(x) for x in evaluated_args):
             return eval_scalar_func(expr.name, evaluated_args)
+        if (expr.name in NUMPY_SCALAR_FUNCS and DIAGONAL in tags(expr.args[0]) and is_dense(evaluated_args[0])
+                and all(is_scalar(x) for x in evaluated_args[1:])):
+            value = diagonal_func(expr.name, evaluated_args[0], evaluated_args[1:])
+            if value is not None:
+                if ctx.profile is not None:
+                    ctx.profile.note(f"diagonal_{expr.name}")
+                return value
+        value = _eigen_func(expr, evaluated_args, ctx.factors)
+        if value is not None:
+            if ctx.profile is not None:
+                ctx.profile.note(f"eigh_{expr.name}")
+            return value
         if expr.name == "pow" and len(evaluated_args) == 2:
             base, expn = evaluated_args
-            if is_matrix(base) and isinstance(expn, (int, float)) and float(expn).is_integer():
-                return mat_pow(base, int(expn))
+            if is_matrix(base) and is_scalar(expn):
+                if float(expn).is_integer() and expn >= 0:
+                    return mat_pow(base, int(expn))
+                try:
+                    return mat_power(base, float(expn))
+                except ValueError:
+                    return expr
 
         if expr.name == "exp" and len(evaluated_args) == 1:
             if is_matrix(evaluated_args[0]):
                 return mat_exp(evaluated_args[0])
 
-        if expr.name == "sin" and len(evaluated_args) == 1:
-            if is_matrix(evaluated_args[0]):
-                return mat_sin(evaluated_args[0])
-
-        if expr.name == "cos" and len(evaluated_args) == 1:
-            if is_matrix(evaluated_args[0]):
-                return mat_cos(evaluated_args[0])
-        if expr.name == "ln":
+        if expr.name in ("sin", "cos") and len(evaluated_args) == 1:
+            arg = evaluated_args[0]
+            if is_matrix(arg) and expr.args[0] in ctx.sincos_args:
+                if ctx.profile is not None:
+                    ctx.profile.note("sincos")
+                if expr.args[0] not in ctx.sincos:
+                    ctx.sincos[expr.args[0]] = mat_sincos(arg)
+                return ctx.sincos[expr.args[0]][0 if expr.name == "sin" else 1]
+            if is_matrix(arg):
+                return mat_sin(arg) if expr.name == "sin" else mat_cos(arg)
+        if expr.name in ("ln", "log") and len(evaluated_args) == 1:
             arg = evaluated_args[0]
             if is_matrix(arg):
                 try:
                     return mat_log_numeric(arg)
-                except Exception:
+                except ValueError:
                     return expr
         return Func(expr.name, tuple(evaluated_args))
     return expr
 
 
+NUMPY_SCALAR_FUNCS = {
+    "exp": "exp", "ln": "log", "log": "log", "sin": "sin", "cos": "cos", "tan": "tan",
+    "sinh": "sinh", "cosh": "cosh", "tanh": "tanh",
+    "asin": "arcsin", "acos": "arccos", "atan": "arctan", "pow": "power",
+}
+
+
+def _sparse_solve(expr: Mul, env: Dict[str, Any], ctx: _EvalContext) -> Any:
+    # inv(A) @ B -> solve(A, B) and B @ inv(A) -> solve(A^T, B^T)^T when A is
+    # sparse, so the dense inverse is never formed.
+    for inv, other, left in ((expr.a, expr.b, True), (expr.b, expr.a, False)):
+        if not isinstance(inv, Inverse):
+            continue
+        a = _eval(inv.x, env, ctx)
+        if not (is_matrix(a) and _backend(a).sparse):
+            continue
+        b = _eval(other, env, ctx)
+        if not is_matrix(b):
+            continue
+        be = _backend(a)
+        if left:
+            return be.solve(a, b)
+        x = be.solve(be.transpose(a), be.transpose(b))
+        return None if x is None else be.transpose(x)
+    return None
+
+
+def diagonal_func(name: str, a: Any, rest: List[Any]) -> Any:
+    """
+    ``f(a)`` for a diagonal matrix ``a``: ``f`` applied to the n diagonal
+    entries only.  ``None`` when ``f`` is not finite on some entry (``ln``
+    of a non-positive entry, ...), leaving the case to the dense kernels.
+    """
+    d = diagonal(a)
+    if np is not None and isinstance(d, np.ndarray):
+        with np.errstate(all="ignore"):
+            values = eval_scalar_func(name, [d] + list(rest))
+        return from_diagonal(values) if np.all(np.isfinite(values)) else None
+    try:
+        values = [eval_scalar_func(name, [x] + list(rest)) for x in d]
+    except (ValueError, OverflowError, ZeroDivisionError):
+        return None
+    return _backend(a).asmatrix(from_diagonal(values))
+
+
+def eigen_func(name: str, fac: Eigen, rest: List[Any]) -> Any:
+    """
+    ``f(a) = Q f(w) Q^T`` from the eigendecomposition ``fac`` of a symmetric
+    ``a``: ``f`` at the n eigenvalues and one O(n^3) product.  ``None`` when
+    ``f`` is not finite on some eigenvalue (``ln`` of a non-positive one, ...).
+    """
+    w = fac.w
+    if np is not None and isinstance(w, np.ndarray):
+        with np.errstate(all="ignore"):
+            values = eval_scalar_func(name, [w] + list(rest))
+        return fac.apply(values) if np.all(np.isfinite(values)) else None
+    try:
+        values = [eval_scalar_func(name, [x] + list(rest)) for x in w]
+    except (ValueError, OverflowError, ZeroDivisionError):
+        return None
+    return fac.apply(values)
+
+
+def _eigen_func(expr: Func, args: List[Any], factors: FactorCache) -> Any:
+    # f(A) for a symmetric A through its eigendecomposition, cached per matrix
+    # in ``factors`` so every function of A shares it.  Integer powers keep
+    # repeated squaring unless the decomposition is already there.
+    a, rest = args[0], args[1:]
+    if (expr.name not in NUMPY_SCALAR_FUNCS or not is_dense(a)
+            or not all(isinstance(x, (int, float)) or (np is not None and isinstance(x, np.number))
+                       for x in rest)):
+        return None
+    if factors.peek(a, "eigh") is None:
+        if expr.name == "pow" and float(rest[0]).is_integer():
+            return None
+        if SYMMETRIC not in tags(expr.args[0]) and not is_symmetric(a):
+            return None
+    return eigen_func(expr.name, factors.get(a, "eigh"), rest)
+
+
+def _exp_action(expr: Mul, env: Dict[str, Any], ctx: _EvalContext) -> Any:
+    # exp(A) @ v with a column v: matrix-vector products only, unless exp(A)
+    # has already been formed or A is diagonal.
+    f = expr.a
+    if not (isinstance(f, Func) and f.name == "exp" and len(f.args) == 1 and expr.shape[1] == 1
+            and f.shape[0] > 1 and f not in ctx.memo and DIAGONAL not in tags(f.args[0])):
+        return None
+    a = _eval(f.args[0], env, ctx)
+    if not is_matrix(a):
+        return None
+    v = _eval(expr.b, env, ctx)
+    if not is_matrix(v):
+        return None
+    return expm_multiply(a, v, stats=ctx.stats)
+
+
+def _kron_action(expr: Mul, env: Dict[str, Any], ctx: _EvalContext) -> Any:
+    # kron(A, B) @ V as A V B^T per column of V, and V @ kron(A, B) through
+    # the transposes, without forming the Kronecker product.
+    for k, other, left in ((expr.a, expr.b, True), (expr.b, expr.a, False)):
+        if not isinstance(k, Kron) or k in ctx.memo:
+            continue
+        a = _eval(k.a, env, ctx)
+        b = _eval(k.b, env, ctx)
+        if not (is_matrix(a) and is_matrix(b)):
+            continue
+        v = _eval(other, env, ctx)
+        if not is_matrix(v):
+            continue
+        be = _backend(a, b, v)
+        if left:
+            return be.kron_mul(a, b, v)
+        return be.transpose(be.kron_mul(be.transpose(a), be.transpose(b), be.transpose(v)))
+    return None
+
+
+def _trace_product(x: Mul, env: Dict[str, Any], ctx: _EvalContext) -> Any:
+    # trace(A B) as the sum of A_ij B_ji, and trace(A^T B) or trace(A B^T) as
+    # the sum of A_ij B_ij: neither the product nor the transpose is formed.
+    a, b = x.a, x.b
+    if isinstance(a, Inverse) or isinstance(b, Inverse):
+        return None
+    inner = False
+    if isinstance(a, Transpose) and a not in ctx.memo:
+        a, inner = a.x, True
+    elif isinstance(b, Transpose) and b not in ctx.memo:
+        b, inner = b.x, True
+    u = _eval(a, env, ctx)
+    w = _eval(b, env, ctx)
+    if not (is_matrix(u) and is_matrix(w)):
+        return None
+    be = _backend(u, w)
+    return be.inner(u, w) if inner else be.trace_mul(u, w)
+
+
 def eval_scalar_func(name: str, args: List[Any]) -> Any:
+    if np is not None and any(isinstance(a, np.ndarray) for a in args):
+        if name not in NUMPY_SCALAR_FUNCS:
+            raise ValueError(f"Unknown scalar function: {name}")
+        return getattr(np, NUMPY_SCALAR_FUNCS[name])(*(args if name == "pow" else args[:1]))
     if name == "exp":
         return math.exp(args[0])
     if name in ("ln", "log"):
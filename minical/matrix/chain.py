@@ -0,0 +1,144 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from .core import (
+    Expr, Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron, Shape, operands,
+)
+from .cost import mul_flops
+
+
+# Nodes with children ``a`` and ``b`` other than ``Mul``.
+_BINARY = (Add, Solve, Hadamard, Kron)
+
+
+def flatten_mul(expr: Expr) -> List[Expr]:
+    if isinstance(expr, Mul):
+        return flatten_mul(expr.a) + flatten_mul(expr.b)
+    return [expr]
+
+
+def written_flops(expr: Expr) -> int:
+    """Flops of the products of a ``Mul`` tree in the association order written."""
+    if not isinstance(expr, Mul):
+        return 0
+    return written_flops(expr.a) + written_flops(expr.b) + mul_flops(expr.a.shape, expr.b.shape)
+
+
+def chain_order(shapes: List[Shape]) -> Tuple[int, List[List[int]]]:
+    """
+    Classic O(k^3) dynamic program over a chain of ``k`` matrix shapes.
+
+    Returns the minimal flop count and the split table: ``split[i][j]`` is
+    the index ``s`` such that ``(M_i..M_s)(M_s+1..M_j)`` is optimal.
+    """
+    k = len(shapes)
+    dims = [shapes[0][0]] + [s[1] for s in shapes]
+    cost = [[0] * k for _ in range(k)]
+    split = [[0] * k for _ in range(k)]
+    for length in range(2, k + 1):
+        for i in range(k - length + 1):
+            j = i + length - 1
+            best = None
+            for s in range(i, j):
+                c = cost[i][s] + cost[s + 1][j] + 2 * dims[i] * dims[s + 1] * dims[j + 1]
+                if best is None or c < best:
+                    best, split[i][j] = c, s
+            cost[i][j] = best
+    return (cost[0][k - 1] if k else 0), split
+
+
+def _build(operands: List[Expr], split: List[List[int]], i: int, j: int) -> Expr:
+    if i == j:
+        return operands[i]
+    s = split[i][j]
+    return Mul(_build(operands, split, i, s), _build(operands, split, s + 1, j))
+
+
+@dataclass
+class ChainInfo:
+    operands: int
+    shapes: List[Shape]
+    written_flops: int
+    optimal_flops: int
+
+
+@dataclass
+class ChainReport:
+    chains: List[ChainInfo] = field(default_factory=list)
+
+    @property
+    def written_flops(self) -> int:
+        return sum(c.written_flops for c in self.chains)
+
+    @property
+    def optimal_flops(self) -> int:
+        return sum(c.optimal_flops for c in self.chains)
+
+    @property
+    def saved_flops(self) -> int:
+        return self.written_flops - self.optimal_flops
+
+
+def optimize_chains(expr: Expr, report: ChainReport = None, _memo: Dict[int, Expr] = None) -> Expr:
+    """
+    Re-associate every chain of ``Mul`` nodes into its cheapest order.
+
+    Chains are flattened through nested ``Mul`` nodes only; every other node
+    is an operand, optimized recursively.  Pass a ``ChainReport`` to collect
+    the estimated flops of each chain as written and as reordered.
+    """
+    if _memo is None:
+        _memo = {}
+    if id(expr) in _memo:
+        return _memo[id(expr)]
+
+    if isinstance(expr, Mul):
+        operands = [optimize_chains(x, report, _memo) for x in flatten_mul(expr)]
+        shapes = [x.shape for x in operands]
+        best, split = chain_order(shapes)
+        written = written_flops(expr)
+        if best < written:
+            result = _build(operands, split, 0, len(operands) - 1)
+        else:
+            result = _rebuild_written(expr, iter(operands))
+            best = written
+        if report is not None:
+            report.chains.append(ChainInfo(len(operands), shapes, written, best))
+    elif isinstance(expr, _BINARY):
+        result = _same(expr, type(expr), optimize_chains(expr.a, report, _memo),
+                       optimize_chains(expr.b, report, _memo))
+    elif isinstance(expr, (Transpose, Inverse, Trace, Det, LogDet)):
+        result = _same(expr, type(expr), optimize_chains(expr.x, report, _memo))
+    elif isinstance(expr, ScalarMul):
+        s = optimize_chains(expr.scalar, report, _memo)
+        m = optimize_chains(expr.mat, report, _memo)
+        result = expr if (s is expr.scalar and m is expr.mat) else ScalarMul(s, m)
+    elif isinstance(expr, Func):
+        args = tuple(optimize_chains(a, report, _memo) if isinstance(a, Expr) else a for a in expr.args)
+        result = expr if all(x is y for x, y in zip(args, expr.args)) else Func(expr.name, args)
+    else:
+        result = expr
+    _memo[id(expr)] = result
+    return result
+
+
+def _same(expr: Expr, cls: type, *children: Expr) -> Expr:
+    old = operands(expr)
+    if all(x is y for x, y in zip(children, old)):
+        return expr
+    return cls(*children)
+
+
+def _rebuild_written(expr: Expr, operands) -> Expr:
+    if isinstance(expr, Mul):
+        a = _rebuild_written(expr.a, operands)
+        b = _rebuild_written(expr.b, operands)
+        return expr if (a is expr.a and b is expr.b) else Mul(a, b)
+    return next(operands)
+
+
+def chain_report(expr: Expr) -> ChainReport:
+    report = ChainReport()
+    optimize_chains(expr, report)
+    return report
@@ -1,12 +1,51 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Tuple, Any
+from typing import Tuple, Any, List, Optional
+import weakref
 
 Shape = Tuple[int, int]
 
+# Structure tags a ``Var`` or ``Const`` may declare; see ``structure.tags``.
+STRUCTURES = ("diagonal", "lower", "upper", "symmetric", "spd")
+
+
+def _field_hash(value: Any) -> int:
+    try:
+        return hash(value)
+    except TypeError:
+        return hash(repr(value))
+
+
+def _field_eq(x: Any, y: Any) -> bool:
+    # Fields compare by value; arrays (e.g. ``Func`` arguments) through
+    # ``np.array_equal``, since their ``==`` is element-wise.
+    if x is y:
+        return True
+    if type(x) is tuple and type(y) is tuple:
+        return len(x) == len(y) and all(map(_field_eq, x, y))
+    if hasattr(x, "__array__") or hasattr(y, "__array__"):
+        from .backend import np
+        return np is not None and bool(np.array_equal(x, y))
+    return x == y
+
+
 class Expr:
+    """
+    Base of the matrix expression nodes.
+
+    Nodes are immutable; each one computes a structural hash from its class
+    and its fields when it is built (children contribute their own cached
+    hash), so hashing is O(1) and equality checks identity, then the hash,
+    and only then the fields.
+    """
+
     shape: Shape
 
+    def __post_init__(self):
+        d = self.__dict__
+        h = hash((type(self).__name__,) + tuple([_field_hash(d[f]) for f in self.__dataclass_fields__]))
+        object.__setattr__(self, "_hash", h)
+
     def simplify(self) -> Expr:
         from .simplify import simplify
         return simplify(self)
@@ -36,30 +75,111 @@ class Expr:
         return str(self)
 
     def __eq__(self, other: Any) -> bool:
-        return isinstance(other, Expr) and str(self) == str(other)
+        if self is other:
+            return True
+        if type(self) is not type(other) or self._hash != other._hash:
+            return False
+        d, o = self.__dict__, other.__dict__
+        for f in self.__dataclass_fields__:
+            if d[f] is not o[f] and not _field_eq(d[f], o[f]):
+                return False
+        return True
 
     def __hash__(self) -> int:
-        return hash(str(self))
-
-@dataclass(frozen=True)
+        return self._hash
+
+
+_INTERNED: "weakref.WeakValueDictionary[Tuple, Expr]" = weakref.WeakValueDictionary()
+
+
+def intern(expr: Expr) -> Expr:
+    """
+    Canonical instance of ``expr``: structurally identical trees passed
+    through ``intern`` come back as the same object, so later equality
+    checks between them stop at the identity test.  Canonical nodes are
+    flagged, so interning a node built from interned children is O(1).
+    """
+    if not isinstance(expr, Expr):
+        return expr
+    d = expr.__dict__
+    if "_interned" in d:
+        return expr
+    values = []
+    key = [type(expr)]
+    changed = False
+    for f in expr.__dataclass_fields__:
+        v = d[f]
+        if isinstance(v, Expr):
+            c = v if "_interned" in v.__dict__ else intern(v)
+            key.append(id(c))
+        elif type(v) is tuple and any(isinstance(x, Expr) for x in v):
+            c = tuple(intern(x) for x in v)
+            if all(x is y for x, y in zip(c, v)):
+                c = v
+            key.append(("ids",) + tuple(id(x) if isinstance(x, Expr) else x for x in c))
+        else:
+            c = v
+            key.append((v,))
+        if c is not v:
+            changed = True
+        values.append(c)
+    key = tuple(key)
+    try:
+        found = _INTERNED.get(key)
+    except TypeError:
+        return expr
+    if found is not None:
+        return found
+    node = type(expr)(*values) if changed else expr
+    object.__setattr__(node, "_interned", True)
+    _INTERNED[key] = node
+    return node
+
+
+def _check_structure(node: Expr) -> None:
+    if node.structure is None:
+        return
+    if node.structure not in STRUCTURES:
+        raise ValueError(f"Unknown matrix structure: {node.structure!r} (expected one of {STRUCTURES})")
+    if node.shape[0] != node.shape[1]:
+        raise ValueError("Structured matrices must be square")
+
+
+@dataclass(frozen=True, eq=False)
 class Var(Expr):
+    """
+    A bound matrix.  ``structure`` declares a property of every value bound
+    to it ("diagonal", "lower", "upper", "symmetric" or "spd"); it is
+    trusted, not checked, and selects the specialized kernels.
+    """
+
     name: str
     shape: Shape
+    structure: Optional[str] = None
+
+    def __post_init__(self):
+        _check_structure(self)
+        super().__post_init__()
 
     def __str__(self):
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Const(Expr):
     name: str
     shape: Shape
+    structure: Optional[str] = None
+
+    def __post_init__(self):
+        _check_structure(self)
+        super().__post_init__()
 
     def __str__(self):
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Add(Expr):
     a: Expr
     b: Expr
@@ -68,12 +188,13 @@ class Add(Expr):
         if self.a.shape != self.b.shape:
             raise ValueError("Shape mismatch for Add")
         object.__setattr__(self, "shape", self.a.shape)
+        super().__post_init__()
 
     def __str__(self):
         return f"({self.a} + {self.b})"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Mul(Expr):
     a: Expr
     b: Expr
@@ -82,23 +203,25 @@ class Mul(Expr):
         if self.a.shape[1] != self.b.shape[0]:
             raise ValueError("Shape mismatch for Mul")
         object.__setattr__(self, "shape", (self.a.shape[0], self.b.shape[1]))
+        super().__post_init__()
 
     def __str__(self):
         return f"({self.a} * {self.b})"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Transpose(Expr):
     x: Expr
 
     def __post_init__(self):
         object.__setattr__(self, "shape", (self.x.shape[1], self.x.shape[0]))
+        super().__post_init__()
 
     def __str__(self):
         return f"({self.x}^T)"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Inverse(Expr):
     x: Expr
 
@@ -106,57 +229,195 @@ class Inverse(Expr):
         if self.x.shape[0] != self.x.shape[1]:
             raise ValueError("Inverse requires square matrix")
         object.__setattr__(self, "shape", self.x.shape)
+        super().__post_init__()
 
     def __str__(self):
         return f"({self.x}^-1)"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
+class Solve(Expr):
+    """``a^-1 b``, evaluated by factoring ``a`` instead of inverting it."""
+
+    a: Expr
+    b: Expr
+
+    def __post_init__(self):
+        if self.a.shape[0] != self.a.shape[1]:
+            raise ValueError("Solve requires square matrix")
+        if self.a.shape[0] != self.b.shape[0]:
+            raise ValueError("Shape mismatch for Solve")
+        object.__setattr__(self, "shape", (self.a.shape[1], self.b.shape[1]))
+        super().__post_init__()
+
+    def __str__(self):
+        return f"solve({self.a}, {self.b})"
+
+
+@dataclass(frozen=True, eq=False)
+class Hadamard(Expr):
+    """Element-wise product of two matrices of the same shape."""
+
+    a: Expr
+    b: Expr
+
+    def __post_init__(self):
+        if self.a.shape != self.b.shape:
+            raise ValueError("Shape mismatch for Hadamard")
+        object.__setattr__(self, "shape", self.a.shape)
+        super().__post_init__()
+
+    def __str__(self):
+        return f"({self.a} .* {self.b})"
+
+
+@dataclass(frozen=True, eq=False)
+class Kron(Expr):
+    """Kronecker product: block ``(i, j)`` is ``a[i][j] * b``."""
+
+    a: Expr
+    b: Expr
+
+    def __post_init__(self):
+        object.__setattr__(self, "shape", (self.a.shape[0] * self.b.shape[0], self.a.shape[1] * self.b.shape[1]))
+        super().__post_init__()
+
+    def __str__(self):
+        return f"kron({self.a}, {self.b})"
+
+
+@dataclass(frozen=True, eq=False)
+class Trace(Expr):
+    x: Expr
+
+    def __post_init__(self):
+        if self.x.shape[0] != self.x.shape[1]:
+            raise ValueError("Trace requires square matrix")
+        object.__setattr__(self, "shape", (1, 1))
+        super().__post_init__()
+
+    def __str__(self):
+        return f"tr({self.x})"
+
+
+@dataclass(frozen=True, eq=False)
+class Det(Expr):
+    x: Expr
+
+    def __post_init__(self):
+        if self.x.shape[0] != self.x.shape[1]:
+            raise ValueError("Det requires square matrix")
+        object.__setattr__(self, "shape", (1, 1))
+        super().__post_init__()
+
+    def __str__(self):
+        return f"det({self.x})"
+
+
+@dataclass(frozen=True, eq=False)
+class LogDet(Expr):
+    x: Expr
+
+    def __post_init__(self):
+        if self.x.shape[0] != self.x.shape[1]:
+            raise ValueError("LogDet requires square matrix")
+        object.__setattr__(self, "shape", (1, 1))
+        super().__post_init__()
+
+    def __str__(self):
+        return f"logdet({self.x})"
+
+
+@dataclass(frozen=True, eq=False)
 class Scalar(Expr):
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ScalarFunc(Expr):
     func: str
     x: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ScalarMul(Expr):
     scalar: Expr
     mat: Expr
 
+    def __post_init__(self):
+        object.__setattr__(self, "shape", self.mat.shape)
+        super().__post_init__()
+
+    def __str__(self):
+        return f"({self.scalar} * {self.mat})"
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ScalarAdd(Expr):
     scalar: Expr
     mat: Expr
     def __post_init__(self):
         object.__setattr__(self, "shape", self.mat.shape)
+        super().__post_init__()
 
     def __str__(self):
         return f"({self.mat} + {self.scalar})"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Func(Expr):
     name: str
     args: Tuple[Expr, ...]
 
     def __post_init__(self):
+        object.__setattr__(self, "shape", self._infer_shape())
+        super().__post_init__()
+
+    def _infer_shape(self) -> Shape:
         if not self.args:
-            object.__setattr__(self, "shape", (1, 1))
-            return
+            return (1, 1)
         first = self.args[0]
         if hasattr(first, "shape"):
-            object.__setattr__(self, "shape", first.shape)
-            return
+            return tuple(first.shape)
         if isinstance(first, list) and first and isinstance(first[0], list):
-            object.__setattr__(self, "shape", (len(first), len(first[0])))
-            return
-        object.__setattr__(self, "shape", (1, 1))
+            return (len(first), len(first[0]))
+        return (1, 1)
 
     def __str__(self):
         args_str = ", ".join(str(a) for a in self.args)
         return f"{self.name}({args_str})"
+
+
+def operands(expr: Any) -> Tuple[Expr, ...]:
+    """
+    Child nodes of ``expr`` in field order (the ``Expr`` arguments of a
+    ``Func``).  Every walk over a tree goes through here, so a new node
+    type only lists its operands once.
+    """
+    if isinstance(expr, (Add, Mul, Solve, Hadamard, Kron)):
+        return (expr.a, expr.b)
+    if isinstance(expr, (Transpose, Inverse, Trace, Det, LogDet)):
+        return (expr.x,)
+    if isinstance(expr, ScalarMul):
+        return (expr.scalar, expr.mat)
+    if isinstance(expr, Func):
+        return tuple(a for a in expr.args if isinstance(a, Expr))
+    return ()
+
+
+def topological(expr: Expr) -> List[Expr]:
+    """Distinct nodes of ``expr``, each after its operands, left operands first."""
+    order: List[Expr] = []
+    seen = set()
+    stack = [(expr, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            order.append(node)
+            continue
+        if not isinstance(node, Expr) or node in seen:
+            continue
+        seen.add(node)
+        stack.append((node, True))
+        stack.extend((c, False) for c in reversed(operands(node)))
+    return order
@@ -0,0 +1,90 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+from .core import (
+    Expr, Const, Add, Mul, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron, Shape, operands,
+)
+from .structure import DIAGONAL, LOWER, UPPER, SPD, tags
+
+
+# Rough multiples of n^3 for the dense matrix-function kernels: products,
+# solves and squarings of ``mat_exp``, ``mat_sincos`` and ``mat_log``.
+FUNC_CUBIC_COST = {
+    "exp": 16,
+    "sin": 24,
+    "cos": 24,
+    "ln": 60,
+    "log": 60,
+}
+
+
+def mul_flops(a: Shape, b: Shape) -> int:
+    """Multiply-add count (2 n k m) of an ``(n, k) @ (k, m)`` product."""
+    return 2 * a[0] * a[1] * b[1]
+
+
+def _exponent(p: Any) -> Optional[float]:
+    # Numeric value of a pow exponent, bare or wrapped in a ``Const``.
+    if isinstance(p, Const):
+        try:
+            return float(p.name)
+        except ValueError:
+            return None
+    return float(p) if isinstance(p, (int, float)) else None
+
+
+def node_flops(expr: Expr) -> int:
+    """Estimated flops of evaluating ``expr`` alone, from declared shapes and structure tags."""
+    if isinstance(expr, (Add, Hadamard, Kron)):
+        return expr.shape[0] * expr.shape[1]
+    if isinstance(expr, Mul):
+        if isinstance(expr.a, Kron):
+            # kron(A, B) v applied as A V B^T per column.
+            (p, q), (r, s) = expr.a.a.shape, expr.a.b.shape
+            return expr.shape[1] * (mul_flops((p, q), (q, s)) + mul_flops((p, s), (s, r)))
+        if DIAGONAL in tags(expr.a) or DIAGONAL in tags(expr.b):
+            return expr.shape[0] * expr.shape[1]
+        return mul_flops(expr.a.shape, expr.b.shape)
+    if isinstance(expr, (Inverse, Solve)):
+        a = expr.x if isinstance(expr, Inverse) else expr.a
+        n, m = a.shape[0], expr.shape[1]
+        t = tags(a)
+        if DIAGONAL in t:
+            return n * m
+        if LOWER in t or UPPER in t:
+            return n * n * m
+        factor = n ** 3 // 3 if SPD in t else 2 * n ** 3 // 3
+        return factor + 2 * n * n * m
+    if isinstance(expr, Trace):
+        return expr.x.shape[0]
+    if isinstance(expr, (Det, LogDet)):
+        t = tags(expr.x)
+        n = expr.x.shape[0]
+        if DIAGONAL in t or LOWER in t or UPPER in t:
+            return n
+        return n ** 3 // 3 if SPD in t else 2 * n ** 3 // 3
+    if isinstance(expr, ScalarMul):
+        return expr.shape[0] * expr.shape[1]
+    if isinstance(expr, Func):
+        n, m = expr.shape
+        if n != m or n == 1 or DIAGONAL in tags(expr.args[0]):
+            return n * m
+        if expr.name == "pow" and len(expr.args) == 2:
+            p = _exponent(expr.args[1])
+            k = abs(int(p)) if p is not None and p.is_integer() else None
+            return 2 * n ** 3 * (2 * k.bit_length() if k is not None else FUNC_CUBIC_COST["ln"])
+        return FUNC_CUBIC_COST.get(expr.name, 1) * n ** 3
+    return 0
+
+
+def subtree_flops(expr: Expr, memo: Dict[Expr, int] = None) -> int:
+    """Estimated flops of evaluating the whole tree, repeated subtrees counted each time."""
+    if memo is None:
+        memo = {}
+    if not isinstance(expr, Expr):
+        return 0
+    if expr in memo:
+        return memo[expr]
+    total = node_flops(expr) + sum(subtree_flops(c, memo) for c in operands(expr))
+    memo[expr] = total
+    return total
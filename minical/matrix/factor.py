@@ -0,0 +1,492 @@
+from __future__ import annotations
+import math
+import operator
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .backend import np
+
+try:
+    import scipy.linalg as _sla
+except ImportError:
+    _sla = None
+
+
+Matrix = List[List[float]]
+
+PIVOT_TOL = 1e-12
+
+
+def _is_array(a: Any) -> bool:
+    return np is not None and isinstance(a, np.ndarray)
+
+
+class Factorization:
+    """
+    A reusable O(n^3) factorization of one square matrix.
+
+    ``solve`` costs O(n^2) per right-hand side column, ``det`` is read off the
+    factors and ``inverse`` is computed once and memoized.  ``solve`` and
+    ``inverse`` return ``None`` for a singular matrix, like ``mat_inverse``.
+    """
+
+    kind = "abstract"
+
+    def __init__(self, a: Any):
+        self.array = _is_array(a)
+        self.n = len(a)
+        self.singular = False
+        self._inverse = None
+
+    def solve(self, b: Any) -> Any:
+        if self.singular:
+            return None
+        if self.array:
+            return self._solve_array(np.asarray(b, dtype=float))
+        return self._solve_list(b)
+
+    def inverse(self) -> Any:
+        if self._inverse is None and not self.singular:
+            ident = np.eye(self.n) if self.array else [[1.0 if i == j else 0.0 for j in range(self.n)]
+                                                      for i in range(self.n)]
+            self._inverse = self.solve(ident)
+        return self._inverse
+
+    def det(self) -> float:
+        raise NotImplementedError
+
+    def slogdet(self) -> Tuple[float, float]:
+        """``(sign, log|det|)`` read off the factors, free of overflow."""
+        raise NotImplementedError
+
+    def _solve_list(self, b: Matrix) -> Matrix:
+        raise NotImplementedError
+
+    def _solve_array(self, b: Any) -> Any:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} n={self.n}{' singular' if self.singular else ''}>"
+
+
+def _forward_list(l: Matrix, y: Matrix, unit: bool) -> Matrix:
+    n = len(l)
+    for i in range(n):
+        acc = y[i]
+        row = l[i]
+        for k in range(i):
+            if row[k]:
+                acc = [u - row[k] * v for u, v in zip(acc, y[k])]
+        y[i] = acc if unit else [u / row[i] for u in acc]
+    return y
+
+
+def _backward_list(u: Matrix, y: Matrix, transposed: bool = False) -> Matrix:
+    # Solves U x = y, or L^T x = y when ``transposed`` (U[i][k] read as L[k][i]).
+    n = len(u)
+    for i in range(n - 1, -1, -1):
+        acc = y[i]
+        for k in range(i + 1, n):
+            c = u[k][i] if transposed else u[i][k]
+            if c:
+                acc = [p - c * q for p, q in zip(acc, y[k])]
+        y[i] = [p / u[i][i] for p in acc]
+    return y
+
+
+def _tri_solve_array(t: Any, b: Any, lower: bool, unit: bool = False) -> Any:
+    x = np.array(b, dtype=float)
+    n = t.shape[0]
+    order = range(n) if lower else range(n - 1, -1, -1)
+    for i in order:
+        rng = slice(0, i) if lower else slice(i + 1, n)
+        x[i] -= t[i, rng] @ x[rng]
+        if not unit:
+            x[i] /= t[i, i]
+    return x
+
+
+class LU(Factorization):
+    """LU factorization with partial pivoting: ``P A = L U``."""
+
+    kind = "lu"
+
+    def __init__(self, a: Any):
+        super().__init__(a)
+        n = self.n
+        if self.array and _sla is not None:
+            self.lu, self.piv = _sla.lu_factor(np.asarray(a, dtype=float), check_finite=False)
+            diag = np.abs(np.diag(self.lu))
+            self.singular = bool(n and diag.min() < PIVOT_TOL)
+            self.sign = -1.0 if np.count_nonzero(self.piv != np.arange(n)) % 2 else 1.0
+            return
+        if self.array:
+            lu = np.array(a, dtype=float)
+        else:
+            lu = [[float(x) for x in row] for row in a]
+        perm = list(range(n))
+        sign = 1.0
+        for i in range(n):
+            if self.array:
+                pivot = i + int(np.argmax(np.abs(lu[i:, i])))
+            else:
+                pivot = max(range(i, n), key=lambda r: abs(lu[r][i]))
+            if abs(lu[pivot][i]) < PIVOT_TOL:
+                self.singular = True
+                break
+            if pivot != i:
+                if self.array:
+                    lu[[i, pivot]] = lu[[pivot, i]]
+                else:
+                    lu[i], lu[pivot] = lu[pivot], lu[i]
+                perm[i], perm[pivot] = perm[pivot], perm[i]
+                sign = -sign
+            if self.array:
+                lu[i + 1:, i] /= lu[i, i]
+                lu[i + 1:, i + 1:] -= np.outer(lu[i + 1:, i], lu[i, i + 1:])
+                continue
+            piv_row = lu[i]
+            for j in range(i + 1, n):
+                row = lu[j]
+                f = row[i] / piv_row[i]
+                row[i] = f
+                if f:
+                    for k in range(i + 1, n):
+                        row[k] -= f * piv_row[k]
+        self.lu = lu
+        self.perm = perm
+        self.sign = sign
+        self.piv = None
+
+    def det(self) -> float:
+        if self.singular:
+            return 0.0
+        d = self.sign
+        for i in range(self.n):
+            d *= float(self.lu[i][i])
+        return d
+
+    def slogdet(self) -> Tuple[float, float]:
+        if self.singular:
+            return 0.0, -math.inf
+        sign, logabs = self.sign, 0.0
+        for i in range(self.n):
+            u = float(self.lu[i][i])
+            sign = -sign if u < 0 else sign
+            logabs += math.log(abs(u))
+        return sign, logabs
+
+    def _solve_list(self, b: Matrix) -> Matrix:
+        y = [list(map(float, b[p])) for p in self.perm]
+        _forward_list(self.lu, y, unit=True)
+        return _backward_list(self.lu, y)
+
+    def _solve_array(self, b: Any) -> Any:
+        if self.piv is not None:
+            return _sla.lu_solve((self.lu, self.piv), b, check_finite=False)
+        y = _tri_solve_array(self.lu, b[self.perm], lower=True, unit=True)
+        return _tri_solve_array(self.lu, y, lower=False)
+
+
+class Cholesky(Factorization):
+    """Cholesky factorization ``A = L L^T`` of a symmetric positive definite matrix."""
+
+    kind = "cholesky"
+
+    def __init__(self, a: Any):
+        super().__init__(a)
+        n = self.n
+        if self.array:
+            try:
+                self.l = np.linalg.cholesky(np.asarray(a, dtype=float))
+            except np.linalg.LinAlgError:
+                raise ValueError("Cholesky requires a symmetric positive definite matrix")
+            return
+        l = [[0.0] * n for _ in range(n)]
+        for j in range(n):
+            lj = l[j]
+            d = a[j][j] - sum(x * x for x in lj[:j])
+            if d <= 0:
+                raise ValueError("Cholesky requires a symmetric positive definite matrix")
+            lj[j] = math.sqrt(d)
+            for i in range(j + 1, n):
+                li = l[i]
+                li[j] = (a[i][j] - sum(p * q for p, q in zip(li[:j], lj[:j]))) / lj[j]
+        self.l = l
+
+    def det(self) -> float:
+        d = 1.0
+        for i in range(self.n):
+            d *= float(self.l[i][i])
+        return d * d
+
+    def slogdet(self) -> Tuple[float, float]:
+        return 1.0, 2.0 * sum(math.log(float(self.l[i][i])) for i in range(self.n))
+
+    def _solve_list(self, b: Matrix) -> Matrix:
+        y = [list(map(float, row)) for row in b]
+        _forward_list(self.l, y, unit=False)
+        return _backward_list(self.l, y, transposed=True)
+
+    def _solve_array(self, b: Any) -> Any:
+        if _sla is not None:
+            return _sla.cho_solve((self.l, True), b, check_finite=False)
+        y = _tri_solve_array(self.l, b, lower=True)
+        return _tri_solve_array(self.l.T, y, lower=False)
+
+
+QL_MAX_ITER = 60
+
+
+def _dot(x: Any, y: Any) -> float:
+    return sum(map(operator.mul, x, y))
+
+
+def _tridiagonalize(a: Matrix) -> Tuple[List[float], List[float], Matrix]:
+    """
+    Householder reduction ``A = Q T Q^T`` of a symmetric ``a``: the diagonal
+    and super-diagonal of ``T``, and the rows of ``Q^T``.
+    """
+    n = len(a)
+    d, e = [0.0] * n, [0.0] * n
+    qt = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    b = [list(map(float, row)) for row in a]
+    for k in range(n - 2):
+        # b is the trailing (n - k) x (n - k) block; reflect its first column.
+        x = b[0][1:]
+        d[k] = b[0][0]
+        alpha = -math.copysign(math.sqrt(_dot(x, x)), x[0])
+        v = x[:]
+        v[0] -= alpha
+        vv = _dot(v, v)
+        rest = [row[1:] for row in b[1:]]
+        if not vv:
+            e[k] = x[0]
+            b = rest
+            continue
+        e[k] = alpha
+        beta = 2.0 / vv
+        p = [beta * _dot(row, v) for row in rest]
+        kk = 0.5 * beta * _dot(p, v)
+        w = [pi - kk * vi for pi, vi in zip(p, v)]
+        # b <- H b H = b - v w^T - w v^T, and Q^T <- H Q^T.
+        b = [[x - vi * wj - wi * vj for x, vj, wj in zip(row, v, w)]
+             for row, vi, wi in zip(rest, v, w)]
+        rows = qt[k + 1:]
+        u = [_dot(v, col) for col in zip(*rows)]
+        qt[k + 1:] = [[x - beta * vi * y for x, y in zip(row, u)] for row, vi in zip(rows, v)]
+    if n >= 2:
+        d[n - 2], e[n - 2], d[n - 1] = b[0][0], b[0][1], b[1][1]
+    elif n == 1:
+        d[0] = b[0][0]
+    return d, e, qt
+
+
+def _tridiagonal_ql(d: List[float], e: List[float], z: Matrix) -> None:
+    """
+    Implicit QL iteration with Wilkinson shifts on the symmetric tridiagonal
+    ``(d, e)``, in place: ``d`` ends up holding the eigenvalues and the rows
+    of ``z`` (rows of ``Q^T`` on entry) the matching eigenvectors.
+    """
+    n = len(d)
+    for l in range(n):
+        for _ in range(QL_MAX_ITER):
+            m = l
+            while m < n - 1 and abs(e[m]) > 2.2e-16 * (abs(d[m]) + abs(d[m + 1])):
+                m += 1
+            if m == l:
+                break
+            g = (d[l + 1] - d[l]) / (2.0 * e[l])
+            r = math.hypot(g, 1.0)
+            g = d[m] - d[l] + e[l] / (g + math.copysign(r, g))
+            s = c = 1.0
+            p = 0.0
+            i = m - 1
+            while i >= l:
+                f, b = s * e[i], c * e[i]
+                r = math.hypot(f, g)
+                e[i + 1] = r
+                if not r:
+                    d[i + 1] -= p
+                    e[m] = 0.0
+                    break
+                s, c = f / r, g / r
+                g = d[i + 1] - p
+                r = (d[i] - g) * s + 2.0 * c * b
+                p = s * r
+                d[i + 1] = g + p
+                g = c * r - b
+                zi, zj = z[i], z[i + 1]
+                z[i + 1] = [s * x + c * y for x, y in zip(zi, zj)]
+                z[i] = [c * x - s * y for x, y in zip(zi, zj)]
+                i -= 1
+            else:
+                d[l] -= p
+                e[l] = g
+                e[m] = 0.0
+        else:
+            raise ValueError("Symmetric eigenvalue iteration did not converge")
+
+
+class Eigen(Factorization):
+    """
+    Symmetric eigendecomposition ``A = Q diag(w) Q^T``.
+
+    LAPACK ``eigh`` for arrays (stacks too), Householder tridiagonalization
+    and implicit QL for nested lists.  ``apply`` rebuilds any matrix
+    function ``f(A) = Q diag(f(w)) Q^T`` from the values of ``f`` at the
+    eigenvalues, so several functions of one matrix share the O(n^3)
+    decomposition.
+    """
+
+    kind = "eigh"
+
+    def __init__(self, a: Any):
+        super().__init__(a)
+        if self.array:
+            a = np.asarray(a, dtype=float)
+            self.n = a.shape[-1]
+            self.w, self.q = np.linalg.eigh(a)
+            self.singular = bool(np.any(np.abs(self.w) < PIVOT_TOL))
+            return
+        if self.n != len(a[0]):
+            raise ValueError("Eigendecomposition requires a square matrix")
+        # Rows of ``vectors`` are the eigenvectors.
+        self.w, _, self.vectors = d, e, z = _tridiagonalize(a)
+        _tridiagonal_ql(d, e, z)
+        self.singular = any(abs(x) < PIVOT_TOL for x in d)
+
+    def apply(self, values: Any) -> Any:
+        """``Q diag(values) Q^T``, ``values`` holding ``f`` at the eigenvalues ``w``."""
+        if self.array:
+            return (self.q * np.asarray(values)[..., None, :]) @ np.swapaxes(self.q, -1, -2)
+        cols = list(zip(*self.vectors))
+        scaled = list(zip(*[[f * x for x in row] for f, row in zip(values, self.vectors)]))
+        n = self.n
+        out = [[0.0] * n for _ in range(n)]
+        for j, cj in enumerate(cols):
+            row = out[j]
+            for k in range(j, n):
+                row[k] = out[k][j] = _dot(cj, scaled[k])
+        return out
+
+    def det(self) -> Any:
+        if self.array:
+            det = np.prod(self.w, axis=-1)
+            return float(det) if det.ndim == 0 else det
+        det = 1.0
+        for x in self.w:
+            det *= x
+        return det
+
+    def slogdet(self) -> Tuple[Any, Any]:
+        if self.array:
+            with np.errstate(divide="ignore"):
+                sign, logabs = np.prod(np.sign(self.w), axis=-1), np.sum(np.log(np.abs(self.w)), axis=-1)
+            return (float(sign), float(logabs)) if sign.ndim == 0 else (sign, logabs)
+        if self.singular:
+            return 0.0, -math.inf
+        sign = -1.0 if sum(x < 0 for x in self.w) % 2 else 1.0
+        return sign, sum(math.log(abs(x)) for x in self.w)
+
+    def _solve_list(self, b: Matrix) -> Matrix:
+        # x = Q diag(1/w) Q^T b, with Q^T the rows of ``vectors``.
+        y = [[_dot(z, col) / x for col in zip(*b)] for z, x in zip(self.vectors, self.w)]
+        return [[_dot(z, col) for col in zip(*y)] for z in zip(*self.vectors)]
+
+    def _solve_array(self, b: Any) -> Any:
+        q = self.q
+        return q @ ((np.swapaxes(q, -1, -2) @ b) / self.w[..., :, None])
+
+
+def is_symmetric(a: Any, tol: float = 1e-12) -> bool:
+    if _is_array(a):
+        return (a.shape[-2] == a.shape[-1]
+                and bool(np.allclose(a, np.swapaxes(a, -1, -2), rtol=0, atol=tol)))
+    n = len(a)
+    return all(abs(a[i][j] - a[j][i]) <= tol for i in range(n) for j in range(i + 1, n))
+
+
+def factorize(a: Any, kind: Optional[str] = None) -> Factorization:
+    """
+    Factor a square matrix: Cholesky when ``kind="cholesky"`` or when ``a`` is
+    symmetric with a positive diagonal and the attempt succeeds, LU otherwise.
+    ``kind="eigh"`` gives the ``Eigen`` decomposition of a symmetric ``a``
+    (never chosen automatically).
+    """
+    if kind == "eigh":
+        return Eigen(a)
+    n = len(a)
+    if n != len(a[0]):
+        raise ValueError("Factorization requires a square matrix")
+    if kind == "lu":
+        return LU(a)
+    if kind == "cholesky":
+        return Cholesky(a)
+    if kind is not None:
+        raise ValueError(f"Unknown factorization kind: {kind!r}")
+    if all(a[i][i] > 0 for i in range(n)) and is_symmetric(a):
+        try:
+            return Cholesky(a)
+        except ValueError:
+            pass
+    return LU(a)
+
+
+class FactorCache:
+    """
+    Factorizations keyed by the identity of the bound matrix object, one
+    per kind (LU or Cholesky, and the ``Eigen`` decomposition).
+
+    One cache lives for each ``eval_expr`` call; pass your own to keep the
+    factors across calls.  Entries hold a reference to their matrix, so an
+    id is never reused while cached; mutating a cached matrix in place
+    requires ``clear()``.  A matrix is factored once even when several
+    threads ask for it at the same time, and ``hits``/``misses`` count
+    every lookup.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Any, Dict[str, Factorization]]] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        # Guards the counters and ``_locks``; factoring happens under the per-matrix lock.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, a: Any, kind: Optional[str] = None) -> Optional[Factorization]:
+        """The cached factorization of ``a`` (any LU/Cholesky when ``kind`` is None), or ``None``."""
+        entry = self._entries.get(id(a))
+        if entry is None or entry[0] is not a:
+            return None
+        if kind is not None:
+            return entry[1].get(kind)
+        return entry[1].get("cholesky") or entry[1].get("lu")
+
+    def get(self, a: Any, kind: Optional[str] = None) -> Factorization:
+        fac = self.peek(a, kind)
+        if fac is None:
+            with self._lock:
+                lock = self._locks.setdefault(id(a), threading.Lock())
+            with lock:
+                fac = self.peek(a, kind)
+                if fac is None:
+                    with self._lock:
+                        self.misses += 1
+                    fac = factorize(a, kind)
+                    entry = self._entries.get(id(a))
+                    if entry is None or entry[0] is not a:
+                        entry = self._entries[id(a)] = (a, {})
+                    entry[1][fac.kind] = fac
+                    return fac
+        with self._lock:
+            self.hits += 1
+        return fac
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._locks.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,269 @@
+from __future__ import annotations
+import math
+from array import array
+from itertools import repeat
+from operator import add, mul, sub
+from typing import Any, List, Optional, Tuple
+
+from .backend import Backend, register_backend
+
+Matrix = List[List[float]]
+
+PIVOT_TOL = 1e-12
+
+_sumprod = getattr(math, "sumprod", None)
+
+
+def _dot(x: Any, y: Any) -> float:
+    return _sumprod(x, y) if _sumprod is not None else sum(map(mul, x, y))
+
+
+class FlatMatrix:
+    """
+    Dense ``n x m`` matrix of doubles stored row-major in one ``array('d')``.
+
+    One buffer per matrix instead of ``n`` lists of boxed floats: no
+    per-element objects for the garbage collector to track.  The columns
+    as lists, which ``flat_mul`` reads when the matrix is its right
+    operand, are kept until a kernel writes into the buffer; code that
+    writes ``data`` directly must call ``touch()``.
+    """
+
+    __slots__ = ("shape", "data", "_cols")
+
+    def __init__(self, shape: Tuple[int, int], data: array):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.data = data
+        self._cols: Optional[List[List[float]]] = None
+
+    @classmethod
+    def zeros(cls, n: int, m: int) -> "FlatMatrix":
+        return cls((n, m), array("d", bytes(8 * n * m)))
+
+    @classmethod
+    def identity(cls, n: int) -> "FlatMatrix":
+        out = cls.zeros(n, n)
+        out.data[::n + 1] = array("d", repeat(1.0, n))
+        return out
+
+    @classmethod
+    def from_rows(cls, rows: Any) -> "FlatMatrix":
+        data = array("d")
+        for row in rows:
+            data.extend(map(float, row))
+        return cls((len(rows), len(rows[0]) if len(rows) else 0), data)
+
+    def tolist(self) -> Matrix:
+        n, m = self.shape
+        d = self.data
+        return [d[i * m:(i + 1) * m].tolist() for i in range(n)]
+
+    def copy(self) -> "FlatMatrix":
+        return FlatMatrix(self.shape, array("d", self.data))
+
+    def columns(self) -> List[List[float]]:
+        if self._cols is None:
+            m = self.shape[1]
+            self._cols = [self.data[j::m].tolist() for j in range(m)]
+        return self._cols
+
+    def touch(self) -> None:
+        """Drop the cached columns after ``data`` was modified."""
+        self._cols = None
+
+    def __repr__(self) -> str:
+        return f"<FlatMatrix {self.shape[0]}x{self.shape[1]}>"
+
+
+def _target(out: Optional[FlatMatrix], n: int, m: int) -> Optional[FlatMatrix]:
+    # ``out`` when it can take the result, its cached columns dropped.
+    if out is None or out.shape != (n, m):
+        return None
+    out.touch()
+    return out
+
+
+def flat_mul(a: FlatMatrix, b: FlatMatrix, out: Optional[FlatMatrix] = None) -> FlatMatrix:
+    """
+    ``a @ b`` as row-by-column dot products, written into ``out`` when it
+    is given with the right shape (it must not be ``a`` or ``b``).  The
+    columns of ``b`` are cached on it, so a series multiplying by the same
+    matrix every step splits it once.
+    """
+    n, k = a.shape
+    k2, m = b.shape
+    if k != k2:
+        raise ValueError("Matrix multiplication shape mismatch")
+    out = _target(out, n, m) or FlatMatrix.zeros(n, m)
+    ad, od = a.data, out.data
+    # Dot products over lists: the inner loops then read floats that are
+    # already boxed instead of boxing every array element again.
+    cols = b.columns()
+    for i in range(n):
+        row = ad[i * k:(i + 1) * k].tolist()
+        base = i * m
+        for j, col in enumerate(cols):
+            od[base + j] = _dot(row, col)
+    return out
+
+
+def flat_add(a: FlatMatrix, b: FlatMatrix, out: Optional[FlatMatrix] = None) -> FlatMatrix:
+    """``a + b`` into ``out`` (which may be ``a`` or ``b``), or a new matrix."""
+    if a.shape != b.shape:
+        raise ValueError("Matrix addition shape mismatch")
+    target = _target(out, *a.shape)
+    if target is None:
+        return FlatMatrix(a.shape, array("d", map(add, a.data, b.data)))
+    od = target.data
+    for i, (u, v) in enumerate(zip(a.data, b.data)):
+        od[i] = u + v
+    return target
+
+
+def flat_scale(a: FlatMatrix, s: float, out: Optional[FlatMatrix] = None) -> FlatMatrix:
+    """``s * a`` into ``out`` (which may be ``a``), or a new matrix."""
+    s = float(s)
+    target = _target(out, *a.shape)
+    if target is None:
+        return FlatMatrix(a.shape, array("d", map(mul, a.data, repeat(s))))
+    od = target.data
+    for i, u in enumerate(a.data):
+        od[i] = u * s
+    return target
+
+
+def flat_axpy(y: FlatMatrix, s: float, x: FlatMatrix) -> FlatMatrix:
+    """Fused ``y += s * x``, written into the buffer of ``y``."""
+    if y.shape != x.shape:
+        raise ValueError("Matrix addition shape mismatch")
+    s = float(s)
+    y.touch()
+    yd = y.data
+    for i, u in enumerate(x.data):
+        yd[i] += u * s
+    return y
+
+
+def flat_transpose(a: FlatMatrix) -> FlatMatrix:
+    n, m = a.shape
+    data = array("d")
+    for j in range(m):
+        data.extend(a.data[j::m])
+    return FlatMatrix((m, n), data)
+
+
+def flat_solve(a: FlatMatrix, b: FlatMatrix) -> Optional[FlatMatrix]:
+    """Gaussian elimination with partial pivoting on whole rows; ``None`` if ``a`` is singular."""
+    n = a.shape[0]
+    if a.shape != (n, n) or b.shape[0] != n:
+        raise ValueError("Solve shape mismatch")
+    m = b.shape[1]
+    rows = [a.data[i * n:(i + 1) * n].tolist() for i in range(n)]
+    rhs = [b.data[i * m:(i + 1) * m].tolist() for i in range(n)]
+    for i in range(n):
+        pivot = max(range(i, n), key=lambda r: abs(rows[r][i]))
+        if abs(rows[pivot][i]) < PIVOT_TOL:
+            return None
+        if pivot != i:
+            rows[i], rows[pivot] = rows[pivot], rows[i]
+            rhs[i], rhs[pivot] = rhs[pivot], rhs[i]
+        prow, pb, p = rows[i], rhs[i], rows[i][i]
+        for r in range(i + 1, n):
+            f = rows[r][i] / p
+            if f:
+                rows[r][i + 1:] = map(sub, rows[r][i + 1:], map(mul, prow[i + 1:], repeat(f)))
+                rhs[r] = list(map(sub, rhs[r], map(mul, pb, repeat(f))))
+    for i in range(n - 1, -1, -1):
+        acc = rhs[i]
+        row = rows[i]
+        for k in range(i + 1, n):
+            c = row[k]
+            if c:
+                acc = list(map(sub, acc, map(mul, rhs[k], repeat(c))))
+        rhs[i] = list(map(mul, acc, repeat(1.0 / row[i])))
+    data = array("d")
+    for r in rhs:
+        data.extend(r)
+    return FlatMatrix((n, m), data)
+
+
+class FlatBackend(Backend):
+    """
+    Pure-Python kernels on ``FlatMatrix`` buffers.
+
+    The series kernels (``mat_exp``, ``mat_sincos``, ``mat_pow``, ...) move
+    nested-list operands here for their duration: products go into reused
+    ``out`` buffers and series terms are accumulated in place.
+    """
+
+    name = "flat"
+    priority = 1
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, FlatMatrix)
+
+    def asmatrix(self, x: Any) -> FlatMatrix:
+        if isinstance(x, FlatMatrix):
+            return x
+        return FlatMatrix.from_rows(x if isinstance(x, list) else x.tolist())
+
+    def tolist(self, a: FlatMatrix) -> Matrix:
+        return self.asmatrix(a).tolist()
+
+    def shape(self, a: FlatMatrix) -> Tuple[int, int]:
+        return a.shape
+
+    def eye(self, n: int) -> FlatMatrix:
+        return FlatMatrix.identity(n)
+
+    def add(self, a: Any, b: Any) -> FlatMatrix:
+        return flat_add(self.asmatrix(a), self.asmatrix(b))
+
+    def scale(self, a: Any, s: float) -> FlatMatrix:
+        return flat_scale(self.asmatrix(a), s)
+
+    def mul(self, a: Any, b: Any) -> FlatMatrix:
+        return flat_mul(self.asmatrix(a), self.asmatrix(b))
+
+    def transpose(self, a: Any) -> FlatMatrix:
+        return flat_transpose(self.asmatrix(a))
+
+    def inverse(self, a: Any) -> Optional[FlatMatrix]:
+        a = self.asmatrix(a)
+        return flat_solve(a, FlatMatrix.identity(a.shape[0]))
+
+    def det(self, a: Any) -> float:
+        from .calculus import mat_det
+        return mat_det(self.tolist(a))
+
+    def trace(self, a: Any) -> float:
+        a = self.asmatrix(a)
+        return sum(a.data[::a.shape[1] + 1])
+
+    def solve(self, a: Any, b: Any) -> Optional[FlatMatrix]:
+        return flat_solve(self.asmatrix(a), self.asmatrix(b))
+
+    def norm1(self, a: Any) -> float:
+        a = self.asmatrix(a)
+        m = a.shape[1]
+        return max((sum(map(abs, a.data[j::m])) for j in range(m)), default=0.0)
+
+    def hadamard(self, a: Any, b: Any) -> FlatMatrix:
+        a, b = self.asmatrix(a), self.asmatrix(b)
+        return FlatMatrix(a.shape, array("d", map(mul, a.data, b.data)))
+
+    def kron(self, a: Any, b: Any) -> FlatMatrix:
+        from .calculus import PYTHON
+        return self.asmatrix(PYTHON.kron(self.tolist(a), self.tolist(b)))
+
+    def mul_into(self, a: Any, b: Any, out: Any) -> FlatMatrix:
+        return flat_mul(self.asmatrix(a), self.asmatrix(b), out)
+
+    def axpy(self, y: Any, s: float, x: Any) -> FlatMatrix:
+        return flat_axpy(y, s, self.asmatrix(x))
+
+    def iscale(self, a: Any, s: float) -> FlatMatrix:
+        return flat_scale(a, s, a)
+
+
+FLAT = register_backend(FlatBackend())
@@ -1,4 +1,8 @@
-from .core import Add, Mul, Transpose, Inverse, Expr, Const, ScalarMul, Scalar, ScalarAdd, Func
+from .core import (
+    Add, Mul, Transpose, Inverse, Expr, Const, ScalarMul, Scalar, ScalarAdd, Func, Trace, Det, LogDet, Solve,
+    Hadamard, Kron, intern,
+)
+from .structure import SYMMETRIC, tags
 
 
 def add(a: Expr, b: Expr) -> Expr:
@@ -12,7 +16,7 @@ def add(a: Expr, b: Expr) -> Expr:
         return ScalarAdd(a, b)
     if isinstance(b, Scalar) and not isinstance(a, Scalar):
         return ScalarAdd(b, a)
-    return Add(a, b)
+    return intern(Add(a, b))
 
 
 def mul(a: Expr, b: Expr) -> Expr:
@@ -28,20 +32,74 @@ def mul(a: Expr, b: Expr) -> Expr:
         return a
     if isinstance(b, Const) and b.name == "0":
         return b
-    return Mul(a, b)
+    if isinstance(a, Const) and a.name == "1" and a.shape == (1, 1) and b.shape[0] == 1:
+        return b
+    if isinstance(b, Const) and b.name == "1" and b.shape == (1, 1) and a.shape[1] == 1:
+        return a
+    return intern(Mul(a, b))
 
 
 def transpose(x: Expr) -> Expr:
     if isinstance(x, Transpose):
         return x.x
-    return Transpose(x)
+    if SYMMETRIC in tags(x):
+        return x
+    return intern(Transpose(x))
 
 
 def inverse(x: Expr) -> Expr:
     if isinstance(x, Inverse):
         return x.x
-    return Inverse(x)
+    return intern(Inverse(x))
 
 
 def func(name: str, *args: Expr) -> Expr:
-    return Func(name, args)
\ No newline at end of file
+    return intern(Func(name, args))
+
+
+def solve(a: Expr, b: Expr) -> Expr:
+    if isinstance(a, Const) and a.name == "I":
+        return b
+    return intern(Solve(a, b))
+
+
+def hadamard(a: Expr, b: Expr) -> Expr:
+    if isinstance(a, Const) and a.name == "0":
+        return a
+    if isinstance(b, Const) and b.name == "0":
+        return b
+    return intern(Hadamard(a, b))
+
+
+def kron(a: Expr, b: Expr) -> Expr:
+    if isinstance(a, Const) and a.name == "1" and a.shape == (1, 1):
+        return b
+    if isinstance(b, Const) and b.name == "1" and b.shape == (1, 1):
+        return a
+    node = Kron(a, b)
+    if any(isinstance(x, Const) and x.name == "0" for x in (a, b)):
+        return Const("0", node.shape)
+    if all(isinstance(x, Const) and x.name == "I" for x in (a, b)):
+        return Const("I", node.shape)
+    return intern(node)
+
+
+def trace(x: Expr) -> Expr:
+    return intern(Trace(x))
+
+
+def det(x: Expr) -> Expr:
+    return intern(Det(x))
+
+
+def logdet(x: Expr) -> Expr:
+    return intern(LogDet(x))
+
+
+def scale(s: Expr, x: Expr) -> Expr:
+    """``s * x`` for a scalar (1x1) expression ``s``."""
+    if isinstance(s, Const) and s.name == "1":
+        return x
+    if isinstance(s, Const) and s.name == "0":
+        return Const("0", x.shape)
+    return intern(ScalarMul(s, x))
@@ -0,0 +1,243 @@
+from __future__ import annotations
+import math
+import os
+import tempfile
+import weakref
+from typing import Any, List, Optional, Tuple
+
+from .backend import Backend, NumpyBackend, register_backend, np
+
+# Default working set of the tiled kernels, in bytes.
+MEMORY = 64 << 20
+
+
+def load_npy(path: str) -> Any:
+    """A ``.npy`` file mapped read-only, ready to bind in ``eval_expr``."""
+    return np.load(path, mmap_mode="r")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class OutOfCoreBackend(Backend):
+    """
+    Matrices larger than RAM: ``numpy.memmap`` operands (``load_npy(path)`` or
+    ``np.load(path, mmap_mode="r")``).
+
+    Products, sums, scalings and transposes stream tiles through a working
+    set of about ``memory`` bytes and write their result to a new ``.npy``
+    memmap in ``directory`` (a temporary directory, created on first use
+    and removed at exit, unless one is given), so ``A @ B + C`` runs in
+    fixed memory whatever the size of the inputs.
+
+    Each result file is deleted when its memmap is garbage collected:
+    intermediates go as soon as the evaluator drops them, and the caller
+    owns the returned result -- its file lives as long as the array, so
+    ``np.save`` it (or copy the file) to keep it.
+
+    ``bytes_read`` and ``bytes_written`` count the bytes moved to and from
+    memmaps since the last ``reset``.  The remaining operations (inverse,
+    solve, det, ...) load their operands and use the NumPy kernels.
+    """
+
+    name = "memmap"
+    priority = 12
+
+    def __init__(self, directory: Optional[str] = None, memory: int = MEMORY):
+        self._directory = directory
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self.memory = int(memory)
+        self._dense = NumpyBackend()
+        self.reset()
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="minical-")
+            self._directory = self._tmp.name
+        return self._directory
+
+    def reset(self) -> None:
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, np.memmap) and x.ndim == 2
+
+    def _operand(self, x: Any) -> Any:
+        return x if isinstance(x, np.ndarray) else np.asarray(x, dtype=float)
+
+    def _read(self, x: Any, rows: slice, cols: slice = slice(None)) -> Any:
+        tile = np.asarray(x[rows, cols], dtype=float)
+        if isinstance(x, np.memmap):
+            self.bytes_read += tile.nbytes
+        return tile
+
+    def _write(self, out: Any, rows: slice, cols: slice, tile: Any) -> None:
+        out[rows, cols] = tile
+        self.bytes_written += tile.nbytes
+
+    def _output(self, shape: Tuple[int, int]) -> Any:
+        fd, path = tempfile.mkstemp(suffix=".npy", dir=self.directory)
+        os.close(fd)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=float, shape=shape)
+        weakref.finalize(out, _remove, path)
+        return out
+
+    def _tile(self, buffers: int) -> int:
+        # Side of a square tile such that ``buffers`` of them fit the working set.
+        return max(1, math.isqrt(self.memory // (8 * buffers)))
+
+    def _row_block(self, cols: int, buffers: int) -> int:
+        return max(1, self.memory // (8 * buffers * max(cols, 1)))
+
+    def asmatrix(self, x: Any) -> Any:
+        if isinstance(x, np.memmap):
+            return x
+        x = self._operand(x)
+        out = self._output(x.shape)
+        step = self._row_block(x.shape[1], 1)
+        for i in range(0, x.shape[0], step):
+            self._write(out, slice(i, i + step), slice(None), x[i:i + step])
+        out.flush()
+        return out
+
+    def tolist(self, a: Any) -> List[List[float]]:
+        return np.asarray(a).tolist()
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        return a.shape
+
+    def eye(self, n: int) -> Any:
+        out = self._output((n, n))
+        step = self._row_block(n, 1)
+        for i in range(0, n, step):
+            rows = min(step, n - i)
+            tile = np.zeros((rows, n))
+            tile[np.arange(rows), np.arange(i, i + rows)] = 1.0
+            self._write(out, slice(i, i + rows), slice(None), tile)
+        out.flush()
+        return out
+
+    def _rowwise(self, f: Any, *operands: Any) -> Any:
+        # Elementwise kernels: row blocks of every operand and of the output.
+        operands = [self._operand(x) for x in operands]
+        n, m = operands[0].shape
+        out = self._output((n, m))
+        step = self._row_block(m, len(operands) + 1)
+        for i in range(0, n, step):
+            rows = slice(i, i + step)
+            self._write(out, rows, slice(None), f(*(self._read(x, rows) for x in operands)))
+        out.flush()
+        return out
+
+    def add(self, a: Any, b: Any) -> Any:
+        return self._rowwise(np.add, a, b)
+
+    def scale(self, a: Any, s: float) -> Any:
+        return self._rowwise(lambda x: x * s, a)
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        return self._rowwise(np.multiply, a, b)
+
+    def mul(self, a: Any, b: Any) -> Any:
+        """
+        Tiled ``a @ b``: each output tile accumulates the products of a row
+        of tiles of ``a`` with a column of tiles of ``b``, so the working set
+        holds four tiles (two operand tiles, the accumulator and the product).
+        """
+        a, b = self._operand(a), self._operand(b)
+        (n, k), (k2, m) = a.shape, b.shape
+        if k != k2:
+            raise ValueError("Matrix multiplication shape mismatch")
+        out = self._output((n, m))
+        t = self._tile(4)
+        for i in range(0, n, t):
+            for j in range(0, m, t):
+                rows, cols = slice(i, i + t), slice(j, j + t)
+                acc = None
+                for p in range(0, k, t):
+                    inner = slice(p, p + t)
+                    prod = self._read(a, rows, inner) @ self._read(b, inner, cols)
+                    acc = prod if acc is None else np.add(acc, prod, out=acc)
+                if acc is None:
+                    acc = np.zeros((min(t, n - i), min(t, m - j)))
+                self._write(out, rows, cols, acc)
+        out.flush()
+        return out
+
+    def transpose(self, a: Any) -> Any:
+        a = self._operand(a)
+        n, m = a.shape
+        out = self._output((m, n))
+        t = self._tile(2)
+        for i in range(0, n, t):
+            for j in range(0, m, t):
+                self._write(out, slice(j, j + t), slice(i, i + t), self._read(a, slice(i, i + t), slice(j, j + t)).T)
+        out.flush()
+        return out
+
+    def trace(self, a: Any) -> float:
+        a = self._operand(a)
+        n = min(a.shape)
+        t = self._tile(1)
+        return float(sum(np.trace(self._read(a, slice(i, i + t), slice(i, i + t))) for i in range(0, n, t)))
+
+    def norm1(self, a: Any) -> float:
+        a = self._operand(a)
+        n, m = a.shape
+        sums = np.zeros(m)
+        step = self._row_block(m, 1)
+        for i in range(0, n, step):
+            sums += np.abs(self._read(a, slice(i, i + step))).sum(axis=0)
+        return float(sums.max()) if m else 0.0
+
+    def inner(self, a: Any, b: Any) -> float:
+        a, b = self._operand(a), self._operand(b)
+        n, m = a.shape
+        step = self._row_block(m, 2)
+        return float(sum(np.vdot(self._read(a, slice(i, i + step)), self._read(b, slice(i, i + step)))
+                         for i in range(0, n, step)))
+
+    def trace_mul(self, a: Any, b: Any) -> float:
+        # tr(a b) = sum_ij a_ij b_ji over matching tiles of a and b^T.
+        a, b = self._operand(a), self._operand(b)
+        n, k = a.shape
+        t = self._tile(2)
+        total = 0.0
+        for i in range(0, n, t):
+            for j in range(0, k, t):
+                rows, cols = slice(i, i + t), slice(j, j + t)
+                total += float(np.vdot(self._read(a, rows, cols), self._read(b, cols, rows).T))
+        return total
+
+    def _load(self, x: Any) -> Any:
+        x = self._operand(x)
+        if isinstance(x, np.memmap):
+            self.bytes_read += x.nbytes
+        return np.asarray(x, dtype=float)
+
+    def inverse(self, a: Any) -> Any:
+        return self._dense.inverse(self._load(a))
+
+    def det(self, a: Any) -> float:
+        return self._dense.det(self._load(a))
+
+    def slogdet(self, a: Any) -> Tuple[float, float]:
+        return self._dense.slogdet(self._load(a))
+
+    def solve(self, a: Any, b: Any) -> Any:
+        return self._dense.solve(self._load(a), self._load(b))
+
+    def kron(self, a: Any, b: Any) -> Any:
+        return self._dense.kron(self._load(a), self._load(b))
+
+    def kron_mul(self, a: Any, b: Any, v: Any) -> Any:
+        return self._dense.kron_mul(self._load(a), self._load(b), self._load(v))
+
+
+MEMMAP = register_backend(OutOfCoreBackend()) if np is not None else None
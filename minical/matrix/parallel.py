@@ -0,0 +1,160 @@
+from __future__ import annotations
+import heapq
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .core import (
+    Expr, Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron, operands,
+)
+from .cost import node_flops
+
+# Nodes cheaper than this many flops run inline in the scheduling thread:
+# handing them to the pool costs more than evaluating them.
+GRAIN = 1 << 17
+
+# Nodes memoized by ``calculus._eval``: one task each.
+TASKS = (Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron)
+
+
+def _fused(expr: Mul, child: Expr) -> bool:
+    # Children the evaluator consumes without forming them: inv(A) @ B
+    # (sparse solve), exp(A) @ v and kron(A, B) @ V.
+    if isinstance(child, (Inverse, Kron)):
+        return True
+    return (child is expr.a and isinstance(child, Func) and child.name == "exp"
+            and len(child.args) == 1 and expr.shape[1] == 1)
+
+
+def dependencies(expr: Expr) -> List[Expr]:
+    """
+    The tasks ``expr`` needs evaluated first.  Operands that ``_eval_node``
+    fuses into ``expr`` (``trace(A @ B)``, ``exp(A) @ v``, ...) are skipped
+    and their own operands are listed instead, so scheduling never defeats
+    a fusion.
+    """
+    if isinstance(expr, Trace) and isinstance(expr.x, Mul):
+        a, b = expr.x.a, expr.x.b
+        if isinstance(a, Inverse) or isinstance(b, Inverse):
+            children = [expr.x]
+        elif isinstance(a, Transpose):
+            children = [a.x, b]
+        elif isinstance(b, Transpose):
+            children = [a, b.x]
+        else:
+            children = [a, b]
+    elif isinstance(expr, Mul):
+        children = []
+        for c in (expr.a, expr.b):
+            children.extend(operands(c) if _fused(expr, c) else [c])
+    else:
+        children = operands(expr)
+    return list(dict.fromkeys(c for c in children if isinstance(c, TASKS)))
+
+
+def _nbytes(expr: Expr) -> int:
+    r, c = expr.shape
+    return 8 * r * c
+
+
+class Scheduler:
+    """
+    Evaluates the independent subtrees of an expression concurrently.
+
+    The memoizable nodes form a DAG (shared subexpressions once); a node is
+    submitted to a pool of ``workers`` threads as soon as its operands are
+    in the memo, the most expensive ready node first (``cost.node_flops``);
+    nodes below ``grain`` flops are evaluated inline instead.
+    NumPy and SciPy kernels release the GIL, so a wide sum of products runs
+    its products on several cores; the pure-Python kernels do not overlap.
+
+    ``memory`` caps, in bytes, the intermediate results held at once
+    (estimated as 8 bytes per element of the declared shapes): a ready
+    node waits while admitting it would exceed the cap, unless nothing else
+    is running, and each result is dropped from the memo once every node
+    that reads it is done.
+    """
+
+    def __init__(self, workers: Optional[int] = None, memory: Optional[int] = None, grain: int = GRAIN):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.memory = memory
+        self.grain = grain
+
+    def run(self, expr: Expr, env: Dict[str, Any], ctx: Any) -> Any:
+        from .calculus import _eval
+
+        deps: Dict[Expr, List[Expr]] = {}
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if node in deps or not isinstance(node, TASKS):
+                continue
+            deps[node] = dependencies(node)
+            stack.extend(deps[node])
+        if expr not in deps:
+            return _eval(expr, env, ctx)
+        # cos(A) reuses the mat_sincos call made for sin(A).
+        sins = {n.args[0]: n for n in deps if isinstance(n, Func) and n.name == "sin" and len(n.args) == 1}
+        for node in deps:
+            if (isinstance(node, Func) and node.name == "cos" and len(node.args) == 1
+                    and node.args[0] in ctx.sincos_args and node.args[0] in sins):
+                deps[node] = deps[node] + [sins[node.args[0]]]
+
+        users: Dict[Expr, List[Expr]] = {node: [] for node in deps}
+        for node, d in deps.items():
+            for child in d:
+                users[child].append(node)
+        waiting = {node: len(d) for node, d in deps.items()}
+        readers = {node: len(u) for node, u in users.items()}
+        order = {node: i for i, node in enumerate(deps)}
+        ready: List[Tuple[int, int, Expr]] = []
+        running: Dict[Future, Expr] = {}
+        live = 0
+
+        def push(node: Expr) -> None:
+            heapq.heappush(ready, (-node_flops(node), order[node], node))
+
+        def finish(node: Expr) -> None:
+            nonlocal live
+            live += _nbytes(node)
+            ctx.fresh.add(node)
+            for child in deps[node]:
+                readers[child] -= 1
+                if readers[child] == 0:
+                    ctx.memo.pop(child, None)
+                    ctx.fresh.discard(child)
+                    live -= _nbytes(child)
+            for parent in users[node]:
+                waiting[parent] -= 1
+                if waiting[parent] == 0:
+                    push(parent)
+
+        for node, n in waiting.items():
+            if n == 0:
+                push(node)
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="minical") as pool:
+            while ready or running:
+                while ready:
+                    flops, _, node = ready[0]
+                    if -flops < self.grain:
+                        heapq.heappop(ready)
+                        _eval(node, env, ctx)
+                        finish(node)
+                        continue
+                    if len(running) >= self.workers:
+                        break
+                    if running and self.memory is not None:
+                        held = live + sum(_nbytes(n) for n in running.values())
+                        if held + _nbytes(node) > self.memory:
+                            break
+                    heapq.heappop(ready)
+                    running[pool.submit(_eval, node, env, ctx)] = node
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    future.result()
+                    finish(node)
+        ctx.fresh.discard(expr)
+        return ctx.memo[expr]
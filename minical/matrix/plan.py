@@ -0,0 +1,520 @@
+from __future__ import annotations
+import math
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from .core import (
+    Expr, Var, Const, Add, Mul, Transpose, Inverse, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron,
+    operands, topological,
+)
+from .backend import Backend, NumpyBackend, backend_for, get_backend, np
+from .chain import optimize_chains
+from .calculus import (
+    PYTHON, NUMPY_SCALAR_FUNCS, is_scalar, _scale, mat_exp, mat_pow, mat_power, mat_sin, mat_cos, mat_sincos,
+    mat_log_numeric, _paired_trig_args, diagonal_func, scalar_slogdet, expm_multiply, eval_expr, _eigen_func,
+)
+from .factor import FactorCache
+from .structure import (
+    DIAGONAL, TRIANGULAR, DENSE_BACKENDS, tags, mul_kernel, solve_kernel, inverse_kernel, triangular_det,
+    triangular_slogdet, factor,
+)
+
+
+SCALAR = "scalar"
+# Signature entry of a 1-D array: one scalar per entry of a batch.
+STACKED_SCALAR = "scalar[]"
+
+_BATCHED = get_backend("batched") if np is not None else None
+
+SCALAR_KERNELS: Dict[str, Callable] = {
+    "exp": math.exp, "ln": math.log, "log": math.log,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "sinh": math.sinh, "cosh": math.cosh, "tanh": math.tanh,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "pow": math.pow,
+}
+
+# First line of a schedule whose matrix functions may go through an
+# eigendecomposition: one factor cache per call, as in ``eval_expr``.
+_FACTORS = "    _fc = _FactorCache()"
+
+
+def _fusions(nodes: List[Expr], root: Expr) -> Tuple[Dict[Expr, Tuple[str, Tuple]], set, Dict[Expr, Tuple]]:
+    # Steps evaluated straight from their operands -- trace(A B), trace(A^T B),
+    # trace(A B^T), kron(A, B) @ V and exp(A) @ v -- and the intermediates
+    # they skip, which must have no other consumer.  Products with such an
+    # inverse, inv(A) @ B or B @ inv(A), become solves when A is bound sparse.
+    parents: Dict[Expr, int] = {}
+    for node in nodes:
+        for c in operands(node):
+            parents[c] = parents.get(c, 0) + 1
+
+    def private(node: Expr) -> bool:
+        return parents.get(node, 0) == 1 and node is not root
+
+    fused: Dict[Expr, Tuple[str, Tuple]] = {}
+    skipped = set()
+    inverses: Dict[Expr, Tuple] = {}
+    for node in nodes:
+        if isinstance(node, Mul) and isinstance(node.a, Kron) and private(node.a):
+            fused[node] = ("kron_mul", (node.a.a, node.a.b, node.b))
+            skipped.add(node.a)
+        elif (isinstance(node, Mul) and isinstance(node.a, Func) and node.a.name == "exp" and len(node.a.args) == 1
+              and node.shape[1] == 1 and node.a.shape[0] > 1 and private(node.a)
+              and DIAGONAL not in tags(node.a.args[0])):
+            fused[node] = ("expm_multiply", (node.a.args[0], node.b))
+            skipped.add(node.a)
+        elif isinstance(node, Mul) and isinstance(node.a, Inverse) and private(node.a):
+            inverses[node] = (node.a, node.b, True)
+        elif isinstance(node, Mul) and isinstance(node.b, Inverse) and private(node.b):
+            inverses[node] = (node.b, node.a, False)
+        elif isinstance(node, Trace) and isinstance(node.x, Mul) and private(node.x) and node.x not in fused:
+            a, b = node.x.a, node.x.b
+            kernel = "trace_mul"
+            if isinstance(a, Transpose) and private(a):
+                skipped.add(a)
+                a, kernel = a.x, "inner"
+            elif isinstance(b, Transpose) and private(b):
+                skipped.add(b)
+                b, kernel = b.x, "inner"
+            fused[node] = (kernel, (a, b))
+            skipped.add(node.x)
+    return fused, skipped, {n: v for n, v in inverses.items() if n not in skipped}
+
+
+def _constant(node: Any) -> Any:
+    """Numeric value of a literal leaf, or ``None``."""
+    if isinstance(node, Const):
+        try:
+            return float(node.name)
+        except ValueError:
+            return None
+    if not isinstance(node, Expr) and is_scalar(node):
+        return node
+    return None
+
+
+def _higher(a: Backend, b: Backend) -> Backend:
+    return a if a.priority >= b.priority else b
+
+
+def _inverse(a: Any, t: Any = frozenset()) -> Any:
+    inv = factor(a, t).inverse()
+    if inv is None:
+        raise ValueError("Plan evaluation of a singular inverse")
+    return inv
+
+
+def _nonsingular(inv: Any) -> Any:
+    if inv is None:
+        raise ValueError("Plan evaluation of a singular inverse")
+    return inv
+
+
+def _logdet(slogdet: Tuple[Any, Any]) -> Any:
+    sign, logabs = slogdet
+    if np is not None and isinstance(sign, np.ndarray):
+        return np.where(sign > 0, logabs, np.nan)
+    if sign <= 0:
+        raise ValueError("Plan evaluation of logdet of a matrix with non-positive determinant")
+    return logabs
+
+
+def _dense(*kinds: Any) -> bool:
+    return all(k != SCALAR and k.name in DENSE_BACKENDS for k in kinds)
+
+
+def _diagonal_func(name: str, a: Any, *rest: Any) -> Any:
+    value = diagonal_func(name, a, rest)
+    if value is None:
+        raise ValueError(f"Plan evaluation of {name} outside its domain")
+    return value
+
+
+def _solve_right(be: Backend, a: Any, b: Any) -> Any:
+    # B @ inv(A) = solve(A^T, B^T)^T
+    return be.transpose(_nonsingular(be.solve(be.transpose(a), be.transpose(b))))
+
+
+def _sincos(sin: Func, cos: Func, a: Any, factors: FactorCache) -> Tuple[Any, Any]:
+    # Both off one eigendecomposition when ``a`` is symmetric, else one mat_sincos.
+    s = _eigen_func(sin, [a], factors)
+    if s is None:
+        return mat_sincos(a)
+    return s, _eigen_func(cos, [a], factors)
+
+
+def _matrix_pow(a: Any, p: Any) -> Any:
+    if float(p).is_integer() and p >= 0:
+        return mat_pow(a, int(p))
+    return mat_power(a, float(p))
+
+
+class Plan:
+    """
+    Straight-line schedule of kernel calls for one matrix expression.
+
+    The tree is walked once: every distinct node becomes one step, chains of
+    products are re-associated, ``sin``/``cos`` pairs share one
+    ``mat_sincos``, and ``trace(A @ B)``, ``kron(A, B) @ V`` and
+    ``exp(A) @ v`` run as one fused step when nothing else uses the
+    intermediate.  As in ``eval_expr``, ``inv(A) @ B`` is a solve when ``A``
+    is sparse and matrix functions of a symmetric argument share its
+    eigendecomposition.  On the first call with a given set of bindings (scalar
+    or matrix, backend and shape of every variable) each step is resolved to
+    its kernel and the schedule is compiled to a Python function; later
+    calls with the same kind of bindings only run that function.
+
+    On NumPy bindings whose shapes match the declared ones, sums and
+    products write into temporaries preallocated per step, so a plan must
+    not be called from several threads at once.  Bindings the schedule
+    cannot evaluate (unbound variables, singular inverses, matrix functions
+    outside their domain) are handed to ``eval_expr``, so a plan returns
+    what ``eval_expr`` would, symbolic parts included.
+    """
+
+    def __init__(self, expr: Expr, backend: Union[str, Backend, None] = None, optimize: bool = True):
+        self.expr = optimize_chains(expr) if optimize else expr
+        self.backend = get_backend(backend)
+        self.nodes = topological(self.expr)
+        self.vars = tuple(sorted({n.name for n in self.nodes if isinstance(n, Var)}))
+        self._sincos_args = _paired_trig_args(self.expr)
+        self._fused, self._skipped, self._inverses = _fusions(self.nodes, self.expr)
+        self._specialized: Dict[Tuple, Tuple[Callable, str]] = {}
+
+    def _signature(self, env: Dict[str, Any]) -> Tuple:
+        sig = []
+        for name in self.vars:
+            try:
+                value = env[name]
+            except KeyError:
+                raise ValueError(f"Unbound variable: {name}")
+            if is_scalar(value):
+                sig.append(STACKED_SCALAR if np is not None and isinstance(value, np.ndarray) and value.ndim
+                           else SCALAR)
+                continue
+            be = self.backend or backend_for(value)
+            if be is None:
+                raise ValueError(f"Cannot evaluate {name!r} bound to {type(value).__name__}")
+            sig.append((be, tuple(be.shape(value)) if backend_for(value) is be else None))
+        return tuple(sig)
+
+    def __call__(self, env: Dict[str, Any]) -> Any:
+        try:
+            return self._compiled(self._signature(env))[0](env)
+        except ValueError:
+            return self._fallback(env)
+
+    def source(self, env: Dict[str, Any]) -> str:
+        """Generated schedule for bindings like ``env``."""
+        return self._compiled(self._signature(env))[1]
+
+    def _compiled(self, sig: Tuple) -> Tuple[Callable, str]:
+        fn = self._specialized.get(sig)
+        if fn is None:
+            try:
+                fn = self._specialize(sig)
+            except ValueError as e:
+                fn = (self._fallback, f"# eval_expr: {e}")
+            self._specialized[sig] = fn
+        return fn
+
+    def _fallback(self, env: Dict[str, Any]) -> Any:
+        return eval_expr(self.expr, env, self.backend, optimize=False)
+
+    def _specialize(self, sig: Tuple) -> Tuple[Callable, str]:
+        names: Dict[Expr, str] = {}
+        kinds: Dict[Expr, Any] = {}
+        exact: Dict[Expr, bool] = {}
+        ns: Dict[str, Any] = {"_FactorCache": FactorCache}
+        lines: List[str] = []
+        sincos: Dict[Expr, str] = {}
+        stacked = set()
+
+        def bind(value: Any, prefix: str) -> str:
+            name = f"_{prefix}{len(ns)}"
+            ns[name] = value
+            return name
+
+        def ref(node: Any) -> str:
+            if isinstance(node, Expr) and node in names:
+                return names[node]
+            value = _constant(node)
+            if value is None:
+                raise ValueError(f"Cannot plan symbolic constant: {node}")
+            kinds[node] = SCALAR
+            return bind(value, "c")
+
+        def kind(node: Any) -> Any:
+            return kinds.get(node, SCALAR) if isinstance(node, Expr) else SCALAR
+
+        escaping = set()
+        node = self.expr
+        while True:
+            escaping.add(node)
+            if not isinstance(node, Transpose):
+                break
+            node = node.x
+
+        var_kind = dict(zip(self.vars, sig))
+        # Inverses of sparse matrices only read by a product, which solves.
+        deferred = set()
+        solved = {inv: node for node, (inv, _, _) in self._inverses.items()}
+
+        def step(node: Expr) -> None:
+            children = self._fused[node][1] if node in self._fused else operands(node)
+            shaped = all(exact.get(c, False) for c in children if kind(c) != SCALAR)
+            buffered = node not in escaping and shaped
+            call, result = self._kernel(node, kind, ref, bind, sincos, lines, buffered, stacked)
+            if result == SCALAR and any(c in stacked or kind(c) is _BATCHED for c in children):
+                stacked.add(node)
+            target = f"_t{len(lines)}"
+            lines.append(f"    {target} = {call}")
+            names[node] = target
+            kinds[node] = result
+            exact[node] = result != SCALAR and shaped
+
+        for node in self.nodes:
+            if node in self._skipped:
+                continue
+            if node in solved and kind(node.x) != SCALAR and kind(node.x).sparse:
+                deferred.add(node)
+                continue
+            if node in self._inverses and self._inverses[node][0] in deferred:
+                inv, other, left = self._inverses[node]
+                if kind(other) == SCALAR:
+                    step(inv)
+                else:
+                    be = _higher(kind(inv.x), kind(other))
+                    a, b = ref(inv.x), ref(other)
+                    call = (f"{bind(_nonsingular, 'k')}({bind(kind(inv.x).solve, 'k')}({a}, {b}))" if left
+                            else f"{bind(_solve_right, 'k')}({bind(kind(inv.x), 'k')}, {a}, {b})")
+                    target = f"_t{len(lines)}"
+                    lines.append(f"    {target} = {call}")
+                    names[node], kinds[node], exact[node] = target, be, False
+                    continue
+            if isinstance(node, Var):
+                k = var_kind[node.name]
+                target = f"_v{len(lines)}"
+                if k in (SCALAR, STACKED_SCALAR):
+                    lines.append(f"    {target} = _env[{node.name!r}]")
+                    kinds[node] = SCALAR
+                    if k == STACKED_SCALAR:
+                        stacked.add(node)
+                else:
+                    be, shape = k
+                    if shape is None:
+                        lines.append(f"    {target} = {bind(be.asmatrix, 'k')}(_env[{node.name!r}])")
+                    else:
+                        lines.append(f"    {target} = _env[{node.name!r}]")
+                    kinds[node] = be
+                    exact[node] = shape == node.shape
+                names[node] = target
+                continue
+            if isinstance(node, Const):
+                if node.name == "I":
+                    be = self.backend or PYTHON
+                    names[node] = bind(be.eye(node.shape[0]), "c")
+                    kinds[node] = be
+                    continue
+                names[node] = ref(node)
+                continue
+            step(node)
+
+        body = ["def _plan(_env):"] + lines + [f"    return {ref(self.expr)}"]
+        source = "\n".join(body)
+        exec(compile(source, "<minical.matrix.plan>", "exec"), ns)
+        return ns["_plan"], source
+
+    def _kernel(self, node: Expr, kind, ref, bind, sincos, lines, buffered: bool, stacked: set) -> Tuple[str, Any]:
+        # ``buffered``: the node's value never leaves the call and its operands
+        # have their declared shapes, so a NumPy result may go to a temporary.
+        def out(k: Callable) -> str:
+            return bind(k, "k")
+
+        if node in self._fused:
+            kernel, inputs = self._fused[node]
+            refs = [ref(x) for x in inputs]
+            if any(kind(x) == SCALAR for x in inputs):
+                raise ValueError(f"Cannot plan {node} with scalar operands")
+            be = kind(inputs[0])
+            for x in inputs[1:]:
+                be = _higher(be, kind(x))
+            if kernel == "expm_multiply":
+                return f"{out(expm_multiply)}({', '.join(refs)})", be
+            return f"{out(getattr(be, kernel))}({', '.join(refs)})", (be if kernel == "kron_mul" else SCALAR)
+
+        if isinstance(node, (Hadamard, Kron)):
+            a, b = ref(node.a), ref(node.b)
+            ka, kb = kind(node.a), kind(node.b)
+            if ka == SCALAR and kb == SCALAR:
+                return f"{a} * {b}", SCALAR
+            if isinstance(node, Kron) and (ka == SCALAR or kb == SCALAR):
+                (m, km), (c, sc) = ((b, kb), (a, node.a)) if ka == SCALAR else ((a, ka), (b, node.b))
+                if sc in stacked:
+                    return f"{out(_scale)}({m}, {c})", _BATCHED
+                return f"{out(km.scale)}({m}, {c})", km
+            if ka == SCALAR or kb == SCALAR:
+                raise ValueError(f"Cannot plan an element-wise product of a scalar and a matrix: {node}")
+            be = _higher(ka, kb)
+            if isinstance(node, Kron):
+                return f"{out(be.kron)}({a}, {b})", be
+            if buffered and isinstance(be, NumpyBackend):
+                return f"{out(np.multiply)}({a}, {b}, out={bind(np.empty(node.shape), 'b')})", be
+            return f"{out(be.hadamard)}({a}, {b})", be
+
+        if isinstance(node, (Add, Mul)):
+            a, b = ref(node.a), ref(node.b)
+            ka, kb = kind(node.a), kind(node.b)
+            if ka == SCALAR and kb == SCALAR:
+                return f"{a} {'+' if isinstance(node, Add) else '*'} {b}", SCALAR
+            if isinstance(node, Add):
+                if ka == SCALAR or kb == SCALAR:
+                    raise ValueError(f"Cannot add a scalar and a matrix: {node}")
+                be = _higher(ka, kb)
+                if buffered and isinstance(be, NumpyBackend):
+                    return f"{out(np.add)}({a}, {b}, out={bind(np.empty(node.shape), 'b')})", be
+                return f"{out(be.add)}({a}, {b})", be
+            if ka == SCALAR or kb == SCALAR:
+                (m, km), (c, sc) = ((b, kb), (a, node.a)) if ka == SCALAR else ((a, ka), (b, node.b))
+                if sc in stacked:
+                    return f"{out(_scale)}({m}, {c})", _BATCHED
+                return f"{out(km.scale)}({m}, {c})", km
+            be = _higher(ka, kb)
+            kernel = mul_kernel(tags(node.a), tags(node.b)) if _dense(ka, kb) else None
+            if kernel is not None:
+                return f"{out(kernel)}({a}, {b})", be
+            if buffered and isinstance(be, NumpyBackend):
+                return f"{out(np.matmul)}({a}, {b}, out={bind(np.empty(node.shape), 'b')})", be
+            return f"{out(be.mul)}({a}, {b})", be
+
+        if isinstance(node, ScalarMul):
+            c, m = ref(node.scalar), ref(node.mat)
+            km = kind(node.mat)
+            if kind(node.scalar) != SCALAR:
+                raise ValueError(f"Cannot plan scaling by a matrix: {node}")
+            if km == SCALAR:
+                return f"{c} * {m}", SCALAR
+            if node.scalar in stacked:
+                return f"{out(_scale)}({m}, {c})", _BATCHED
+            return f"{out(km.scale)}({m}, {c})", km
+
+        if isinstance(node, Solve):
+            a, b = ref(node.a), ref(node.b)
+            ka, kb = kind(node.a), kind(node.b)
+            if ka == SCALAR and kb == SCALAR:
+                return f"{b} / {a}", SCALAR
+            if ka == SCALAR or kb == SCALAR:
+                raise ValueError(f"Cannot plan a solve with a scalar operand: {node}")
+            be = _higher(ka, kb)
+            t = tags(node.a)
+            kernel = solve_kernel(t) if _dense(ka, kb) else None
+            if kernel is not None:
+                return f"{out(_nonsingular)}({out(kernel)}({a}, {b}))", be
+            if be is ka and ka.factorizable:
+                return f"{out(_nonsingular)}({out(factor)}({a}, {bind(t, 'c')}).solve({b}))", be
+            return f"{out(_nonsingular)}({out(be.solve)}({a}, {b}))", be
+
+        if isinstance(node, (Trace, Det, LogDet)):
+            x, k = ref(node.x), kind(node.x)
+            if k == SCALAR:
+                if isinstance(node, LogDet):
+                    return f"{out(_logdet)}({out(scalar_slogdet)}({x}))", SCALAR
+                return x, SCALAR
+            if isinstance(node, Trace):
+                return f"{out(k.trace)}({x})", SCALAR
+            t = tags(node.x)
+            triangular = bool(t & TRIANGULAR) and _dense(k)
+            if isinstance(node, Det):
+                if triangular:
+                    return f"{out(triangular_det)}({x})", SCALAR
+                if k.factorizable:
+                    return f"{out(factor)}({x}, {bind(t, 'c')}).det()", SCALAR
+                return f"{out(k.det)}({x})", SCALAR
+            if triangular:
+                return f"{out(_logdet)}({out(triangular_slogdet)}({x}))", SCALAR
+            if k.factorizable:
+                return f"{out(_logdet)}({out(factor)}({x}, {bind(t, 'c')}).slogdet())", SCALAR
+            return f"{out(_logdet)}({out(k.slogdet)}({x}))", SCALAR
+
+        if isinstance(node, (Transpose, Inverse)):
+            x, k = ref(node.x), kind(node.x)
+            if k == SCALAR:
+                raise ValueError(f"Cannot plan {type(node).__name__.lower()} of a scalar: {node}")
+            if isinstance(node, Transpose):
+                return f"{out(k.transpose)}({x})", k
+            t = tags(node.x)
+            kernel = inverse_kernel(t) if _dense(k) else None
+            if kernel is not None:
+                return f"{out(_nonsingular)}({out(kernel)}({x}))", k
+            if k.factorizable:
+                return f"{out(_inverse)}({x}, {bind(t, 'c')})", k
+            return f"{out(_nonsingular)}({out(k.inverse)}({x}))", k
+
+        args = [ref(a) for a in node.args]
+        arg_kinds = [kind(a) for a in node.args]
+        if all(k == SCALAR for k in arg_kinds):
+            if any(a in stacked for a in node.args if isinstance(a, Expr)):
+                if node.name not in NUMPY_SCALAR_FUNCS:
+                    raise ValueError(f"Unknown scalar function: {node.name}")
+                used = args if node.name == "pow" else args[:1]
+                return f"{out(getattr(np, NUMPY_SCALAR_FUNCS[node.name]))}({', '.join(used)})", SCALAR
+            if node.name not in SCALAR_KERNELS:
+                raise ValueError(f"Unknown scalar function: {node.name}")
+            return f"{out(SCALAR_KERNELS[node.name])}({', '.join(args)})", SCALAR
+        be = arg_kinds[0]
+        if be == SCALAR or any(k != SCALAR for k in arg_kinds[1:]):
+            raise ValueError(f"Cannot plan matrix function: {node}")
+        name = node.name
+        if DIAGONAL in tags(node.args[0]) and _dense(be) and name in NUMPY_SCALAR_FUNCS:
+            return f"{out(_diagonal_func)}({name!r}, {', '.join(args)})", be
+        # Dense arguments try the eigendecomposition first, as ``eval_expr``
+        # does; it declines non-symmetric arguments at run time.
+        eigen = _dense(be) and name in NUMPY_SCALAR_FUNCS
+        if eigen and lines[:1] != [_FACTORS]:
+            lines.insert(0, _FACTORS)
+        if len(args) == 1 and name in ("sin", "cos") and node.args[0] in self._sincos_args:
+            arg = node.args[0]
+            if arg not in sincos:
+                sincos[arg] = f"_s{len(lines)}"
+                if eigen:
+                    pair = f"{out(_sincos)}({bind(Func('sin', (arg,)), 'c')}, {bind(Func('cos', (arg,)), 'c')}, "
+                    lines.append(f"    {sincos[arg]} = {pair}{args[0]}, _fc)")
+                else:
+                    lines.append(f"    {sincos[arg]} = {out(mat_sincos)}({args[0]})")
+            return f"{sincos[arg]}[{0 if name == 'sin' else 1}]", be
+        call = self._matrix_func(node, args, out)
+        if eigen:
+            target = f"_e{len(lines)}"
+            lines.append(f"    {target} = {out(_eigen_func)}({bind(node, 'c')}, [{', '.join(args)}], _fc)")
+            call = f"{target} if {target} is not None else {call}"
+        return call, be
+
+    def _matrix_func(self, node: Func, args: List[str], out: Callable) -> str:
+        name = node.name
+        if name == "pow" and len(args) == 2:
+            p = _constant(node.args[1])
+            if p is None:
+                return f"{out(_matrix_pow)}({args[0]}, {args[1]})"
+            if float(p).is_integer() and p >= 0:
+                return f"{out(mat_pow)}({args[0]}, {int(p)})"
+            return f"{out(mat_power)}({args[0]}, {float(p)!r})"
+        if len(args) == 1:
+            if name == "exp":
+                return f"{out(mat_exp)}({args[0]})"
+            if name in ("sin", "cos"):
+                return f"{out(mat_sin if name == 'sin' else mat_cos)}({args[0]})"
+            if name in ("ln", "log"):
+                return f"{out(mat_log_numeric)}({args[0]})"
+        raise ValueError(f"Cannot plan matrix function: {node}")
+
+    def __repr__(self) -> str:
+        return f"<Plan steps={len(self.nodes)} vars={self.vars} specializations={len(self._specialized)}>"
+
+
+def compile_plan(expr: Expr, backend: Union[str, Backend, None] = None, optimize: bool = True) -> Plan:
+    """
+    Compile ``expr`` into a reusable ``Plan``; ``plan(env)`` then evaluates
+    it like ``eval_expr(expr, env, backend)`` without re-dispatching on the
+    tree.
+    """
+    return Plan(expr, backend, optimize)
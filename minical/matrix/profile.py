@@ -0,0 +1,221 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .core import Expr, Var, Func, ScalarMul, operands
+from .backend import backend_for
+from .cost import node_flops
+
+# Longest node label kept in a record.
+LABEL = 60
+
+SORT_KEYS = ("seconds", "wall", "flops", "bytes", "peak")
+
+
+@dataclass
+class NodeRecord:
+    """One node evaluated under a ``Profiler``."""
+
+    node: str
+    kernel: str
+    shapes: List[Tuple[int, int]]  # declared operand shapes
+    shape: Tuple[int, int]  # declared result shape
+    flops: int  # estimate, see ``cost.node_flops``
+    seconds: float  # self time: operands evaluated inside the node excluded
+    wall: float  # including the operands
+    bytes: int  # size of the result
+    peak: Optional[int]  # tracemalloc peak above the start of the node
+    start: float  # seconds since the profiler was started
+    thread: int
+
+
+def _operand_values(node: Expr, env: Dict[str, Any], memo: Dict[Expr, Any]) -> List[Any]:
+    # Evaluated operands, looking through the ones a fused kernel skipped.
+    values = []
+    stack = list(operands(node))
+    while stack:
+        c = stack.pop()
+        if isinstance(c, Var):
+            values.append(env.get(c.name))
+        elif c in memo:
+            values.append(memo[c])
+        else:
+            stack.extend(operands(c))
+    return values
+
+
+def _op(node: Expr) -> str:
+    if isinstance(node, Func):
+        return node.name
+    if isinstance(node, ScalarMul):
+        return "scale"
+    return type(node).__name__.lower()
+
+
+def value_nbytes(x: Any) -> int:
+    """Bytes held by a result: array buffers, sparse index arrays, 8 per list entry."""
+    if isinstance(x, (int, float)):
+        return 8
+    if hasattr(x, "nbytes"):
+        return int(x.nbytes)
+    if isinstance(x, list):
+        return 8 * sum(len(r) if isinstance(r, list) else 1 for r in x)
+    total = 0
+    for k in ("data", "indices", "indptr", "row", "col"):
+        part = getattr(x, k, None)
+        if hasattr(part, "nbytes"):
+            total += int(part.nbytes)
+        elif hasattr(part, "itemsize"):
+            total += part.itemsize * len(part)
+        elif isinstance(part, list):
+            total += 8 * len(part)
+    return total
+
+
+class Profiler:
+    """
+    Per-node instrumentation for ``eval_expr(..., profile=Profiler())``.
+
+    Every node evaluated (once per call, memo hits are not repeated) adds a
+    ``NodeRecord``: the kernel that ran (backend and operation, or the fused
+    path such as ``numpy.expm_multiply``), the declared shapes, the
+    estimated flops, the self and inclusive wall time and the size of the
+    result.  With ``memory=True`` tracemalloc also reports the peak memory
+    allocated while each node ran (NumPy buffers included); tracing slows
+    evaluation down noticeably and peaks overlap under ``workers``.
+
+    ``report()`` renders the records sorted by self time (or flops, bytes,
+    ...), and ``trace()`` / ``dump(path)`` give a Chrome trace-event JSON
+    that chrome://tracing and Perfetto display as a timeline.  A profiler
+    can be reused across calls; ``clear()`` drops the records.  Without a
+    profiler the evaluator pays one ``None`` check per node.
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.records: List[NodeRecord] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._tracing = False
+        self._depth = 0
+
+    def __enter__(self) -> "Profiler":
+        with self._lock:
+            if self._depth == 0 and self.memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            self._depth += 1
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0 and self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+    def clear(self) -> None:
+        self.records.clear()
+        self._origin = time.perf_counter()
+
+    def _stack(self) -> List[List[Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def note(self, kernel: str) -> None:
+        """Name the kernel of the node being evaluated (fused paths)."""
+        stack = self._stack()
+        if stack:
+            stack[-1][0] = kernel
+
+    def evaluate(self, expr: Expr, env: Dict[str, Any], ctx: Any, evaluate: Callable) -> Any:
+        # frame: [kernel note, operand time, peak seen by operands, memory at entry]
+        stack = self._stack()
+        tracing = self.memory and tracemalloc.is_tracing()
+        frame: List[Any] = [None, 0.0, 0, 0]
+        if tracing:
+            frame[3] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            value = evaluate(expr, env, ctx)
+        finally:
+            wall = time.perf_counter() - start
+            stack.pop()
+        peak = None
+        if tracing:
+            top = max(frame[2], tracemalloc.get_traced_memory()[1])
+            peak = top - frame[3]
+            if stack:
+                stack[-1][2] = max(stack[-1][2], top)
+                tracemalloc.reset_peak()
+        if stack:
+            stack[-1][1] += wall
+
+        be = backend_for(value, *_operand_values(expr, env, ctx.memo))
+        label = str(expr)
+        self.records.append(NodeRecord(
+            node=label if len(label) <= LABEL else label[:LABEL - 3] + "...",
+            kernel=f"{be.name if be is not None else 'scalar'}.{frame[0] or _op(expr)}",
+            shapes=[c.shape for c in operands(expr)],
+            shape=expr.shape,
+            flops=node_flops(expr),
+            seconds=wall - frame[1],
+            wall=wall,
+            bytes=value_nbytes(value),
+            peak=peak,
+            start=start - self._origin,
+            thread=threading.get_ident(),
+        ))
+        return value
+
+    def total(self) -> float:
+        """Self time summed over the records, in seconds."""
+        return sum(r.seconds for r in self.records)
+
+    def report(self, sort: str = "seconds", limit: Optional[int] = 20) -> str:
+        """The records as a table, largest ``sort`` key first."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {SORT_KEYS}")
+        rows = sorted(self.records, key=lambda r: getattr(r, sort) or 0, reverse=True)
+        total = self.total() or 1.0
+        lines = [f"{'self ms':>9} {'%':>5} {'wall ms':>9} {'MFLOP':>9} {'GFLOP/s':>8} {'bytes':>11} "
+                 f"{'peak':>11}  {'kernel':<24} {'shapes':<24} node"]
+        for r in rows[:limit]:
+            rate = r.flops / r.seconds / 1e9 if r.seconds > 0 else 0.0
+            shapes = ",".join(f"{m}x{n}" for m, n in r.shapes) + f"->{r.shape[0]}x{r.shape[1]}"
+            lines.append(f"{r.seconds * 1e3:9.3f} {100 * r.seconds / total:5.1f} {r.wall * 1e3:9.3f} "
+                         f"{r.flops / 1e6:9.3f} {rate:8.2f} {r.bytes:11d} "
+                         f"{'-' if r.peak is None else r.peak:>11}  {r.kernel:<24} {shapes:<24} {r.node}")
+        hidden = len(rows) - len(lines) + 1
+        if hidden > 0:
+            lines.append(f"... {hidden} more")
+        lines.append(f"{len(rows)} nodes, {self.total() * 1e3:.3f} ms, "
+                     f"{sum(r.flops for r in rows) / 1e6:.3f} MFLOP estimated")
+        return "\n".join(lines)
+
+    def trace(self) -> Dict[str, Any]:
+        """The records as Chrome trace events (complete ``"X"`` events, microseconds)."""
+        pid = os.getpid()
+        events = []
+        for r in self.records:
+            args = asdict(r)
+            events.append({
+                "name": r.kernel, "cat": "minical", "ph": "X", "pid": pid, "tid": r.thread,
+                "ts": r.start * 1e6, "dur": r.wall * 1e6,
+                "args": {k: args[k] for k in ("node", "shapes", "shape", "flops", "seconds", "bytes", "peak")},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
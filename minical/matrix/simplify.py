@@ -1,5 +1,32 @@
-from .core import Expr, Add, Transpose, Inverse, Const, Mul, Func
-from .ops import add, mul
+from .core import (
+    Expr, Add, Transpose, Inverse, Const, Mul, Func, Trace, Det, LogDet, ScalarMul, Solve, Hadamard, Kron, intern,
+)
+from .ops import add, mul, scale, transpose, inverse, solve, trace, det, logdet, func, hadamard, kron
+
+
+def _square(x: Expr) -> bool:
+    return x.shape[0] == x.shape[1]
+
+
+def _simplify_mul(a: Expr, b: Expr) -> Expr:
+    if isinstance(b, Const) and b.name == "I":
+        return a
+    if isinstance(a, Const) and a.name == "I":
+        return b
+    # A^-1 B -> solve(A, B): one factorization instead of an explicit inverse.
+    if isinstance(a, Inverse):
+        return solve(a.x, b)
+    # (X A^-1) B -> X solve(A, B)
+    if isinstance(a, Mul) and isinstance(a.b, Inverse):
+        return mul(a.a, solve(a.b.x, b))
+    # solve(M, A^-1) C -> solve(M, solve(A, C)), e.g. for (A M)^-1 C.
+    if isinstance(a, Solve) and isinstance(a.b, Inverse):
+        return solve(a.a, solve(a.b.x, b))
+    # (A (x) B)(C (x) D) -> (AC) (x) (BD)
+    if (isinstance(a, Kron) and isinstance(b, Kron)
+            and a.a.shape[1] == b.a.shape[0] and a.b.shape[1] == b.b.shape[0]):
+        return kron(_simplify_mul(a.a, b.a), _simplify_mul(a.b, b.b))
+    return mul(a, b)
 
 
 def simplify(expr: Expr) -> Expr:
@@ -9,25 +36,63 @@ def simplify(expr: Expr) -> Expr:
         return add(a, b)
 
     if isinstance(expr, Mul):
-        a = simplify(expr.a)
-        b = simplify(expr.b)
-        if isinstance(b, Const) and b.name == "I":
-            return a
-        if isinstance(a, Const) and a.name == "I":
-            return b
-        return mul(a, b)
+        return _simplify_mul(simplify(expr.a), simplify(expr.b))
 
     if isinstance(expr, Transpose):
         x = simplify(expr.x)
         if isinstance(x, Transpose):
             return x.x
-        return Transpose(x)
+        # (AB)^T -> B^T A^T when that cancels a transpose of A or B.
+        if isinstance(x, Mul) and (isinstance(x.a, Transpose) or isinstance(x.b, Transpose)):
+            return _simplify_mul(transpose(x.b), transpose(x.a))
+        if isinstance(x, Hadamard) and (isinstance(x.a, Transpose) or isinstance(x.b, Transpose)):
+            return hadamard(transpose(x.a), transpose(x.b))
+        # (A (x) B)^T -> A^T (x) B^T: two small transposes instead of a large one.
+        if isinstance(x, Kron):
+            return kron(transpose(x.a), transpose(x.b))
+        return transpose(x)
 
     if isinstance(expr, Inverse):
         x = simplify(expr.x)
         if isinstance(x, Inverse):
             return x.x
-        return Inverse(x)
+        # (AB)^-1 -> B^-1 A^-1 for square A and B, which then becomes solve(B, A^-1).
+        if isinstance(x, Mul) and _square(x.a) and _square(x.b):
+            return _simplify_mul(inverse(x.b), inverse(x.a))
+        if isinstance(x, Kron) and _square(x.a) and _square(x.b):
+            return kron(inverse(x.a), inverse(x.b))
+        return inverse(x)
+
+    if isinstance(expr, Solve):
+        a, b = simplify(expr.a), simplify(expr.b)
+        # (A (x) B)^-1 v -> (A^-1 (x) B^-1) v: two small inverses, applied without forming the product.
+        if isinstance(a, Kron) and _square(a.a) and _square(a.b):
+            return mul(kron(inverse(a.a), inverse(a.b)), b)
+        return solve(a, b)
+
+    if isinstance(expr, Hadamard):
+        return hadamard(simplify(expr.a), simplify(expr.b))
+
+    if isinstance(expr, Kron):
+        return kron(simplify(expr.a), simplify(expr.b))
+
+    if isinstance(expr, Trace):
+        x = simplify(expr.x)
+        if isinstance(x, Transpose):
+            return trace(x.x)
+        # tr(A (x) B) = tr(A) tr(B)
+        if isinstance(x, Kron) and _square(x.a) and _square(x.b):
+            return mul(trace(x.a), trace(x.b))
+        return trace(x)
+
+    if isinstance(expr, Det):
+        return det(simplify(expr.x))
+
+    if isinstance(expr, LogDet):
+        return logdet(simplify(expr.x))
+
+    if isinstance(expr, ScalarMul):
+        return scale(simplify(expr.scalar), simplify(expr.mat))
 
     if isinstance(expr, Func):
         args = tuple(simplify(a) for a in expr.args)
@@ -52,7 +117,7 @@ def simplify(expr: Expr) -> Expr:
             if isinstance(exponent, Const) and exponent.name == "1":
                 return base
             if isinstance(exponent, Const) and exponent.name == "0":
-                return Const("1", (1,1))
-        return Func(expr.name, args)
+                return intern(Const("1", (1,1)))
+        return func(expr.name, *args)
 
     return expr
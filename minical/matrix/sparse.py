@@ -0,0 +1,576 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .backend import Backend, backend_for, register_backend, np
+from .calculus import PYTHON, Matrix
+
+try:
+    import scipy.sparse as _sp
+    import scipy.sparse.linalg as _spla
+except ImportError:
+    _sp = None
+    _spla = None
+
+
+PIVOT_TOL = 1e-12
+
+
+class CSRMatrix:
+    """
+    Compressed sparse row matrix of floats.
+
+    Row ``i`` holds the columns ``indices[indptr[i]:indptr[i + 1]]`` (sorted)
+    and the matching ``data``; explicit zeros are never stored.
+    """
+
+    __slots__ = ("shape", "indptr", "indices", "data")
+
+    def __init__(self, shape: Tuple[int, int], indptr: List[int], indices: List[int], data: List[float]):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, shape: Tuple[int, int], rows: List[Dict[int, float]]) -> "CSRMatrix":
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for j in sorted(row):
+                v = row[j]
+                if v:
+                    indices.append(j)
+                    data.append(float(v))
+            indptr.append(len(indices))
+        return cls(shape, indptr, indices, data)
+
+    @classmethod
+    def from_dense(cls, a: Any) -> "CSRMatrix":
+        rows = [{j: v for j, v in enumerate(row) if v} for row in a]
+        return cls.from_rows((len(rows), len(a[0]) if len(rows) else 0), rows)
+
+    @classmethod
+    def identity(cls, n: int) -> "CSRMatrix":
+        return cls((n, n), list(range(n + 1)), list(range(n)), [1.0] * n)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def row(self, i: int) -> Tuple[List[int], List[float]]:
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def row_dicts(self) -> List[Dict[int, float]]:
+        return [dict(zip(*self.row(i))) for i in range(self.shape[0])]
+
+    def todense(self) -> Matrix:
+        n, m = self.shape
+        out = [[0.0] * m for _ in range(n)]
+        for i in range(n):
+            row = out[i]
+            for j, v in zip(*self.row(i)):
+                row[j] = v
+        return out
+
+    def tocoo(self) -> "COOMatrix":
+        rows = [i for i in range(self.shape[0]) for _ in range(self.indptr[i], self.indptr[i + 1])]
+        return COOMatrix(self.shape, rows, list(self.indices), list(self.data))
+
+    def __repr__(self) -> str:
+        return f"<CSRMatrix {self.shape[0]}x{self.shape[1]} nnz={self.nnz}>"
+
+
+class COOMatrix:
+    """Coordinate-format sparse matrix; duplicate entries are summed by ``tocsr``."""
+
+    __slots__ = ("shape", "row", "col", "data")
+
+    def __init__(self, shape: Tuple[int, int], row: List[int], col: List[int], data: List[float]):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.row = row
+        self.col = col
+        self.data = data
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def tocsr(self) -> CSRMatrix:
+        rows: List[Dict[int, float]] = [{} for _ in range(self.shape[0])]
+        for i, j, v in zip(self.row, self.col, self.data):
+            rows[i][j] = rows[i].get(j, 0.0) + v
+        return CSRMatrix.from_rows(self.shape, rows)
+
+    def todense(self) -> Matrix:
+        return self.tocsr().todense()
+
+    def __repr__(self) -> str:
+        return f"<COOMatrix {self.shape[0]}x{self.shape[1]} nnz={self.nnz}>"
+
+
+def csr_add(a: CSRMatrix, b: CSRMatrix) -> CSRMatrix:
+    if a.shape != b.shape:
+        raise ValueError("Sparse add shape mismatch")
+    rows = a.row_dicts()
+    for i, row in enumerate(rows):
+        for j, v in zip(*b.row(i)):
+            row[j] = row.get(j, 0.0) + v
+    return CSRMatrix.from_rows(a.shape, rows)
+
+
+def csr_scale(a: CSRMatrix, s: float) -> CSRMatrix:
+    if not s:
+        return CSRMatrix(a.shape, [0] * (a.shape[0] + 1), [], [])
+    return CSRMatrix(a.shape, list(a.indptr), list(a.indices), [v * s for v in a.data])
+
+
+def csr_transpose(a: CSRMatrix) -> CSRMatrix:
+    n, m = a.shape
+    counts = [0] * (m + 1)
+    for j in a.indices:
+        counts[j + 1] += 1
+    for j in range(m):
+        counts[j + 1] += counts[j]
+    indptr = list(counts)
+    indices = [0] * a.nnz
+    data = [0.0] * a.nnz
+    for i in range(n):
+        for j, v in zip(*a.row(i)):
+            k = counts[j]
+            indices[k] = i
+            data[k] = v
+            counts[j] += 1
+    return CSRMatrix((m, n), indptr, indices, data)
+
+
+def csr_matmul(a: CSRMatrix, b: CSRMatrix) -> CSRMatrix:
+    """Sparse product by Gustavson's row-by-row algorithm: O(flops), not O(n^3)."""
+    if a.shape[1] != b.shape[0]:
+        raise ValueError("Sparse multiplication shape mismatch")
+    rows = []
+    for i in range(a.shape[0]):
+        acc: Dict[int, float] = {}
+        for k, v in zip(*a.row(i)):
+            for j, w in zip(*b.row(k)):
+                acc[j] = acc.get(j, 0.0) + v * w
+        rows.append(acc)
+    return CSRMatrix.from_rows((a.shape[0], b.shape[1]), rows)
+
+
+def csr_dense_mul(a: CSRMatrix, b: Matrix) -> Matrix:
+    m = len(b[0]) if b else 0
+    out = []
+    for i in range(a.shape[0]):
+        acc = [0.0] * m
+        for k, v in zip(*a.row(i)):
+            acc = [x + v * y for x, y in zip(acc, b[k])]
+        out.append(acc)
+    return out
+
+
+def dense_csr_mul(a: Matrix, b: CSRMatrix) -> Matrix:
+    out = []
+    for row in a:
+        acc = [0.0] * b.shape[1]
+        for k, v in enumerate(row):
+            if v:
+                for j, w in zip(*b.row(k)):
+                    acc[j] += v * w
+        out.append(acc)
+    return out
+
+
+def csr_norm1(a: CSRMatrix) -> float:
+    sums = [0.0] * a.shape[1]
+    for j, v in zip(a.indices, a.data):
+        sums[j] += abs(v)
+    return max(sums, default=0.0)
+
+
+def csr_hadamard(a: CSRMatrix, b: Union[CSRMatrix, Matrix]) -> CSRMatrix:
+    """Element-wise product; only the non-zeros of ``a`` are visited."""
+    shape = b.shape if isinstance(b, CSRMatrix) else (len(b), len(b[0]) if b else 0)
+    if a.shape != shape:
+        raise ValueError("Sparse Hadamard shape mismatch")
+    other = b.row_dicts() if isinstance(b, CSRMatrix) else None
+    rows = []
+    for i in range(a.shape[0]):
+        cols, vals = a.row(i)
+        if other is None:
+            rows.append({j: v * b[i][j] for j, v in zip(cols, vals)})
+        else:
+            rows.append({j: v * other[i][j] for j, v in zip(cols, vals) if j in other[i]})
+    return CSRMatrix.from_rows(a.shape, rows)
+
+
+def csr_kron(a: CSRMatrix, b: CSRMatrix) -> CSRMatrix:
+    r, s = b.shape
+    rows = []
+    for i in range(a.shape[0]):
+        ra = list(zip(*a.row(i)))
+        for k in range(r):
+            rb = list(zip(*b.row(k)))
+            rows.append({j * s + l: v * w for j, v in ra for l, w in rb})
+    return CSRMatrix.from_rows((a.shape[0] * r, a.shape[1] * s), rows)
+
+
+def csr_trace_mul(a: CSRMatrix, b: Union[CSRMatrix, Matrix]) -> float:
+    """``trace(a @ b)`` from the non-zeros of ``a``: O(nnz), the product is never formed."""
+    if isinstance(b, CSRMatrix):
+        rows = b.row_dicts()
+        return sum(v * rows[j].get(i, 0.0) for i in range(a.shape[0]) for j, v in zip(*a.row(i)))
+    return sum(v * b[j][i] for i in range(a.shape[0]) for j, v in zip(*a.row(i)))
+
+
+def csr_inner(a: CSRMatrix, b: Union[CSRMatrix, Matrix]) -> float:
+    """``trace(a^T @ b)``: the sum of the element-wise products over the non-zeros of ``a``."""
+    if isinstance(b, CSRMatrix):
+        rows = b.row_dicts()
+        return sum(v * rows[i].get(j, 0.0) for i in range(a.shape[0]) for j, v in zip(*a.row(i)))
+    return sum(v * b[i][j] for i in range(a.shape[0]) for j, v in zip(*a.row(i)))
+
+
+def _perm_sign(perm: Any) -> float:
+    seen = [False] * len(perm)
+    sign = 1.0
+    for i in range(len(perm)):
+        if seen[i]:
+            continue
+        j, length = i, 0
+        while not seen[j]:
+            seen[j] = True
+            j = perm[j]
+            length += 1
+        if length % 2 == 0:
+            sign = -sign
+    return sign
+
+
+def _eliminate(a: CSRMatrix, rhs: Matrix) -> Tuple[Optional[Matrix], float]:
+    """
+    Gaussian elimination with partial pivoting on the rows of ``a`` kept as
+    dicts, applied to the dense right-hand side ``rhs`` in place.
+
+    Only rows with a non-zero in the pivot column are touched, so the cost
+    follows the non-zeros and their fill-in rather than ``n^2``.  Returns
+    the solution (``None`` if ``a`` is singular) and the determinant.
+    """
+    n = a.shape[0]
+    if n != a.shape[1]:
+        raise ValueError("Sparse solve requires a square matrix")
+    rows = a.row_dicts()
+    col_rows: List[set] = [set() for _ in range(n)]
+    for i, row in enumerate(rows):
+        for j in row:
+            col_rows[j].add(i)
+    pivots = [0] * n
+    det = 1.0
+    for k in range(n):
+        candidates = col_rows[k]
+        if not candidates:
+            return None, 0.0
+        p = max(candidates, key=lambda r: abs(rows[r][k]))
+        piv_row = rows[p]
+        piv = piv_row[k]
+        if abs(piv) < PIVOT_TOL:
+            return None, 0.0
+        candidates.discard(p)
+        for j in piv_row:
+            if j != k:
+                col_rows[j].discard(p)
+        pivots[k] = p
+        det *= piv
+        for r in list(candidates):
+            row = rows[r]
+            f = row.pop(k) / piv
+            for j, v in piv_row.items():
+                if j == k:
+                    continue
+                new = row.get(j, 0.0) - f * v
+                if new:
+                    row[j] = new
+                    col_rows[j].add(r)
+                else:
+                    row.pop(j, None)
+                    col_rows[j].discard(r)
+            if rhs:
+                rhs[r] = [x - f * y for x, y in zip(rhs[r], rhs[p])]
+        candidates.clear()
+    det *= _perm_sign(pivots)
+    if not rhs:
+        return [], det
+    x: List[Optional[List[float]]] = [None] * n
+    for k in range(n - 1, -1, -1):
+        p = pivots[k]
+        acc = rhs[p]
+        for j, v in rows[p].items():
+            if j != k:
+                acc = [s - v * t for s, t in zip(acc, x[j])]
+        piv = rows[p][k]
+        x[k] = [s / piv for s in acc]
+    return x, det
+
+
+def csr_solve(a: CSRMatrix, b: Union[CSRMatrix, Matrix]) -> Optional[Matrix]:
+    """Dense ``X`` with ``a X = b`` for sparse ``a``; ``None`` if ``a`` is singular."""
+    rhs = b.todense() if isinstance(b, CSRMatrix) else [[float(v) for v in row] for row in b]
+    if len(rhs) != a.shape[0]:
+        raise ValueError("Sparse solve right-hand side shape mismatch")
+    return _eliminate(a, rhs)[0]
+
+
+def csr_det(a: CSRMatrix) -> float:
+    return _eliminate(a, [])[1]
+
+
+def _dense_backend(*values: Any) -> Backend:
+    return backend_for(*values) or PYTHON
+
+
+def _is_array(x: Any) -> bool:
+    return np is not None and isinstance(x, np.ndarray)
+
+
+class SparseBackend(Backend):
+    """
+    Pure-Python kernels on ``CSRMatrix`` / ``COOMatrix`` operands.
+
+    Sums, scalings, transposes and products of sparse operands stay sparse;
+    products with a dense operand are computed row by row from the
+    non-zeros and return dense matrices of the dense operand's kind.
+    ``solve``, ``inverse`` and ``det`` use a sparse elimination.
+    """
+
+    name = "sparse"
+    priority = 15
+    sparse = True
+
+    def owns(self, x: Any) -> bool:
+        return isinstance(x, (CSRMatrix, COOMatrix))
+
+    def _sparse(self, x: Any) -> bool:
+        return isinstance(x, (CSRMatrix, COOMatrix))
+
+    def asmatrix(self, x: Any) -> CSRMatrix:
+        if isinstance(x, CSRMatrix):
+            return x
+        if isinstance(x, COOMatrix):
+            return x.tocsr()
+        return CSRMatrix.from_dense(x)
+
+    def _densify(self, x: Any, like: Any) -> Any:
+        dense = self.asmatrix(x).todense()
+        return np.asarray(dense) if _is_array(like) else dense
+
+    def tolist(self, a: Any) -> Matrix:
+        return self.asmatrix(a).todense() if self._sparse(a) else _dense_backend(a).tolist(a)
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        return a.shape if self._sparse(a) else _dense_backend(a).shape(a)
+
+    def eye(self, n: int) -> CSRMatrix:
+        return CSRMatrix.identity(n)
+
+    def add(self, a: Any, b: Any) -> Any:
+        sa, sb = self._sparse(a), self._sparse(b)
+        if sa and sb:
+            return csr_add(self.asmatrix(a), self.asmatrix(b))
+        if sa:
+            a = self._densify(a, b)
+        if sb:
+            b = self._densify(b, a)
+        return _dense_backend(a, b).add(a, b)
+
+    def scale(self, a: Any, s: float) -> Any:
+        if self._sparse(a):
+            return csr_scale(self.asmatrix(a), s)
+        return _dense_backend(a).scale(a, s)
+
+    def mul(self, a: Any, b: Any) -> Any:
+        sa, sb = self._sparse(a), self._sparse(b)
+        if sa and sb:
+            return csr_matmul(self.asmatrix(a), self.asmatrix(b))
+        if sa:
+            out = csr_dense_mul(self.asmatrix(a), _dense_backend(b).tolist(b))
+            return np.asarray(out) if _is_array(b) else out
+        if sb:
+            out = dense_csr_mul(_dense_backend(a).tolist(a), self.asmatrix(b))
+            return np.asarray(out) if _is_array(a) else out
+        return _dense_backend(a, b).mul(a, b)
+
+    def transpose(self, a: Any) -> Any:
+        if self._sparse(a):
+            return csr_transpose(self.asmatrix(a))
+        return _dense_backend(a).transpose(a)
+
+    def inverse(self, a: Any) -> Any:
+        if self._sparse(a):
+            return csr_solve(self.asmatrix(a), PYTHON.eye(a.shape[0]))
+        return _dense_backend(a).inverse(a)
+
+    def det(self, a: Any) -> float:
+        if self._sparse(a):
+            return csr_det(self.asmatrix(a))
+        return _dense_backend(a).det(a)
+
+    def trace(self, a: Any) -> float:
+        if not self._sparse(a):
+            return _dense_backend(a).trace(a)
+        a = self.asmatrix(a)
+        return sum(v for i in range(a.shape[0]) for j, v in zip(*a.row(i)) if j == i)
+
+    def solve(self, a: Any, b: Any) -> Any:
+        if not self._sparse(a):
+            if self._sparse(b):
+                b = self._densify(b, a)
+            return _dense_backend(a, b).solve(a, b)
+        x = csr_solve(self.asmatrix(a), self._operand(b))
+        return np.asarray(x) if x is not None and _is_array(b) else x
+
+    def norm1(self, a: Any) -> float:
+        if self._sparse(a):
+            return csr_norm1(self.asmatrix(a))
+        return _dense_backend(a).norm1(a)
+
+    def _operand(self, x: Any) -> Union[CSRMatrix, Matrix]:
+        return self.asmatrix(x) if self._sparse(x) else _dense_backend(x).tolist(x)
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        if self._sparse(a):
+            return csr_hadamard(self.asmatrix(a), self._operand(b))
+        if self._sparse(b):
+            return csr_hadamard(self.asmatrix(b), self._operand(a))
+        return _dense_backend(a, b).hadamard(a, b)
+
+    def kron(self, a: Any, b: Any) -> Any:
+        if self._sparse(a) or self._sparse(b):
+            return csr_kron(self.asmatrix(a), self.asmatrix(b))
+        return _dense_backend(a, b).kron(a, b)
+
+    def trace_mul(self, a: Any, b: Any) -> float:
+        # trace(a b) = trace(b a): iterate over whichever operand is sparse.
+        if self._sparse(a):
+            return csr_trace_mul(self.asmatrix(a), self._operand(b))
+        if self._sparse(b):
+            return csr_trace_mul(self.asmatrix(b), self._operand(a))
+        return _dense_backend(a, b).trace_mul(a, b)
+
+    def inner(self, a: Any, b: Any) -> float:
+        if self._sparse(a):
+            return csr_inner(self.asmatrix(a), self._operand(b))
+        if self._sparse(b):
+            return csr_inner(self.asmatrix(b), self._operand(a))
+        return _dense_backend(a, b).inner(a, b)
+
+
+class ScipySparseBackend(Backend):
+    """``scipy.sparse`` operands: SuperLU solves and sparse BLAS-style products."""
+
+    name = "scipy.sparse"
+    priority = 16
+    sparse = True
+
+    def owns(self, x: Any) -> bool:
+        return _sp.issparse(x)
+
+    def asmatrix(self, x: Any) -> Any:
+        if _sp.issparse(x):
+            return x.tocsr()
+        if isinstance(x, (CSRMatrix, COOMatrix)):
+            x = x if isinstance(x, CSRMatrix) else x.tocsr()
+            return _sp.csr_matrix((x.data, x.indices, x.indptr), shape=x.shape)
+        return _sp.csr_matrix(np.asarray(x, dtype=float))
+
+    def _dense(self, x: Any) -> Any:
+        return np.asarray(x.toarray() if _sp.issparse(x) else x, dtype=float)
+
+    def tolist(self, a: Any) -> Matrix:
+        return self._dense(a).tolist()
+
+    def shape(self, a: Any) -> Tuple[int, int]:
+        return a.shape if _sp.issparse(a) else _dense_backend(a).shape(a)
+
+    def eye(self, n: int) -> Any:
+        return _sp.identity(n, format="csr")
+
+    def add(self, a: Any, b: Any) -> Any:
+        if _sp.issparse(a) and _sp.issparse(b):
+            return (a + b).tocsr()
+        return np.add(self._dense(a), self._dense(b))
+
+    def scale(self, a: Any, s: float) -> Any:
+        return a * s if _sp.issparse(a) else _dense_backend(a).scale(a, s)
+
+    def mul(self, a: Any, b: Any) -> Any:
+        if _sp.issparse(a) and _sp.issparse(b):
+            return (a @ b).tocsr()
+        if _sp.issparse(a):
+            return np.asarray(a @ self._dense(b))
+        if _sp.issparse(b):
+            return np.asarray((b.T @ self._dense(a).T).T)
+        return _dense_backend(a, b).mul(a, b)
+
+    def transpose(self, a: Any) -> Any:
+        return a.T.tocsr() if _sp.issparse(a) else _dense_backend(a).transpose(a)
+
+    def _lu(self, a: Any) -> Any:
+        try:
+            return _spla.splu(a.tocsc())
+        except RuntimeError:
+            return None
+
+    def inverse(self, a: Any) -> Any:
+        if not _sp.issparse(a):
+            return _dense_backend(a).inverse(a)
+        return self.solve(a, np.eye(a.shape[0]))
+
+    def det(self, a: Any) -> float:
+        if not _sp.issparse(a):
+            return _dense_backend(a).det(a)
+        lu = self._lu(a)
+        if lu is None:
+            return 0.0
+        return float(np.prod(lu.U.diagonal())) * _perm_sign(lu.perm_r) * _perm_sign(lu.perm_c)
+
+    def trace(self, a: Any) -> float:
+        return float(a.diagonal().sum()) if _sp.issparse(a) else _dense_backend(a).trace(a)
+
+    def solve(self, a: Any, b: Any) -> Any:
+        if not _sp.issparse(a):
+            return _dense_backend(a, b).solve(a, self._dense(b))
+        lu = self._lu(a)
+        if lu is None:
+            return None
+        return lu.solve(self._dense(b))
+
+    def norm1(self, a: Any) -> float:
+        if _sp.issparse(a):
+            return float(_spla.norm(a, 1))
+        return _dense_backend(a).norm1(a)
+
+    def hadamard(self, a: Any, b: Any) -> Any:
+        if _sp.issparse(b) and not _sp.issparse(a):
+            a, b = b, a
+        if _sp.issparse(a):
+            return _sp.csr_matrix(a.multiply(b if _sp.issparse(b) else self._dense(b)))
+        return _dense_backend(a, b).hadamard(a, b)
+
+    def kron(self, a: Any, b: Any) -> Any:
+        if _sp.issparse(a) or _sp.issparse(b):
+            return _sp.kron(self.asmatrix(a), self.asmatrix(b), format="csr")
+        return _dense_backend(a, b).kron(a, b)
+
+    def trace_mul(self, a: Any, b: Any) -> float:
+        if _sp.issparse(a) or _sp.issparse(b):
+            return float(self.asmatrix(a).multiply(self.asmatrix(b).T).sum())
+        return _dense_backend(a, b).trace_mul(a, b)
+
+    def inner(self, a: Any, b: Any) -> float:
+        if _sp.issparse(a) or _sp.issparse(b):
+            return float(self.asmatrix(a).multiply(self.asmatrix(b)).sum())
+        return _dense_backend(a, b).inner(a, b)
+
+
+SPARSE = register_backend(SparseBackend())
+if _sp is not None:
+    register_backend(ScipySparseBackend())
@@ -0,0 +1,281 @@
+from __future__ import annotations
+import math
+from typing import Any, Callable, FrozenSet, Optional, Tuple
+
+from .core import Expr, Var, Const, Add, Mul, Transpose, Inverse, Func, ScalarMul, Solve, Hadamard, Kron, STRUCTURES
+from .backend import get_backend, np
+from .factor import PIVOT_TOL, Factorization, factorize, _forward_list, _backward_list, _tri_solve_array, _sla
+
+DIAGONAL, LOWER, UPPER, SYMMETRIC, SPD = STRUCTURES
+TRIANGULAR = frozenset((DIAGONAL, LOWER, UPPER))
+# Representations the kernels below understand: nested lists and dense arrays.
+DENSE_BACKENDS = frozenset(("python", "numpy", "batched"))
+
+_IMPLIED = {
+    DIAGONAL: (DIAGONAL, LOWER, UPPER, SYMMETRIC),
+    LOWER: (LOWER,),
+    UPPER: (UPPER,),
+    SYMMETRIC: (SYMMETRIC,),
+    SPD: (SPD, SYMMETRIC),
+}
+_NONE: FrozenSet[str] = frozenset()
+
+
+def _close(found) -> FrozenSet[str]:
+    result = set()
+    for t in found:
+        result.update(_IMPLIED[t])
+    if LOWER in result and (UPPER in result or SYMMETRIC in result):
+        result.update(_IMPLIED[DIAGONAL])
+    return frozenset(result)
+
+
+def tags(expr: Any) -> FrozenSet[str]:
+    """
+    Structure known to hold for every value of ``expr``.
+
+    Leaves carry their declared ``structure`` (``I`` is diagonal and SPD,
+    a square ``0`` diagonal); the tags propagate through sums, products,
+    transposes, inverses, solves, scalings, element-wise and Kronecker
+    products and matrix functions, e.g. a product of lower triangular
+    factors is lower triangular and the inverse of an SPD matrix is SPD.  The result is closed under implication
+    (diagonal implies lower, upper and symmetric) and cached on the node.
+    """
+    if not isinstance(expr, Expr):
+        return _NONE
+    cached = expr.__dict__.get("_tags")
+    if cached is None:
+        cached = _close(_infer(expr))
+        object.__setattr__(expr, "_tags", cached)
+    return cached
+
+
+def _infer(expr: Expr) -> FrozenSet[str]:
+    if isinstance(expr, (Var, Const)):
+        if expr.structure is not None:
+            return frozenset((expr.structure,))
+        if isinstance(expr, Const) and expr.shape[0] == expr.shape[1] and expr.shape != (1, 1):
+            if expr.name == "I":
+                return frozenset((DIAGONAL, SPD))
+            if expr.name == "0":
+                return frozenset((DIAGONAL,))
+        return _NONE
+    if isinstance(expr, Transpose):
+        t = tags(expr.x)
+        return frozenset({LOWER: UPPER, UPPER: LOWER}.get(x, x) for x in t)
+    if isinstance(expr, Inverse):
+        return tags(expr.x)
+    if isinstance(expr, Add):
+        return tags(expr.a) & tags(expr.b)
+    if isinstance(expr, (Mul, Solve)):
+        # solve(A, B) = A^-1 B and A^-1 has the tags of A.
+        ta, tb = tags(expr.a), tags(expr.b)
+        found = ta & tb & TRIANGULAR
+        if isinstance(expr, Mul) and expr.a is expr.b and SYMMETRIC in ta:
+            found |= {SYMMETRIC}
+        return found
+    if isinstance(expr, Hadamard):
+        # Zeros of either operand stay zero; the Schur product of SPD matrices is SPD.
+        ta, tb = tags(expr.a), tags(expr.b)
+        return ((ta | tb) & TRIANGULAR) | (ta & tb)
+    if isinstance(expr, Kron):
+        return tags(expr.a) & tags(expr.b)
+    if isinstance(expr, ScalarMul):
+        return tags(expr.mat) - {SPD}
+    if isinstance(expr, Func):
+        if not expr.args or expr.shape == (1, 1) or any(isinstance(a, Expr) and a.shape != (1, 1)
+                                                          for a in expr.args[1:]):
+            return _NONE
+        # Matrix functions are polynomials in their argument: they keep
+        # diagonal, triangular and symmetric structure.
+        t = tags(expr.args[0])
+        found = t - {SPD}
+        if SYMMETRIC in t and expr.name == "exp":
+            found |= {SPD}
+        if SPD in t and expr.name == "pow":
+            found |= {SPD}
+        return found
+    return _NONE
+
+
+def is_dense(*values: Any) -> bool:
+    """Whether the structured kernels understand every value (nested lists or arrays)."""
+    return all(isinstance(v, list) or (np is not None and isinstance(v, np.ndarray) and v.ndim >= 2)
+               for v in values)
+
+
+def _arrays(*values: Any) -> bool:
+    return np is not None and any(isinstance(v, np.ndarray) for v in values)
+
+
+def diagonal(a: Any) -> Any:
+    if _arrays(a):
+        return np.diagonal(a, axis1=-2, axis2=-1)
+    return [a[i][i] for i in range(len(a))]
+
+
+def from_diagonal(d: Any) -> Any:
+    if _arrays(d):
+        return np.eye(d.shape[-1]) * d[..., None, :]
+    n = len(d)
+    rows = [[0.0] * n for _ in range(n)]
+    for i, x in enumerate(d):
+        rows[i][i] = x
+    return rows
+
+
+def _eye_like(a: Any) -> Any:
+    if _arrays(a):
+        return np.eye(a.shape[-1])
+    return from_diagonal([1.0] * len(a))
+
+
+def diag_left_mul(a: Any, b: Any) -> Any:
+    """``a @ b`` for a diagonal ``a``: O(n m)."""
+    d = diagonal(a)
+    if _arrays(a, b):
+        return np.asarray(d, dtype=float)[..., :, None] * np.asarray(b, dtype=float)
+    return [[di * x for x in row] for di, row in zip(d, b)]
+
+
+def diag_right_mul(a: Any, b: Any) -> Any:
+    """``a @ b`` for a diagonal ``b``: O(n m)."""
+    d = diagonal(b)
+    if _arrays(a, b):
+        return np.asarray(a, dtype=float) * np.asarray(d, dtype=float)[..., None, :]
+    return [[x * dj for x, dj in zip(row, d)] for row in a]
+
+
+def diag_mul(a: Any, b: Any) -> Any:
+    """``a @ b`` for diagonal ``a`` and ``b``: O(n)."""
+    da, db = diagonal(a), diagonal(b)
+    if _arrays(a, b):
+        return from_diagonal(np.asarray(da, dtype=float) * np.asarray(db, dtype=float))
+    return from_diagonal([x * y for x, y in zip(da, db)])
+
+
+def _singular(d: Any) -> bool:
+    if _arrays(d):
+        return bool(np.any(np.abs(d) < PIVOT_TOL))
+    return any(abs(x) < PIVOT_TOL for x in d)
+
+
+def diag_solve(a: Any, b: Any) -> Any:
+    """``a^-1 b`` for a diagonal ``a``: O(n m), ``None`` if ``a`` is singular."""
+    d = diagonal(a)
+    if _singular(d):
+        return None
+    if _arrays(a, b):
+        return np.asarray(b, dtype=float) / np.asarray(d, dtype=float)[..., :, None]
+    return [[x / di for x in row] for di, row in zip(d, b)]
+
+
+def diag_inverse(a: Any) -> Any:
+    d = diagonal(a)
+    if _singular(d):
+        return None
+    return from_diagonal(1.0 / d if _arrays(d) else [1.0 / x for x in d])
+
+
+def _tri_solve(a: Any, b: Any, lower: bool) -> Any:
+    if _singular(diagonal(a)):
+        return None
+    if _arrays(a, b):
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        if a.ndim > 2 or b.ndim > 2:
+            return get_backend("batched").solve(a, b)
+        if _sla is not None:
+            return _sla.solve_triangular(a, b, lower=lower, check_finite=False)
+        return _tri_solve_array(a, b, lower)
+    y = [[float(x) for x in row] for row in b]
+    return _forward_list(a, y, unit=False) if lower else _backward_list(a, y)
+
+
+def lower_solve(a: Any, b: Any) -> Any:
+    """``a^-1 b`` for a lower triangular ``a`` by forward substitution: O(n^2 m)."""
+    return _tri_solve(a, b, True)
+
+
+def upper_solve(a: Any, b: Any) -> Any:
+    """``a^-1 b`` for an upper triangular ``a`` by back substitution: O(n^2 m)."""
+    return _tri_solve(a, b, False)
+
+
+def lower_inverse(a: Any) -> Any:
+    return _tri_solve(a, _eye_like(a), True)
+
+
+def upper_inverse(a: Any) -> Any:
+    return _tri_solve(a, _eye_like(a), False)
+
+
+def triangular_det(a: Any) -> Any:
+    """Product of the diagonal of a triangular ``a``: O(n)."""
+    d = diagonal(a)
+    if _arrays(d):
+        det = np.prod(d, axis=-1)
+        return float(det) if det.ndim == 0 else det
+    det = 1.0
+    for x in d:
+        det *= x
+    return det
+
+
+def triangular_slogdet(a: Any) -> Tuple[Any, Any]:
+    d = diagonal(a)
+    if _arrays(d):
+        with np.errstate(divide="ignore"):
+            sign, logabs = np.prod(np.sign(d), axis=-1), np.sum(np.log(np.abs(d)), axis=-1)
+        return (float(sign), float(logabs)) if sign.ndim == 0 else (sign, logabs)
+    sign, logabs = 1.0, 0.0
+    for x in d:
+        if not x:
+            return 0.0, -math.inf
+        sign = -sign if x < 0 else sign
+        logabs += math.log(abs(x))
+    return sign, logabs
+
+
+def mul_kernel(ta: FrozenSet[str], tb: FrozenSet[str]) -> Optional[Callable]:
+    """Specialized product kernel for operands tagged ``ta`` and ``tb``, or ``None``."""
+    if DIAGONAL in ta:
+        return diag_mul if DIAGONAL in tb else diag_left_mul
+    if DIAGONAL in tb:
+        return diag_right_mul
+    return None
+
+
+def solve_kernel(t: FrozenSet[str]) -> Optional[Callable]:
+    if DIAGONAL in t:
+        return diag_solve
+    if LOWER in t:
+        return lower_solve
+    if UPPER in t:
+        return upper_solve
+    return None
+
+
+def inverse_kernel(t: FrozenSet[str]) -> Optional[Callable]:
+    if DIAGONAL in t:
+        return diag_inverse
+    if LOWER in t:
+        return lower_inverse
+    if UPPER in t:
+        return upper_inverse
+    return None
+
+
+def factor(a: Any, t: FrozenSet[str], cache: Any = None) -> Factorization:
+    """
+    Factorization of the value ``a`` of a node tagged ``t``: Cholesky for
+    SPD, without the symmetry scan of ``factorize``, falling back to its
+    automatic choice if the Cholesky attempt fails.  ``cache`` is an
+    optional ``FactorCache``.
+    """
+    get = factorize if cache is None else cache.get
+    if SPD in t:
+        try:
+            return get(a, "cholesky")
+        except ValueError:
+            pass
+    return get(a)
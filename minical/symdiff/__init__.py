@@ -1,9 +1,11 @@
 from .core import Var, vars, Const, Expr, ensure_expr
 from .funcs import sin, cos, exp, ln
-from .calculus import diff
+from .calculus import diff, derivatives, DerivativeTower
 from .simplify import full_simplify
-from .latex import parse_latex
-from .validate import validate
+from .latex import parse_latex, parse_latex_cached, compile_latex
+from .validate import validate, validate_grid, check_grid
+from .compile import compile_expr, CompiledExpr
+from .cache import ExprCache, cached_compile, default_cache
 
 import logging
 
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+
+from .calculus import diff
+from .compile import CompiledExpr, structural_key
+from .simplify import full_simplify
+
+
+class _Pending:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ExprCache:
+    """
+    Thread-safe LRU cache of compiled evaluators.
+
+    Concurrent misses on the same key are single-flight: the first thread
+    runs the factory, the others block until its result (or exception) is
+    available, so every key is built at most once while it stays cached.
+    """
+
+    def __init__(self, maxsize=4096):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._evictions = 0
+        self._errors = 0
+
+    def get_or_compile(self, key, factory):
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            pending = self._pending.get(key)
+            if pending is not None:
+                self._waits += 1
+                owner = False
+            else:
+                self._misses += 1
+                pending = self._pending[key] = _Pending()
+                owner = True
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            value = factory()
+        except BaseException as e:
+            with self._lock:
+                self._errors += 1
+                del self._pending[key]
+            pending.error = e
+            pending.event.set()
+            raise
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            del self._pending[key]
+        pending.value = value
+        pending.event.set()
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            return default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses + self._waits
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "inflight_waits": self._waits,
+                "evictions": self._evictions,
+                "errors": self._errors,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": (self._hits + self._waits) / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+
+_default_cache = ExprCache()
+
+
+def default_cache():
+    return _default_cache
+
+
+def _normalize_names(names):
+    if names is None:
+        return None
+    if isinstance(names, str):
+        return tuple(names.split())
+    return tuple(getattr(n, "name", n) for n in names)
+
+
+def cached_compile(expr, vars=None, wrt=None, cache=None):
+    """
+    Compiled evaluator for ``expr`` (or its derivative along ``wrt``) from the
+    process-wide cache, keyed by the structure of the expression.
+    """
+    cache = _default_cache if cache is None else cache
+    vars = _normalize_names(vars)
+    wrt = _normalize_names(wrt)
+    key = ("expr", structural_key(expr), vars, wrt)
+
+    def build():
+        target = expr
+        for name in wrt or ():
+            target = diff(target, name)
+        return CompiledExpr(full_simplify(target), vars)
+
+    return cache.get_or_compile(key, build)
@@ -1,7 +1,48 @@
 from .core import Var
+from .simplify import full_simplify
+from .compile import Interner, CompiledExpr
 
 
 def diff(expr, var):
     if isinstance(var, str):
         var = Var(var)
     return expr.diff(var.name).simplify()
+
+
+class DerivativeTower:
+    """Derivatives of orders 0..n of one expression, with a shared evaluator."""
+
+    def __init__(self, orders, var):
+        self.orders = tuple(orders)
+        self.var = var
+        self._evaluators = {}
+
+    def __len__(self): return len(self.orders)
+    def __getitem__(self, k): return self.orders[k]
+    def __iter__(self): return iter(self.orders)
+
+    def compile(self, vars=None):
+        key = tuple(vars.split()) if isinstance(vars, str) else (tuple(vars) if vars is not None else None)
+        if key not in self._evaluators:
+            self._evaluators[key] = CompiledExpr(self.orders, vars)
+        return self._evaluators[key]
+
+    def __call__(self, *args, **kwargs):
+        return self.compile()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"DerivativeTower(var={self.var!r}, up_to={len(self.orders) - 1})"
+
+
+def derivatives(expr, var, up_to=1):
+    if isinstance(var, str):
+        var = Var(var)
+    if up_to < 0:
+        raise ValueError("up_to must be non-negative")
+    interner = Interner()
+    orders = [interner.share(full_simplify(expr))]
+    for _ in range(up_to):
+        # Differentiate the previous, already simplified order; hash-consing
+        # keeps subtrees repeated across orders as one shared node.
+        orders.append(interner.share(full_simplify(orders[-1].diff(var.name))))
+    return DerivativeTower(orders, var.name)
@@ -0,0 +1,233 @@
+import math
+from collections.abc import Mapping
+
+from .core import Expr, Const, Var
+from .ops import (
+    Add, Sub, Mul, Div, Pow,
+    Sin, Cos, Tan, Exp, Ln, Asin, Acos, Atan,
+    Sinh, Cosh, Tanh, LogBase, ExpBase
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+BINARY_OPS = {Add: "+", Sub: "-", Mul: "*"}
+
+UNARY_FUNCS = {
+    Sin: "sin", Cos: "cos", Tan: "tan", Exp: "exp", Ln: "log",
+    Asin: "asin", Acos: "acos", Atan: "atan",
+    Sinh: "sinh", Cosh: "cosh", Tanh: "tanh",
+}
+
+SCALAR_NAMESPACE = {
+    "_" + name: getattr(math, name)
+    for name in ("sin", "cos", "tan", "exp", "log", "asin", "acos", "atan", "sinh", "cosh", "tanh")
+}
+SCALAR_NAMESPACE["_logb"] = lambda x, base: math.log(x, base)
+
+
+def _numpy_namespace():
+    ns = {
+        "_" + name: getattr(np, name)
+        for name in ("sin", "cos", "tan", "exp", "log", "sinh", "cosh", "tanh")
+    }
+    ns["_asin"] = np.arcsin
+    ns["_acos"] = np.arccos
+    ns["_atan"] = np.arctan
+    ns["_logb"] = lambda x, base: np.log(x) / np.log(base)
+    return ns
+
+
+def _children(node):
+    if isinstance(node, (Add, Sub, Mul)):
+        return node.a, node.b
+    if isinstance(node, Div):
+        return node.num, node.den
+    if isinstance(node, Pow):
+        return node.base, node.power
+    if isinstance(node, (LogBase, ExpBase)):
+        return node.base, node.expr
+    if type(node) in UNARY_FUNCS:
+        return (node.expr,)
+    return ()
+
+
+def structural_key(expr, memo=None):
+    """Hashable key that is equal for structurally identical trees."""
+    if memo is None:
+        memo = {}
+    cached = memo.get(id(expr))
+    if cached is not None:
+        return cached
+    if isinstance(expr, Const):
+        key = ("Const", type(expr.value).__name__, expr.value)
+    elif isinstance(expr, Var):
+        key = ("Var", expr.name)
+    elif isinstance(expr, Expr):
+        key = (type(expr).__name__,) + tuple(structural_key(c, memo) for c in _children(expr))
+    else:
+        key = ("Const", type(expr).__name__, expr)
+    memo[id(expr)] = key
+    return key
+
+
+def free_vars(expr, acc=None):
+    if acc is None:
+        acc = set()
+    if isinstance(expr, Var):
+        acc.add(expr.name)
+    for child in _children(expr):
+        free_vars(child, acc)
+    return acc
+
+
+class Interner:
+    """Hash-consing table: structurally equal subtrees map to one shared node."""
+
+    def __init__(self):
+        self.table = {}
+
+    def share(self, expr):
+        return self._share(expr, {})
+
+    def _share(self, expr, keys):
+        if not isinstance(expr, Expr):
+            return expr
+        key = structural_key(expr, keys)
+        node = self.table.get(key)
+        if node is not None:
+            return node
+        if isinstance(expr, (Add, Sub, Mul)):
+            node = type(expr)(self._share(expr.a, keys), self._share(expr.b, keys))
+        elif isinstance(expr, Div):
+            node = Div(self._share(expr.num, keys), self._share(expr.den, keys))
+        elif isinstance(expr, Pow):
+            node = Pow(self._share(expr.base, keys), self._share(expr.power, keys))
+        elif isinstance(expr, (LogBase, ExpBase)):
+            node = type(expr)(self._share(expr.base, keys), self._share(expr.expr, keys))
+        elif type(expr) in UNARY_FUNCS:
+            node = type(expr)(self._share(expr.expr, keys))
+        else:
+            node = expr
+        self.table[key] = node
+        return node
+
+
+class CompiledExpr:
+    """
+    Straight-line evaluator for one or several expressions.
+
+    Structurally identical subexpressions are computed once into shared
+    temporaries, so all outputs are produced in a single pass.  Call with a
+    point mapping (as accepted by ``subs``), positional values in ``vars``
+    order or keyword arguments; ``batch`` does the same over NumPy arrays.
+    """
+
+    def __init__(self, exprs, vars=None):
+        self.multi = not isinstance(exprs, Expr)
+        self.exprs = tuple(exprs) if self.multi else (exprs,)
+        if vars is None:
+            names = set()
+            for e in self.exprs:
+                free_vars(e, names)
+            vars = sorted(names)
+        elif isinstance(vars, str):
+            vars = vars.split()
+        self.vars = tuple(v.name if isinstance(v, Var) else v for v in vars)
+        self.source, self._consts, self.n_temps = self._generate()
+        self._scalar_fn = self._build(SCALAR_NAMESPACE)
+        self._batch_fn = None
+
+    def _generate(self):
+        args = {name: f"_a{i}" for i, name in enumerate(self.vars)}
+        consts = {}
+        names = {}
+        keys = {}
+        lines = []
+
+        def emit(node):
+            key = structural_key(node, keys)
+            if key in names:
+                return names[key]
+            if isinstance(node, Var):
+                if node.name not in args:
+                    raise ValueError(f"Unbound variable: {node.name}")
+                names[key] = args[node.name]
+                return names[key]
+            if isinstance(node, Const) or not isinstance(node, Expr):
+                value = node.value if isinstance(node, Const) else node
+                if type(value) in (int, float) and math.isfinite(value):
+                    names[key] = f"({value!r})"
+                else:
+                    names[key] = f"_c{len(consts)}"
+                    consts[names[key]] = value
+                return names[key]
+
+            kind = type(node)
+            if kind in BINARY_OPS:
+                code = f"{emit(node.a)} {BINARY_OPS[kind]} {emit(node.b)}"
+            elif kind is Div:
+                code = f"{emit(node.num)} / {emit(node.den)}"
+            elif kind is Pow:
+                code = f"{emit(node.base)} ** {emit(node.power)}"
+            elif kind in UNARY_FUNCS:
+                code = f"_{UNARY_FUNCS[kind]}({emit(node.expr)})"
+            elif kind is LogBase:
+                code = f"_logb({emit(node.expr)}, {emit(node.base)})"
+            elif kind is ExpBase:
+                code = f"{emit(node.base)} ** {emit(node.expr)}"
+            else:
+                raise TypeError(f"Cannot compile expression node: {kind.__name__}")
+            name = f"_t{len(lines)}"
+            lines.append(f"    {name} = {code}")
+            names[key] = name
+            return name
+
+        outputs = [emit(e) for e in self.exprs]
+        ret = f"({', '.join(outputs)},)" if self.multi else outputs[0]
+        header = f"def _compiled({', '.join(args[v] for v in self.vars)}):"
+        source = "\n".join([header] + lines + [f"    return {ret}"])
+        return source, consts, len(lines)
+
+    def _build(self, namespace):
+        ns = dict(namespace)
+        ns.update(self._consts)
+        exec(compile(self.source, "<minical.symdiff.compile>", "exec"), ns)
+        return ns["_compiled"]
+
+    def _bind(self, args, kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], Mapping):
+            point = args[0]
+            return [point[v] for v in self.vars]
+        if kwargs:
+            point = dict(zip(self.vars, args))
+            point.update(kwargs)
+            return [point[v] for v in self.vars]
+        if len(args) != len(self.vars):
+            raise TypeError(f"Expected {len(self.vars)} values for {self.vars}, got {len(args)}")
+        return list(args)
+
+    def __call__(self, *args, **kwargs):
+        return self._scalar_fn(*self._bind(args, kwargs))
+
+    def batch(self, *args, **kwargs):
+        if np is None:
+            raise ImportError("CompiledExpr.batch requires numpy")
+        if self._batch_fn is None:
+            self._batch_fn = self._build(_numpy_namespace())
+        values = [np.asarray(v, dtype=float) for v in self._bind(args, kwargs)]
+        shape = np.broadcast_shapes(*(v.shape for v in values)) if values else ()
+        out = self._batch_fn(*values)
+        if self.multi:
+            return tuple(np.broadcast_to(o, shape) if np.ndim(o) < len(shape) else o for o in out)
+        return np.broadcast_to(out, shape) if np.ndim(out) < len(shape) else out
+
+    def __repr__(self):
+        return f"CompiledExpr(outputs={len(self.exprs)}, vars={self.vars}, temps={self.n_temps})"
+
+
+def compile_expr(exprs, vars=None):
+    return CompiledExpr(exprs, vars)
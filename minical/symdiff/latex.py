@@ -176,3 +176,31 @@ class LatexParser:
 
 def parse_latex(s: str):
     return LatexParser(tokenize(s)).parse()
+
+
+def _normalize_latex(s: str):
+    return " ".join(s.split())
+
+
+def parse_latex_cached(s: str, cache=None):
+    from .cache import default_cache
+    cache = default_cache() if cache is None else cache
+    src = _normalize_latex(s)
+    return cache.get_or_compile(("latex-parse", src), lambda: parse_latex(src))
+
+
+def compile_latex(s: str, vars=None, cache=None):
+    """
+    Parse a LaTeX formula once and return a cached ``CompiledExpr``.
+
+    Repeated calls with the same source (up to whitespace) and variable order
+    reuse both the parsed tree and the compiled evaluator.
+    """
+    from .cache import default_cache, _normalize_names
+    from .compile import CompiledExpr
+    cache = default_cache() if cache is None else cache
+    src = _normalize_latex(s)
+    vars = _normalize_names(vars)
+    return cache.get_or_compile(
+        ("latex", src, vars),
+        lambda: CompiledExpr(parse_latex_cached(src, cache), vars))
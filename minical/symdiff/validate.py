@@ -1,3 +1,12 @@
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 def numerical_diff(func_expr, var_name, point, h=1e-5, order=1):
     if order == 0:
         return func_expr.subs(point).eval()
@@ -92,3 +101,142 @@ def validate(original_expr, symbolic_derivative, vars_path, point,
         )
 
     return passed
+
+
+class GridReport:
+    def __init__(self, n_points, n_failed, max_error, worst_point, worst_symbolic, worst_numerical, tol):
+        self.n_points = n_points
+        self.n_failed = n_failed
+        self.max_error = max_error
+        self.worst_point = worst_point
+        self.worst_symbolic = worst_symbolic
+        self.worst_numerical = worst_numerical
+        self.tol = tol
+
+    @property
+    def fail_fraction(self):
+        return self.n_failed / self.n_points if self.n_points else 0.0
+
+    @property
+    def passed(self):
+        return self.n_failed == 0
+
+    def __repr__(self):
+        return (f"GridReport(points={self.n_points}, failed={self.n_failed}, "
+                f"max_error={self.max_error:.3g}, worst_point={self.worst_point})")
+
+
+def _grid_points(points, box, n, seed):
+    if points is not None:
+        if isinstance(points, dict):
+            return {k: list(v) if np is None else np.asarray(v, dtype=float) for k, v in points.items()}
+        names = list(points[0])
+        cols = {k: [float(p[k]) for p in points] for k in names}
+        return cols if np is None else {k: np.asarray(v) for k, v in cols.items()}
+    if box is None:
+        raise ValueError("Either points or box must be given")
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        return {k: rng.uniform(lo, hi, n) for k, (lo, hi) in box.items()}
+    rng = random.Random(seed)
+    return {k: [rng.uniform(lo, hi) for _ in range(n)] for k, (lo, hi) in box.items()}
+
+
+def _numerical_grid(f, names, vars_path, cols, h):
+    if not vars_path:
+        return f(*(cols[k] for k in names))
+    current_var = vars_path[0]
+    p_plus = dict(cols)
+    p_minus = dict(cols)
+    p_plus[current_var] = cols[current_var] + h
+    p_minus[current_var] = cols[current_var] - h
+    v_plus = _numerical_grid(f, names, vars_path[1:], p_plus, h)
+    v_minus = _numerical_grid(f, names, vars_path[1:], p_minus, h)
+    return (v_plus - v_minus) / (2 * h)
+
+
+def _scalar_grid(original, derivative, names, vars_path, cols, h):
+    sym, num = [], []
+    for i in range(len(cols[names[0]])):
+        point = {k: cols[k][i] for k in names}
+        try:
+            sym.append(derivative(point))
+        except Exception:
+            sym.append(float("nan"))
+        try:
+            num.append(_numerical_grid(original, names, vars_path, point, h))
+        except Exception:
+            num.append(float("nan"))
+    return sym, num
+
+
+def check_grid(original_expr, symbolic_derivative, vars_path, points=None, box=None,
+               n=1000, tol=1e-4, h=1e-5, seed=None):
+    """
+    Compare a symbolic derivative with central differences over many points.
+
+    ``points`` is a mapping of variable name to an array of coordinates (or a
+    list of point dicts); alternatively ``box`` maps each variable to a
+    ``(low, high)`` interval from which ``n`` points are drawn uniformly.
+    Both expressions are compiled once and, with NumPy, evaluated vectorized.
+    The error per point uses the same relative/absolute rule as
+    ``check_derivative``; non-finite values count as failures.
+    """
+    from .cache import cached_compile
+    if isinstance(vars_path, str):
+        vars_path = [vars_path]
+    cols = _grid_points(points, box, n, seed)
+    names = tuple(cols)
+    original = cached_compile(original_expr, names)
+    derivative = cached_compile(symbolic_derivative, names)
+    count = len(cols[names[0]])
+
+    if np is not None:
+        with np.errstate(all="ignore"):
+            sym = np.broadcast_to(derivative.batch(*(cols[k] for k in names)), (count,))
+            num = np.broadcast_to(_numerical_grid(original.batch, names, vars_path, cols, h), (count,))
+            abs_err = np.abs(sym - num)
+            big = np.abs(num) > 1e-7
+            err = np.where(big, abs_err / np.where(big, np.abs(num), 1.0), abs_err)
+        err = np.where(np.isfinite(err), err, np.inf)
+        n_failed = int(np.count_nonzero(~(err < tol)))
+        worst = int(np.argmax(err)) if count else 0
+        max_error = float(err[worst]) if count else 0.0
+    else:
+        sym, num = _scalar_grid(original, derivative, names, vars_path, cols, h)
+        err = []
+        for s, v in zip(sym, num):
+            e = abs(s - v) / abs(v) if abs(v) > 1e-7 else abs(s - v)
+            err.append(e if math.isfinite(e) else math.inf)
+        n_failed = sum(1 for e in err if not e < tol)
+        worst = max(range(count), key=err.__getitem__) if count else 0
+        max_error = err[worst] if count else 0.0
+
+    worst_point = {k: float(cols[k][worst]) for k in names} if count else {}
+    return GridReport(count, n_failed, max_error, worst_point,
+                      float(sym[worst]) if count else None,
+                      float(num[worst]) if count else None, tol)
+
+
+def grid_report(original_expr, symbolic_derivative, vars_path, label="Derivative", **kwargs):
+    report = check_grid(original_expr, symbolic_derivative, vars_path, **kwargs)
+    status = "PASSED" if report.passed else "FAILED"
+    print(f"--- {label} Grid Check ---")
+    print(f"Variables:   {vars_path}")
+    print(f"Points:      {report.n_points}")
+    print(f"Failed:      {report.n_failed} ({report.fail_fraction:.2%})")
+    print(f"Max error:   {report.max_error}")
+    print(f"Worst point: {report.worst_point}")
+    print(f"Symbolic:    {report.worst_symbolic}")
+    print(f"Numerical:   {report.worst_numerical}")
+    print(f"Status:      {status}")
+    print("-" * (len(label) + 21))
+    return report
+
+
+def validate_grid(original_expr, symbolic_derivative, vars_path, points=None, box=None,
+                  n=1000, tol=1e-4, h=1e-5, seed=None, verbose=True):
+    kwargs = dict(points=points, box=box, n=n, tol=tol, h=h, seed=seed)
+    if verbose:
+        return grid_report(original_expr, symbolic_derivative, vars_path, **kwargs).passed
+    return check_grid(original_expr, symbolic_derivative, vars_path, **kwargs).passed
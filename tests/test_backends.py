@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, eval_expr, inverse
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+C = Var("C", (3, 3))
+
+VALUES = {
+    "A": [[4.0, 1.0, 0.0], [1.0, 3.0, 0.5], [0.0, 0.5, 2.0]],
+    "B": [[1.0, 0.0, 2.0], [0.0, 0.0, 1.0], [3.0, 1.0, 0.0]],
+    "C": [[0.5, -1.0, 0.0], [2.0, 0.0, 1.0], [0.0, 1.0, 1.0]],
+}
+
+EXPRESSIONS = {
+    "add": (A + B, lambda a, b, c: a + b),
+    "mul": (A @ B, lambda a, b, c: a @ b),
+    "chain": (A @ B @ C, lambda a, b, c: a @ b @ c),
+    "transpose": (A.T @ B, lambda a, b, c: a.T @ b),
+    "inverse": (inverse(A), lambda a, b, c: np.linalg.inv(a)),
+    "inverse_mul": (inverse(A) @ B + C, lambda a, b, c: np.linalg.solve(a, b) + c),
+}
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+@pytest.mark.parametrize("name", sorted(EXPRESSIONS))
+def test_bindings_match_numpy(name, kind):
+    expr, reference = EXPRESSIONS[name]
+    bind = np.array if kind == "numpy" else lambda rows: rows
+    result = eval_expr(expr, {k: bind(rows) for k, rows in VALUES.items()})
+    assert isinstance(result, np.ndarray if kind == "numpy" else list)
+    np.testing.assert_allclose(np.asarray(result), reference(*(np.array(VALUES[k]) for k in "ABC")), atol=1e-12)
+
+
+def test_backend_option_converts_list_bindings():
+    result = eval_expr(A @ B, VALUES, backend="numpy")
+    assert isinstance(result, np.ndarray)
+    np.testing.assert_allclose(result, np.array(VALUES["A"]) @ np.array(VALUES["B"]))
+
+
+def test_mixed_bindings_use_the_higher_priority_backend():
+    result = eval_expr(A @ B, {"A": VALUES["A"], "B": np.array(VALUES["B"])})
+    assert isinstance(result, np.ndarray)
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_singular_inverse_stays_symbolic():
+    x = Var("A", (2, 2))
+    for value in ([[1.0, 2.0], [2.0, 4.0]], np.array([[1.0, 2.0], [2.0, 4.0]])):
+        assert eval_expr(inverse(x), {"A": value}) == inverse(x)
@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, compile_plan, eval_expr, inverse, scale, exp
+
+rng = np.random.default_rng(3)
+STACK = rng.standard_normal((4, 3, 3)) + 3 * np.eye(3)
+OTHER = rng.standard_normal((4, 3, 3))
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+s = Var("s", (1, 1))
+
+
+@pytest.mark.parametrize("expr", [A + B, A @ B, A @ B @ A, A.T @ B, inverse(A), inverse(A) @ B, exp(A)], ids=str)
+def test_stacks_match_per_matrix_evaluation(expr):
+    result = eval_expr(expr, {"A": STACK, "B": OTHER})
+    assert result.shape == (4, 3, 3)
+    for i in range(4):
+        np.testing.assert_allclose(result[i], eval_expr(expr, {"A": STACK[i], "B": OTHER[i]}), atol=1e-10)
+
+
+def test_stacked_scalars_scale_each_matrix():
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+    result = eval_expr(scale(s, A), {"s": weights, "A": STACK})
+    np.testing.assert_allclose(result, weights[:, None, None] * STACK)
+
+
+def test_plan_of_batched_bindings():
+    result = compile_plan(A @ A.T + A)({"A": STACK})
+    np.testing.assert_allclose(result, STACK @ STACK.transpose(0, 2, 1) + STACK)
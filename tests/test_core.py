@@ -0,0 +1,32 @@
+import pytest
+
+from minical.matrix import Var, Func, intern, eval_expr, exp
+
+A = Var("A", (2, 2))
+
+
+def test_structurally_equal_nodes_are_interned():
+    assert intern(Var("A", (2, 2)) @ Var("B", (2, 2))) is A @ Var("B", (2, 2))
+    assert hash(exp(A) @ A) == hash(Func("exp", (Var("A", (2, 2)),)) @ A)
+
+
+def test_equality_with_array_arguments():
+    np = pytest.importorskip("numpy")
+    f = Func("pow", (A, np.ones(3)))
+    assert f == Func("pow", (A, np.ones(3)))
+    assert f != Func("pow", (A, np.zeros(3)))
+    assert f != Func("pow", (A, np.ones(4)))
+    assert f != Func("pow", (A, 1.0))
+    assert {f: 1}[Func("pow", (A, np.ones(3)))] == 1
+
+
+def test_topological_lists_each_node_after_its_operands():
+    from minical.matrix.core import Const, operands, topological
+    from minical.matrix import pow, trace
+    B = Var("B", (2, 2))
+    expr = trace(A @ B + pow(A @ B, Const("2", (1, 1))))
+    order = topological(expr)
+    assert order[-1] is expr and len(order) == len(set(order))
+    for i, node in enumerate(order):
+        assert all(c in order[:i] for c in operands(node))
+    assert operands(Func("pow", (A, 2.0))) == (A,)
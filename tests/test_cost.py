@@ -0,0 +1,19 @@
+from minical.matrix import Var, Const, node_flops, subtree_flops, chain_order, optimize_chains, pow
+
+A = Var("A", (10, 10))
+
+
+def test_pow_cost_reads_const_exponents():
+    for k in (2, 3, 13):
+        assert node_flops(pow(A, Const(str(k), (1, 1)))) == node_flops(pow(A, k)) == 2 * 10 ** 3 * 2 * k.bit_length()
+    assert node_flops(pow(A, Const("0.5", (1, 1)))) == node_flops(pow(A, 0.5))
+    assert node_flops(pow(A, Const("p", (1, 1)))) == node_flops(pow(A, 0.5))
+
+
+def test_chain_order_picks_the_cheap_association():
+    x, y, z = Var("x", (100, 1)), Var("y", (1, 100)), Var("z", (100, 1))
+    cheap = x @ (y @ z)
+    assert subtree_flops(cheap) < subtree_flops((x @ y) @ z)
+    cost, _ = chain_order([x.shape, y.shape, z.shape])
+    assert cost == subtree_flops(cheap)
+    assert optimize_chains((x @ y) @ z) == cheap
@@ -0,0 +1,29 @@
+import math
+
+import pytest
+
+from minical.symdiff import parse_latex, derivatives, diff, compile_expr
+
+SOURCE = r"\sin(x^2) + \sqrt{y}"
+POINT = {"x": 2.0, "y": 1.0}
+
+
+def test_derivative_tower_matches_closed_form():
+    x = POINT["x"]
+    tower = derivatives(parse_latex(SOURCE), "x", up_to=2)
+    value, first, second = tower(POINT)
+    assert value == pytest.approx(math.sin(x * x) + 1.0)
+    assert first == pytest.approx(2 * x * math.cos(x * x))
+    assert second == pytest.approx(2 * math.cos(x * x) - 4 * x * x * math.sin(x * x))
+
+
+def test_tower_orders_match_repeated_diff():
+    e = parse_latex(SOURCE)
+    tower = derivatives(e, "x", up_to=3)
+    repeated = diff(diff(diff(e, "x"), "x"), "x")
+    assert tower(POINT)[3] == pytest.approx(compile_expr(repeated, "x y")(POINT))
+
+
+def test_compiled_derivative():
+    d = compile_expr(diff(parse_latex(SOURCE), "y"), "x y")
+    assert d(POINT) == pytest.approx(0.5)
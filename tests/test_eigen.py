@@ -0,0 +1,31 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sl = pytest.importorskip("scipy.linalg")
+
+from minical.matrix import Var, Eigen, FactorCache, Profiler, factorize, eval_expr, exp, sin, cos
+
+rng = np.random.default_rng(5)
+M = rng.standard_normal((4, 4))
+S = M + M.T
+
+A = Var("A", (4, 4))
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_eigen_factorization_matches_numpy(kind):
+    value = S if kind == "numpy" else S.tolist()
+    fac = factorize(value, "eigh")
+    assert isinstance(fac, Eigen)
+    np.testing.assert_allclose(np.asarray(fac.apply(np.exp(np.asarray(fac.w)))), sl.expm(S), atol=1e-10)
+    np.testing.assert_allclose(fac.det(), np.linalg.det(S), rtol=1e-10)
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_symmetric_functions_share_one_decomposition(kind):
+    cache, profile = FactorCache(), Profiler()
+    value = S if kind == "numpy" else S.tolist()
+    result = eval_expr(exp(A) + sin(A) + cos(A), {"A": value}, factors=cache, profile=profile)
+    np.testing.assert_allclose(np.asarray(result), sl.expm(S) + sl.sinm(S) + sl.cosm(S), atol=1e-10)
+    assert cache.misses == 1
+    assert {r.kernel.split(".")[1] for r in profile.records} >= {"eigh_exp", "eigh_sin", "eigh_cos"}
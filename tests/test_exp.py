@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sl = pytest.importorskip("scipy.linalg")
+
+from minical.matrix import Var, eval_expr, exp
+from minical.matrix.calculus import mat_exp, mat_exp_taylor
+
+M = np.random.default_rng(0).standard_normal((4, 4)) * 0.7
+
+
+@pytest.mark.parametrize("scale", [0.01, 1.0, 8.0, 60.0])
+def test_pade_exp_matches_scipy(scale):
+    a = M * scale
+    np.testing.assert_allclose(np.array(mat_exp(a.tolist())), sl.expm(a), rtol=1e-11)
+    np.testing.assert_allclose(mat_exp(a), sl.expm(a), rtol=1e-11)
+
+
+def test_taylor_exp_matches_pade_for_small_norms():
+    np.testing.assert_allclose(np.array(mat_exp_taylor(M.tolist())), np.array(mat_exp(M.tolist())), atol=1e-13)
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_exp_node(kind):
+    value = M if kind == "numpy" else M.tolist()
+    np.testing.assert_allclose(np.asarray(eval_expr(exp(Var("A", (4, 4))), {"A": value})), sl.expm(M), atol=1e-12)
+
+
+def test_terms_keeps_the_truncated_series():
+    rows = M.tolist()
+    assert mat_exp(rows, terms=20) == mat_exp_taylor(rows, 20)
+    np.testing.assert_allclose(np.array(mat_exp(rows, terms=3)), np.eye(4) + M + M @ M / 2, atol=1e-12)
@@ -0,0 +1,25 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sl = pytest.importorskip("scipy.linalg")
+
+from minical.matrix import Var, Profiler, eval_expr, expm_multiply, exp
+
+rng = np.random.default_rng(0)
+M = rng.standard_normal((4, 4)) * 0.7
+V = rng.standard_normal((4, 2))
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_expm_multiply_matches_scipy(kind):
+    bind = np.array if kind == "numpy" else lambda a: a.tolist()
+    np.testing.assert_allclose(np.asarray(expm_multiply(bind(M), bind(V))), sl.expm(M) @ V, atol=1e-12)
+    for t, result in zip((0.5, 1.0), expm_multiply(bind(M), bind(V), [0.5, 1.0])):
+        np.testing.assert_allclose(np.asarray(result), sl.expm(t * M) @ V, atol=1e-12)
+
+
+def test_exp_times_vector_is_fused():
+    profile = Profiler()
+    result = eval_expr(exp(Var("A", (4, 4))) @ Var("v", (4, 1)), {"A": M, "v": V[:, :1]}, profile=profile)
+    np.testing.assert_allclose(result, sl.expm(M) @ V[:, :1], atol=1e-12)
+    assert [r.kernel for r in profile.records] == ["numpy.expm_multiply"]
@@ -0,0 +1,45 @@
+import math
+import threading
+
+import pytest
+
+from minical.symdiff import parse_latex, ExprCache, cached_compile
+
+
+def test_expr_cache_compiles_once_under_threads():
+    cache = ExprCache(maxsize=4)
+    calls, found = [], []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    def worker():
+        barrier.wait()
+        found.append(cache.get_or_compile("k", factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(f is found[0] for f in found)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["inflight_waits"] >= 7
+
+
+def test_expr_cache_evicts_least_recently_used():
+    cache = ExprCache(maxsize=2)
+    for key in "abc":
+        cache.get_or_compile(key, lambda: key)
+    assert "a" not in cache and len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_compile_reuses_entries():
+    cache = ExprCache(maxsize=8)
+    e = parse_latex(r"\sin(x^2) + \sqrt{y}")
+    assert cached_compile(e, "x y", cache=cache) is cached_compile(e, "x y", cache=cache)
+    assert cached_compile(e, "x y", cache=cache)({"x": 2.0, "y": 1.0}) == pytest.approx(math.sin(4.0) + 1.0)
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import (
+    Var, LU, Cholesky, FactorCache, factorize, eval_expr, inverse,
+)
+
+rng = np.random.default_rng(1)
+M = rng.standard_normal((4, 4))
+S = M @ M.T + 4 * np.eye(4)
+B = rng.standard_normal((4, 2))
+
+A = Var("A", (4, 4))
+X = Var("X", (4, 2))
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+@pytest.mark.parametrize("cls, a", [(LU, M), (Cholesky, S)])
+def test_factorizations_match_numpy(cls, a, kind):
+    bind = np.array if kind == "numpy" else lambda x: x.tolist()
+    fac = cls(bind(a))
+    np.testing.assert_allclose(np.asarray(fac.solve(bind(B))), np.linalg.solve(a, B), atol=1e-12)
+    np.testing.assert_allclose(np.asarray(fac.inverse()), np.linalg.inv(a), atol=1e-12)
+    np.testing.assert_allclose(fac.det(), np.linalg.det(a), rtol=1e-10)
+    sign, log = fac.slogdet()
+    assert (sign, pytest.approx(log)) == tuple(np.linalg.slogdet(a))
+
+
+def test_factorize_picks_cholesky_for_spd():
+    assert isinstance(factorize(S), Cholesky)
+    assert isinstance(factorize(M), LU)
+    assert isinstance(factorize(M, "lu"), LU)
+    with pytest.raises(ValueError):
+        factorize(M, "qr")
+
+
+def test_singular_factorization_solves_to_none():
+    fac = LU([[1.0, 2.0], [2.0, 4.0]])
+    assert fac.singular
+    assert fac.solve([[1.0], [1.0]]) is None
+    assert fac.inverse() is None
+
+
+def test_factor_cache_is_shared_across_calls():
+    cache = FactorCache()
+    env = {"A": M, "X": B}
+    expected = np.linalg.solve(M, B)
+    np.testing.assert_allclose(eval_expr(inverse(A) @ X, env, factors=cache), expected, atol=1e-12)
+    assert (cache.misses, cache.hits, len(cache)) == (1, 0, 1)
+    np.testing.assert_allclose(eval_expr(inverse(A) @ X + inverse(A) @ X, env, factors=cache), 2 * expected)
+    assert (cache.misses, cache.hits) == (1, 1)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_factor_cache_factors_once_under_threads():
+    cache = FactorCache()
+    found = []
+    threads = [threading.Thread(target=lambda: found.append(cache.get(S))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.misses == 1
+    assert all(f is found[0] for f in found)
+
+
+def test_factor_cache_counts_every_lookup_under_threads():
+    cache = FactorCache()
+    matrices = [S + i * np.eye(4) for i in range(4)]
+    barrier = threading.Barrier(8)
+
+    def lookups():
+        barrier.wait()
+        for _ in range(500):
+            for a in matrices:
+                cache.get(a)
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.misses == len(matrices)
+    assert cache.hits + cache.misses == 8 * 500 * len(matrices)
@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, FlatMatrix, FlatBackend, eval_expr, inverse, exp, pow, Const
+from minical.matrix.flat import flat_add, flat_axpy, flat_mul, flat_scale
+
+rng = np.random.default_rng(6)
+M = rng.standard_normal((3, 3)) + 3 * np.eye(3)
+N = rng.standard_normal((3, 3))
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+
+
+@pytest.mark.parametrize("expr, reference", [
+    (A + B, lambda: M + N),
+    (A @ B, lambda: M @ N),
+    (A.T @ B, lambda: M.T @ N),
+    (inverse(A) @ B, lambda: np.linalg.solve(M, N)),
+    (pow(A, Const("5", (1, 1))), lambda: np.linalg.matrix_power(M, 5)),
+], ids=["add", "mul", "transpose", "inverse_mul", "pow"])
+def test_flat_bindings_match_numpy(expr, reference):
+    result = eval_expr(expr, {"A": FlatMatrix.from_rows(M.tolist()), "B": FlatMatrix.from_rows(N.tolist())})
+    np.testing.assert_allclose(np.array(result.tolist()), reference(), atol=1e-10)
+
+
+def test_in_place_kernels_write_into_out():
+    a, b = FlatMatrix.from_rows(M.tolist()), FlatMatrix.from_rows(N.tolist())
+    out = FlatMatrix.zeros(3, 3)
+    assert flat_mul(a, b, out) is out
+    np.testing.assert_allclose(np.array(out.tolist()), M @ N, atol=1e-12)
+    assert flat_add(a, b, a) is a
+    np.testing.assert_allclose(np.array(a.tolist()), M + N, atol=1e-12)
+    assert flat_scale(a, 2.0, a) is a
+    assert flat_axpy(a, -2.0, b) is a
+    np.testing.assert_allclose(np.array(a.tolist()), 2 * M, atol=1e-12)
+
+
+def test_cached_columns_follow_in_place_updates():
+    a, b = FlatMatrix.from_rows(M.tolist()), FlatMatrix.from_rows(N.tolist())
+    flat_mul(a, b)
+    flat_scale(b, 3.0, b)
+    np.testing.assert_allclose(np.array(flat_mul(a, b).tolist()), M @ (3 * N), atol=1e-12)
+
+
+def test_flat_backend_inverse_of_lists():
+    np.testing.assert_allclose(np.array(FlatBackend().inverse(M.tolist()).tolist()), np.linalg.inv(M), atol=1e-12)
+
+
+def test_list_series_match_numpy():
+    np.testing.assert_allclose(np.array(eval_expr(exp(A), {"A": (M / 4).tolist()})),
+                               np.asarray(eval_expr(exp(A), {"A": M / 4})), atol=1e-12)
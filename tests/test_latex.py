@@ -0,0 +1,23 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.symdiff import parse_latex, compile_latex
+
+SOURCE = r"\sin(x^2) + \sqrt{y}"
+
+
+def test_compiled_latex_matches_tree_evaluation():
+    point = {"x": 2.0, "y": 1.0}
+    f = compile_latex(SOURCE, "x y")
+    assert f(point) == pytest.approx(math.sin(4.0) + 1.0)
+    assert f(point) == pytest.approx(float(parse_latex(SOURCE).subs(point).eval()))
+
+
+def test_compiled_latex_batch_and_cache():
+    f = compile_latex(SOURCE, "x y")
+    xs = np.array([1.0, 2.0, 3.0])
+    np.testing.assert_allclose(f.batch(x=xs, y=1.0), np.sin(xs ** 2) + 1.0)
+    assert compile_latex(SOURCE, "x y") is f
@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sl = pytest.importorskip("scipy.linalg")
+
+from minical.matrix import Var, Const, eval_expr, ln, pow
+from minical.matrix.calculus import mat_log, mat_sqrt, mat_power
+
+rng = np.random.default_rng(0)
+M = rng.standard_normal((4, 4)) * 0.7
+G = np.eye(4) + 0.2 * M
+
+A = Var("A", (4, 4))
+
+
+def test_log_sqrt_and_power_kernels_match_scipy():
+    np.testing.assert_allclose(np.array(mat_log(G.tolist())), sl.logm(G), atol=1e-10)
+    np.testing.assert_allclose(np.array(mat_sqrt(G.tolist())), sl.sqrtm(G), atol=1e-10)
+    np.testing.assert_allclose(np.array(mat_power(G.tolist(), 0.3)), sl.fractional_matrix_power(G, 0.3),
+                               atol=1e-10)
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+@pytest.mark.parametrize("expr, reference", [
+    (ln(A), lambda: sl.logm(G)),
+    (pow(A, Const("0.5", (1, 1))), lambda: sl.sqrtm(G)),
+    (pow(A, Var("p", (1, 1))), lambda: sl.fractional_matrix_power(G, 0.3)),
+    (pow(A, Const("3", (1, 1))), lambda: G @ G @ G),
+], ids=["ln", "sqrt", "fractional", "cube"])
+def test_log_and_power_nodes(expr, reference, kind):
+    value = G if kind == "numpy" else G.tolist()
+    result = eval_expr(expr, {"A": value, "p": 0.3})
+    np.testing.assert_allclose(np.asarray(result, dtype=float), reference(), atol=1e-10)
@@ -0,0 +1,54 @@
+import gc
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, OutOfCoreBackend, eval_expr, load_npy, inverse, scale, trace
+from minical.matrix import get_backend
+
+
+def _bind(tmp_path, name, a):
+    path = str(tmp_path / f"{name}.npy")
+    np.save(path, a)
+    return load_npy(path)
+
+
+def test_directory_is_created_lazily():
+    be = OutOfCoreBackend()
+    assert be._tmp is None
+    assert os.path.isdir(be.directory)
+
+
+def test_intermediate_files_are_removed(tmp_path):
+    a = np.random.default_rng(0).standard_normal((30, 30))
+    A = Var("A", (30, 30))
+    env = {"A": _bind(tmp_path, "A", a)}
+    memmap = get_backend("memmap")
+    for _ in range(20):
+        result = eval_expr(A @ A + A, env)
+    np.testing.assert_allclose(result, a @ a + a, atol=1e-12)
+    assert len(os.listdir(memmap.directory)) == 1
+    path = result.filename
+    del result
+    gc.collect()
+    assert not os.path.exists(path)
+    assert os.listdir(memmap.directory) == []
+
+
+def test_memmap_bindings_match_numpy(tmp_path):
+    rng = np.random.default_rng(1)
+    a, b = rng.standard_normal((40, 40)) + 8 * np.eye(40), rng.standard_normal((40, 40))
+    A, B = Var("A", (40, 40)), Var("B", (40, 40))
+    env = {"A": _bind(tmp_path, "A", a), "B": _bind(tmp_path, "B", b)}
+    memmap = get_backend("memmap")
+    memmap.reset()
+    cases = [
+        (A @ B + B.T, a @ b + b.T),
+        (scale(trace(A), B), np.trace(a) * b),
+        (inverse(A) @ B, np.linalg.solve(a, b)),
+    ]
+    for expr, expected in cases:
+        np.testing.assert_allclose(eval_expr(expr, env), expected, atol=1e-10)
+    assert memmap.bytes_read > 0 and memmap.bytes_written > 0
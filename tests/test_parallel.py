@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, EvalStats, eval_expr, trace, scale, exp, sin, cos
+
+N = 70
+
+
+def _wide(k):
+    rng = np.random.default_rng(1)
+    env = {f"X{i}": rng.standard_normal((N, N)) / N for i in range(k)}
+    xs = [Var(f"X{i}", (N, N)) for i in range(k)]
+    expr = xs[0] @ xs[1]
+    for i in range(1, k):
+        # Shared products, so memo hits happen on worker threads too.
+        expr = expr + xs[i] @ xs[(i + 1) % k] + xs[i - 1] @ xs[i]
+    return expr, env
+
+
+@pytest.mark.parametrize("workers", [1, 2, 8])
+def test_matches_serial_results_and_stats(workers):
+    expr, env = _wide(12)
+    serial, parallel = EvalStats(), EvalStats()
+    expected = eval_expr(expr, env, stats=serial)
+    np.testing.assert_allclose(eval_expr(expr, env, workers=workers, stats=parallel), expected, atol=1e-12)
+    assert parallel == serial
+
+
+def test_fusions_survive_scheduling():
+    rng = np.random.default_rng(2)
+    A, B, S, v = Var("A", (N, N)), Var("B", (N, N)), Var("S", (N, N)), Var("v", (N, 1))
+    m = rng.standard_normal((N, N)) / N
+    env = {"A": m, "B": rng.standard_normal((N, N)), "S": m + m.T, "v": rng.standard_normal((N, 1))}
+    expr = exp(A) @ v @ v.T + sin(S) + cos(S) + scale(trace(A @ B) + trace(A.T @ B), A)
+    serial, parallel = EvalStats(), EvalStats()
+    expected = eval_expr(expr, env, stats=serial)
+    np.testing.assert_allclose(eval_expr(expr, env, workers=4, stats=parallel), expected, atol=1e-10)
+    assert parallel == serial
+
+
+def test_memory_cap_and_errors():
+    expr, env = _wide(6)
+    np.testing.assert_allclose(eval_expr(expr, env, workers=4, memory=1), eval_expr(expr, env), atol=1e-12)
+    with pytest.raises(ValueError):
+        eval_expr(Var("A", (N, N)) @ Var("Z", (N, N)), {"A": env["X0"], "Z": np.ones((3, 3))}, workers=2)
+
+
+def test_stats_add_is_atomic():
+    stats = EvalStats()
+
+    def bump():
+        for _ in range(10000):
+            stats.add(matmuls=1, memo_hits=2)
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (stats.matmuls, stats.memo_hits) == (80000, 160000)
@@ -0,0 +1,81 @@
+import importlib
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, Const, Plan, compile_plan, eval_expr, inverse, exp, sin, cos, pow
+
+rng = np.random.default_rng(3)
+M = rng.standard_normal((3, 3)) * 0.5
+S = M @ M.T + 3 * np.eye(3)
+B = rng.standard_normal((3, 2))
+
+A = Var("A", (3, 3))
+P = Var("P", (3, 3))
+X = Var("X", (3, 2))
+
+EXPRESSIONS = [
+    A @ X + inverse(P) @ X,
+    A.T @ A @ X,
+    (A @ P).T @ (A @ P) + inverse(P),
+    exp(A) + A,
+    sin(A) + cos(A),
+    pow(P, Const("0.5", (1, 1))) @ X,
+    pow(A, Const("3", (1, 1))),
+]
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+@pytest.mark.parametrize("expr", EXPRESSIONS, ids=str)
+def test_plan_matches_eval_expr(expr, kind):
+    bind = np.array if kind == "numpy" else lambda a: a.tolist()
+    env = {"A": bind(M), "P": bind(S), "X": bind(B)}
+    plan = compile_plan(expr)
+    assert isinstance(plan, Plan)
+    expected = np.asarray(eval_expr(expr, env), dtype=float)
+    for _ in range(2):
+        np.testing.assert_allclose(np.asarray(plan(env), dtype=float), expected, atol=1e-12)
+
+
+def test_plan_specializes_per_binding_kind():
+    plan = compile_plan(A @ X)
+    assert isinstance(plan({"A": M, "X": B}), np.ndarray)
+    assert isinstance(plan({"A": M.tolist(), "X": B.tolist()}), list)
+    np.testing.assert_allclose(plan({"A": M.tolist(), "X": B.tolist()}), M @ B)
+
+
+def _failing(*args):
+    raise AssertionError("dense kernel used")
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize("expr, env", [
+    (inverse(A), {"A": [[1.0, 2.0], [2.0, 4.0]]}),
+    (inverse(A), {"A": np.array([[1.0, 2.0], [2.0, 4.0]])}),
+    (inverse(P) @ X + X, {"P": np.zeros((3, 3)), "X": B}),
+    (A @ X, {"A": M}),
+])
+def test_plan_returns_what_eval_expr_leaves_symbolic(expr, env):
+    assert compile_plan(expr)(env) == eval_expr(expr, env)
+
+
+def test_plan_runs_exp_times_vector_as_an_action(monkeypatch):
+    monkeypatch.setattr(importlib.import_module("minical.matrix.plan"), "mat_exp", _failing)
+    v = Var("v", (3, 1))
+    env = {"A": M, "v": B[:, :1]}
+    np.testing.assert_allclose(compile_plan(exp(A) @ v)(env), eval_expr(exp(A) @ v, env), atol=1e-12)
+
+
+def test_plan_solves_with_a_sparse_inverse():
+    from minical.matrix import CSRMatrix
+    env = {"P": CSRMatrix.from_dense(S.tolist()), "X": B}
+    for expr in (inverse(P) @ X, X.T @ inverse(P)):
+        np.testing.assert_allclose(np.asarray(compile_plan(expr)(env)), np.asarray(eval_expr(expr, env)), atol=1e-12)
+
+
+def test_plan_shares_the_eigendecomposition_of_a_symmetric_argument(monkeypatch):
+    module = importlib.import_module("minical.matrix.plan")
+    for name in ("mat_exp", "mat_sincos"):
+        monkeypatch.setattr(module, name, _failing)
+    expr = exp(P) + sin(P) + cos(P)
+    np.testing.assert_allclose(compile_plan(expr)({"P": S}), eval_expr(expr, {"P": S}), atol=1e-12)
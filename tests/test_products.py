@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, CSRMatrix, Profiler, eval_expr, hadamard, kron, trace
+
+rng = np.random.default_rng(7)
+M = rng.standard_normal((3, 3))
+N = rng.standard_normal((3, 3))
+V = rng.standard_normal((9, 2))
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+v = Var("v", (9, 2))
+
+BINDINGS = {
+    "list": lambda a: a.tolist(),
+    "numpy": lambda a: a,
+    "csr": lambda a: CSRMatrix.from_dense(a.tolist()),
+}
+
+
+def _dense(x):
+    return np.array(x.todense() if hasattr(x, "todense") else x, dtype=float)
+
+
+@pytest.mark.parametrize("kind", sorted(BINDINGS))
+@pytest.mark.parametrize("expr, reference", [
+    (hadamard(A, B), lambda: M * N),
+    (kron(A, B), lambda: np.kron(M, N)),
+    (kron(A, B) @ v, lambda: np.kron(M, N) @ V),
+    (trace(A @ B), lambda: np.trace(M @ N)),
+    (trace(A.T @ B), lambda: np.trace(M.T @ N)),
+    (hadamard(A, B) @ A, lambda: (M * N) @ M),
+], ids=["hadamard", "kron", "kron_action", "trace", "trace_transpose", "hadamard_mul"])
+def test_products_match_numpy(expr, reference, kind):
+    bind = BINDINGS[kind]
+    env = {"A": bind(M), "B": bind(N), "v": V if kind == "numpy" else V.tolist()}
+    np.testing.assert_allclose(_dense(eval_expr(expr, env)), reference(), atol=1e-12)
+
+
+def test_trace_and_kron_products_are_fused():
+    profile = Profiler()
+    eval_expr(trace(A @ B) + trace(kron(A, B) @ v @ v.T), {"A": M, "B": N, "v": V}, profile=profile)
+    kernels = {r.kernel for r in profile.records}
+    assert {"numpy.trace_mul", "numpy.kron_mul"} <= kernels
+    assert "numpy.kron" not in kernels
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, Profiler, NodeRecord, eval_expr, trace, solve
+
+A = Var("A", (8, 8))
+B = Var("B", (8, 8))
+
+rng = np.random.default_rng(4)
+ENV = {"A": rng.standard_normal((8, 8)), "B": rng.standard_normal((8, 8)) + 8 * np.eye(8)}
+
+
+def test_records_one_per_evaluated_node():
+    profile = Profiler()
+    expr = A @ B + solve(B, A)
+    result = eval_expr(expr, ENV, profile=profile)
+    np.testing.assert_allclose(result, ENV["A"] @ ENV["B"] + np.linalg.solve(ENV["B"], ENV["A"]), atol=1e-12)
+    assert all(isinstance(r, NodeRecord) for r in profile.records)
+    assert len(profile.records) == 3
+    root = profile.records[-1]
+    assert root.kernel == "numpy.add"
+    assert root.shapes == [(8, 8), (8, 8)] and root.shape == (8, 8)
+    assert root.bytes == 8 * 64
+    assert root.wall >= root.seconds >= 0
+    assert profile.total() == pytest.approx(sum(r.seconds for r in profile.records))
+
+
+def test_fused_kernels_are_named():
+    profile = Profiler()
+    eval_expr(trace(A @ B), ENV, profile=profile)
+    assert [r.kernel for r in profile.records] == ["numpy.trace_mul"]
+
+
+def test_report_and_trace(tmp_path):
+    profile = Profiler(memory=True)
+    with profile:
+        eval_expr(A @ B @ A, ENV, profile=profile)
+    assert all(r.peak is not None for r in profile.records)
+    report = profile.report(sort="flops", limit=1)
+    assert "... 1 more" in report and report.splitlines()[-1].startswith("2 nodes")
+    with pytest.raises(ValueError):
+        profile.report(sort="name")
+    events = profile.trace()["traceEvents"]
+    assert [e["ph"] for e in events] == ["X", "X"]
+    profile.dump(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json") as f:
+        assert [e["name"] for e in json.load(f)["traceEvents"]] == [e["name"] for e in events]
+    profile.clear()
+    assert profile.records == []
+
+
+def test_profile_under_workers_matches_serial():
+    serial, parallel = Profiler(), Profiler()
+    expr = A @ B + B @ A + A @ A
+    eval_expr(expr, ENV, profile=serial)
+    eval_expr(expr, ENV, profile=parallel, workers=2)
+    assert sorted(r.node for r in serial.records) == sorted(r.node for r in parallel.records)
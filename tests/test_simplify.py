@@ -0,0 +1,21 @@
+import pytest
+
+from minical.matrix import Var, Const, Solve, intern, simplify, inverse, det, logdet, trace, exp, ln, sin, pow
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+
+
+@pytest.mark.parametrize("expr", [
+    det(A @ B), logdet(A @ B), trace(A.T), sin(A @ B), exp(ln(A)) @ B, pow(A, Const("0", (1, 1))),
+    inverse(A) @ B, inverse(A @ B) @ A,
+])
+def test_rewritten_nodes_are_interned(expr):
+    first, second = simplify(expr), simplify(expr)
+    assert first is second
+    assert first.__dict__.get("_interned")
+
+
+def test_inverse_products_become_solves():
+    assert isinstance(simplify(inverse(A) @ B), Solve)
+    assert simplify(exp(ln(A))) is intern(A)
@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sl = pytest.importorskip("scipy.linalg")
+
+from minical.matrix import Var, eval_expr, sin, cos
+from minical.matrix.calculus import mat_sincos, mat_sin, mat_cos
+
+M = np.random.default_rng(0).standard_normal((4, 4)) * 0.7
+A = Var("A", (4, 4))
+
+
+@pytest.mark.parametrize("scale", [0.1, 1.0, 6.0])
+def test_sincos_matches_scipy(scale):
+    a = M * scale
+    sin_a, cos_a = mat_sincos(a.tolist())
+    np.testing.assert_allclose(np.array(sin_a), sl.sinm(a), atol=1e-11)
+    np.testing.assert_allclose(np.array(cos_a), sl.cosm(a), atol=1e-11)
+    np.testing.assert_allclose(np.array(mat_sin(a.tolist())), sl.sinm(a), atol=1e-11)
+    np.testing.assert_allclose(np.array(mat_cos(a.tolist())), sl.cosm(a), atol=1e-11)
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_sin_and_cos_nodes(kind):
+    value = M if kind == "numpy" else M.tolist()
+    result = eval_expr(sin(A) + cos(A), {"A": value})
+    np.testing.assert_allclose(np.asarray(result), sl.sinm(M) + sl.cosm(M), atol=1e-12)
+
+
+def test_terms_keyword_is_accepted():
+    rows = M.tolist()
+    assert mat_sin(rows, terms=20) == mat_sin(rows)
+    assert mat_cos(rows, terms=20) == mat_cos(rows)
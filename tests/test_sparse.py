@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Expr, Var, CSRMatrix, eval_expr, compile_plan, ln, solve, inverse
+
+S = Var("S", (3, 3))
+
+MATRICES = {
+    "full": [[2.0, 0.1, 0.0], [0.1, 3.0, 0.0], [0.0, 0.0, 1.5]],
+    "diagonal": [[2.0, 0.0, 0.0], [0.0, 3.0, 0.0], [0.0, 0.0, 1.5]],
+}
+
+
+A = Var("A", (3, 3))
+B = Var("B", (3, 3))
+
+PRODUCTS = {
+    "add": (A + B, lambda a, b: a + b),
+    "mul": (A @ B, lambda a, b: a @ b),
+    "transpose": (A.T @ B, lambda a, b: a.T @ b),
+    "inverse": (inverse(A), lambda a, b: np.linalg.inv(a)),
+    "inverse_mul": (inverse(A) @ B, lambda a, b: np.linalg.solve(a, b)),
+}
+
+
+def _dense(x):
+    if hasattr(x, "toarray"):
+        return x.toarray()
+    return np.array(x.todense() if hasattr(x, "todense") else x, dtype=float)
+
+
+def _log_reference(a):
+    w, q = np.linalg.eigh(np.asarray(a))
+    return q @ np.diag(np.log(w)) @ q.T
+
+
+def _bindings(a):
+    csr = CSRMatrix.from_dense(a)
+    yield csr
+    yield csr.tocoo()
+    sp = pytest.importorskip("scipy.sparse")
+    yield sp.csr_matrix(np.asarray(a))
+
+
+@pytest.mark.parametrize("kind", sorted(MATRICES))
+def test_ln_of_sparse_bindings(kind):
+    a = MATRICES[kind]
+    for value in _bindings(a):
+        for result in (eval_expr(ln(S), {"S": value}), compile_plan(ln(S))({"S": value})):
+            assert not isinstance(result, Expr)
+            np.testing.assert_allclose(np.asarray(result, dtype=float), _log_reference(a), atol=1e-10)
+
+
+def test_ln_of_singular_sparse_binding_stays_symbolic():
+    value = CSRMatrix.from_dense([[0.0, 0.0], [0.0, 1.0]])
+    assert eval_expr(ln(Var("S", (2, 2))), {"S": value}) == ln(Var("S", (2, 2)))
+
+
+def test_solve_with_coo_right_hand_side():
+    a, b = MATRICES["full"], [[1.0, 0.0], [0.0, 0.0], [2.0, 1.0]]
+    env = {"S": CSRMatrix.from_dense(a), "B": CSRMatrix.from_dense(b).tocoo()}
+    result = eval_expr(solve(S, Var("B", (3, 2))), env)
+    np.testing.assert_allclose(np.asarray(result), np.linalg.solve(np.asarray(a), np.asarray(b)), atol=1e-12)
+
+
+@pytest.mark.parametrize("name", sorted(PRODUCTS))
+def test_sparse_bindings_match_numpy(name):
+    expr, reference = PRODUCTS[name]
+    a, b = MATRICES["full"], [[1.0, 0.0, 2.0], [0.0, 0.0, 1.0], [3.0, 1.0, 0.0]]
+    expected = reference(np.array(a), np.array(b))
+    for va, vb in zip(_bindings(a), _bindings(b)):
+        for env in ({"A": va, "B": vb}, {"A": va, "B": np.array(b)}):
+            result = eval_expr(expr, env)
+            assert not isinstance(result, Expr)
+            np.testing.assert_allclose(_dense(result), expected, atol=1e-12)
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from minical.matrix import Var, tags, eval_expr, inverse, solve, det, logdet
+
+rng = np.random.default_rng(1)
+M = rng.standard_normal((4, 4))
+S = M @ M.T + 4 * np.eye(4)
+B = rng.standard_normal((4, 2))
+
+X = Var("X", (4, 2))
+
+
+def test_structure_tags_propagate():
+    L = Var("L", (4, 4), "lower")
+    P = Var("P", (4, 4), "spd")
+    D = Var("D", (4, 4), "diagonal")
+    assert "lower" in tags(L @ L)
+    assert "lower" in tags(inverse(L))
+    assert "upper" in tags(L.T)
+    assert "spd" in tags(P + P)
+    assert {"diagonal", "symmetric"} <= tags(D @ D)
+    assert tags(L @ L.T) == frozenset()
+
+
+@pytest.mark.parametrize("kind", ["list", "numpy"])
+def test_structured_kernels_match_numpy(kind):
+    bind = np.array if kind == "numpy" else lambda x: x.tolist()
+    lower = np.tril(M) + 4 * np.eye(4)
+    diagonal = np.diag([1.0, 2.0, 3.0, 4.0])
+    L = Var("L", (4, 4), "lower")
+    D = Var("D", (4, 4), "diagonal")
+    P = Var("P", (4, 4), "spd")
+    env = {"L": bind(lower), "D": bind(diagonal), "P": bind(S), "X": bind(B)}
+    cases = [
+        (solve(L, X), np.linalg.solve(lower, B)),
+        (inverse(D) @ X, np.linalg.solve(diagonal, B)),
+        (L @ D, lower @ diagonal),
+        (det(L), np.linalg.det(lower)),
+        (logdet(P), np.linalg.slogdet(S)[1]),
+        (solve(P, X), np.linalg.solve(S, B)),
+    ]
+    for expr, reference in cases:
+        np.testing.assert_allclose(np.asarray(eval_expr(expr, env), dtype=float), reference, atol=1e-12)
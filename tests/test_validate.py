@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from minical.symdiff import parse_latex, diff, check_grid, validate_grid
+
+BOX = {"x": (0.5, 1.5), "y": (0.5, 1.5)}
+
+
+def test_check_grid_accepts_the_derivative_and_rejects_a_wrong_one():
+    e = parse_latex(r"\sin(x^2) + \sqrt{y}")
+    report = check_grid(e, diff(e, "x"), "x", box=BOX, n=100, seed=0)
+    assert report.passed and report.n_points == 100
+    assert not check_grid(e, diff(e, "y"), "x", box=BOX, n=100, seed=0).passed
+
+
+def test_validate_grid_step():
+    e = parse_latex(r"\sin(x^2) + \sqrt{y}")
+    assert validate_grid(e, diff(e, "x"), "x", box=BOX, n=50, h=1e-4, seed=0, verbose=False)
+    assert not validate_grid(e, diff(e, "x"), "x", box=BOX, n=50, h=1e-1, tol=1e-8, seed=0, verbose=False)